@@ -0,0 +1,267 @@
+import datetime
+
+from sqlalchemy import Integer, bindparam, func, literal_column, select, union_all
+
+from . import models
+from .database import begin
+
+# Pre-aggregated hourly and daily rollups of bills, payments and appointments. Every write
+# that changes one of these facts adds its delta to both grains in the same transaction, so
+# the analytics endpoints sum a few hundred rollup rows instead of scanning the fact tables.
+# rebuild() recomputes everything from the fact tables, for data written around the API, with
+# the summing done by the database.
+
+# Metrics kept in the rollups
+BILLED = "billed"              # bill amounts, by issue date
+CONSULTATION = "consultation"  # consultation fees billed, by prescribing doctor
+COLLECTED = "collected"        # payments, by payment method
+APPOINTMENTS = "appointments"  # active (not cancelled) appointments, by doctor and slot time
+
+ROLLUPS = {
+    "hour": models.HourlyRollup,
+    "day": models.DailyRollup,
+}
+# Rollup rows carry 0 / "" rather than NULL for an unused dimension, so the unique key matches
+NO_DOCTOR = 0
+NO_METHOD = ""
+
+REVENUE_GROUPS = ("day", "hour", "doctor", "payment_method")
+APPOINTMENT_GROUPS = ("day", "hour", "doctor", "specialization")
+
+ROLLUP_COLUMNS = ("bucket", "metric", "doctor_id", "payment_method", "amount", "count")
+# SQLite keeps DateTime as text, so a bucket computed in SQL must be the exact text the ORM writes
+SQLITE_BUCKETS = {"hour": "%Y-%m-%d %H:00:00.000000", "day": "%Y-%m-%d 00:00:00.000000"}
+
+def naive_utc(moment):
+    # Dates are stored as naive UTC; an aware bound (e.g. "...Z" or "+05:30") is converted to match
+    if moment is not None and moment.tzinfo is not None:
+        moment = moment.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return moment
+
+def bucket(moment, grain):
+    if grain == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def fact(moment, metric, amount, count=1, doctor_id=None, payment_method=None):
+    return (moment, metric, doctor_id or NO_DOCTOR, payment_method or NO_METHOD, amount, count)
+
+def accumulate(totals, facts, grain):
+    for moment, metric, doctor_id, payment_method, amount, count in facts:
+        key = (bucket(moment, grain), metric, doctor_id, payment_method)
+        total = totals.setdefault(key, [0, 0])
+        total[0] += amount
+        total[1] += count
+    return totals
+
+def aggregate(facts, grain):
+    return rows_of(accumulate({}, facts, grain))
+
+def rows_of(totals):
+    return [
+        {"bucket": key[0], "metric": key[1], "doctor_id": key[2], "payment_method": key[3], "amount": amount, "count": count}
+        for key, (amount, count) in totals.items()
+    ]
+
+def bucket_of(dialect, moment, grain):
+    if dialect.name == "postgresql":
+        return func.date_trunc(literal_column(f"'{grain}'"), moment)
+    return func.strftime(SQLITE_BUCKETS[grain], moment)
+
+def upsert(dialect, table, rows=None):
+    # INSERT ... ON CONFLICT DO UPDATE adding the delta; both SQLite and PostgreSQL have it.
+    # rows, when given, is a SELECT of ROLLUP_COLUMNS to insert instead of parameter sets.
+    if dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    statement = insert(table)
+    if rows is not None:
+        statement = statement.from_select(ROLLUP_COLUMNS, rows)
+    return statement.on_conflict_do_update(
+        index_elements=["bucket", "metric", "doctor_id", "payment_method"],
+        set_={"amount": table.c.amount + statement.excluded.amount, "count": table.c.count + statement.excluded.count},
+    )
+
+def record(db, facts):
+    # One executemany per grain, in the caller's transaction
+    if not facts:
+        return
+    conn = db.connection()
+    for grain, model in ROLLUPS.items():
+        conn.execute(upsert(conn.dialect, model.__table__), aggregate(facts, grain))
+
+def payment_facts(payments):
+    return [fact(payment.payment_date, COLLECTED, payment.amount, payment_method=payment.payment_method) for payment in payments]
+
+def appointment_facts(appointment, sign=1):
+    # Moving or cancelling an appointment takes it out of its old bucket (sign=-1)
+    if appointment["status"] == "Cancelled":
+        return []
+    return [fact(appointment["appointment_time"], APPOINTMENTS, 0, sign, doctor_id=appointment["doctor_id"])]
+
+def constant(value):
+    return literal_column(f"'{value}'" if isinstance(value, str) else str(value))
+
+def fact_select(moment, metric, amount, doctor_id=None, payment_method=None):
+    # A query yielding facts in the shape fact() builds them
+    return select(
+        moment.label("moment"),
+        constant(metric).label("metric"),
+        (func.coalesce(doctor_id, NO_DOCTOR) if doctor_id is not None else constant(NO_DOCTOR)).label("doctor_id"),
+        (func.coalesce(payment_method, NO_METHOD) if payment_method is not None else constant(NO_METHOD)).label("payment_method"),
+        func.coalesce(amount, 0).label("amount"),
+        constant(1).label("count"),
+    )
+
+def bill_facts(bill_id=None):
+    # The amounts of bills and the consultation fees of the prescriptions each one charged, at
+    # the bill's issue date. Only stored columns are read (the fee is the one billing charged,
+    # not the doctor's current one), so taking a bill's facts out subtracts exactly what adding
+    # them added. Both rebuild() and billing (for one bill) record these queries.
+    bills, prescriptions = models.Bill.__table__, models.Prescription.__table__
+    billed = fact_select(bills.c.issue_date, BILLED, bills.c.amount)
+    consultations = fact_select(
+        bills.c.issue_date, CONSULTATION, prescriptions.c.consultation_fee, doctor_id=prescriptions.c.doctor_id,
+    ).select_from(prescriptions).join(bills, bills.c.id == prescriptions.c.bill_id)
+    if bill_id is not None:
+        billed = billed.where(bills.c.id == bill_id)
+        consultations = consultations.where(prescriptions.c.bill_id == bill_id)
+    return [billed, consultations]
+
+# Building the statements costs more than running them, so record_bill() builds them once per
+# dialect, with the bill and the sign as parameters
+BILL_STATEMENTS = {}
+
+def record_bill(db, bill_id, sign=1):
+    # Adds a bill's facts, or with sign=-1 takes them out before it changes or goes
+    conn = db.connection()
+    statements = BILL_STATEMENTS.get(conn.dialect.name)
+    if statements is None:
+        statements = BILL_STATEMENTS[conn.dialect.name] = record_statements(
+            conn.dialect, bill_facts(bindparam("bill_id", type_=Integer)), bindparam("sign", type_=Integer)
+        )
+    for statement in statements:
+        conn.execute(statement, {"bill_id": bill_id, "sign": sign})
+
+def stored_facts():
+    # Every fact in the database, as one query per fact table
+    payments, appointments = models.Payment.__table__, models.Appointment.__table__
+    return [
+        *bill_facts(),
+        fact_select(payments.c.payment_date, COLLECTED, payments.c.amount, payment_method=payments.c.payment_method),
+        fact_select(appointments.c.appointment_time, APPOINTMENTS, constant(0), doctor_id=appointments.c.doctor_id)
+        .where(appointments.c.status != "Cancelled"),
+    ]
+
+def record_statements(dialect, sources, sign=1, grains=tuple(ROLLUPS)):
+    # One INSERT ... SELECT per grain adding the facts the source queries yield to the rollups,
+    # so the rows are summed by the database rather than fetched. Each source is grouped on its
+    # own: their metrics differ, and several small sorts are cheaper than one large one.
+    sources = [source.subquery() for source in sources]
+    statements = []
+    for grain in grains:
+        grouped = []
+        for facts in sources:
+            key = (bucket_of(dialect, facts.c.moment, grain), facts.c.metric, facts.c.doctor_id, facts.c.payment_method)
+            grouped.append(select(*key, func.sum(facts.c.amount) * sign, func.sum(facts.c["count"]) * sign).where(
+                facts.c.moment.is_not(None)
+            ).group_by(*key))
+        statements.append(upsert(dialect, ROLLUPS[grain].__table__, union_all(*grouped)))
+    return statements
+
+def record_query(conn, sources, sign=1, grains=tuple(ROLLUPS)):
+    for statement in record_statements(conn.dialect, sources, sign, grains):
+        conn.execute(statement)
+
+def rebuild(bind):
+    # Recomputes every rollup: the hourly one from the fact tables, then the daily one from the
+    # far fewer hourly rows
+    hourly = models.HourlyRollup.__table__
+    with begin(bind) as conn:
+        for model in ROLLUPS.values():
+            conn.execute(model.__table__.delete())
+        record_query(conn, stored_facts(), grains=("hour",))
+        record_query(conn, [select(
+            hourly.c.bucket.label("moment"), hourly.c.metric, hourly.c.doctor_id, hourly.c.payment_method, hourly.c.amount, hourly.c["count"],
+        )], grains=("day",))
+
+def rebuild_if_empty(bind):
+    # Databases from before the rollups existed get them built once
+    with begin(bind) as conn:
+        has_rollups = conn.execute(select(models.DailyRollup.id).limit(1)).first() is not None
+        has_facts = any(
+            conn.execute(select(model.id).limit(1)).first() is not None
+            for model in (models.Bill, models.Payment, models.Appointment)
+        )
+        if has_facts and not has_rollups:
+            rebuild(conn)
+
+def choose_grain(group_by, date_from, date_to):
+    # The daily rollup unless hours were asked for, or a bound falls inside a day
+    if group_by == "hour":
+        return "hour"
+    for bound in (date_from, date_to):
+        if bound is not None and bound != bucket(bound, "day"):
+            return "hour"
+    return "day"
+
+def rollup_query(db, grain, metrics, date_from, date_to, group=None):
+    # (group value, metric, amount, count) per group and metric; group may be a Doctor column
+    model = ROLLUPS[grain]
+    columns = [model.metric, func.sum(model.amount), func.sum(model.count)]
+    query = db.query(*([group] if group is not None else []), *columns).select_from(model)
+    if group is not None and group.class_ is models.Doctor:
+        query = query.join(models.Doctor, models.Doctor.id == model.doctor_id)
+    query = query.filter(model.metric.in_(metrics))
+    if date_from is not None:
+        query = query.filter(model.bucket >= bucket(date_from, grain))
+    if date_to is not None:
+        query = query.filter(model.bucket < date_to)
+    if group is not None:
+        return query.group_by(group, model.metric)
+    return query.group_by(model.metric)
+
+def group_column(model, group_by):
+    return {
+        "day": model.bucket,
+        "hour": model.bucket,
+        "doctor": model.doctor_id,
+        "payment_method": model.payment_method,
+        "specialization": models.Doctor.specialization,
+    }.get(group_by)
+
+def bucket_label(value):
+    return value.isoformat() if isinstance(value, datetime.datetime) else str(value)
+
+def summarize(db, metrics, fields, date_from, date_to, group_by):
+    # One row per group with the fields of each metric (amount field, count field) filled in
+    date_from, date_to = naive_utc(date_from), naive_utc(date_to)
+    grain = choose_grain(group_by, date_from, date_to)
+    query = rollup_query(db, grain, metrics, date_from, date_to, group_column(ROLLUPS[grain], group_by))
+    labels = dict(db.query(models.Doctor.id, models.Doctor.name)) if group_by == "doctor" else {}
+    empty = {field: 0 for pair in fields.values() for field in pair if field}
+    rows = {}
+    for result in query:
+        group = result[0] if group_by else None
+        metric, amount, count = result[-3:]
+        key = bucket_label(group) if group_by else "total"
+        row = rows.setdefault(key, {"key": key, "label": labels.get(group), **empty})
+        amount_field, count_field = fields[metric]
+        if amount_field:
+            row[amount_field] += amount or 0
+        row[count_field] += count or 0
+    return sorted(rows.values(), key=lambda row: row["key"])
+
+def revenue(db, date_from=None, date_to=None, group_by=None):
+    # Grouped by day or hour: amounts billed and collected. By doctor: consultation income.
+    # By payment method: collections.
+    metrics = {
+        "doctor": (CONSULTATION,),
+        "payment_method": (COLLECTED,),
+    }.get(group_by, (BILLED, COLLECTED, CONSULTATION) if group_by is None else (BILLED, COLLECTED))
+    fields = {BILLED: ("billed", "bills"), COLLECTED: ("collected", "payments"), CONSULTATION: ("consultation", "consultations")}
+    return summarize(db, metrics, fields, date_from, date_to, group_by)
+
+def appointments(db, date_from=None, date_to=None, group_by=None):
+    return summarize(db, (APPOINTMENTS,), {APPOINTMENTS: (None, "appointments")}, date_from, date_to, group_by)
@@ -0,0 +1,197 @@
+import csv
+import io
+import json
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+CHUNK_SIZE = 1000
+# Stop collecting error details past this point; the failed count stays exact
+MAX_REPORTED_ERRORS = 1000
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-lines")
+CSV_TYPES = ("text/csv", "application/csv")
+
+async def iter_lines(stream):
+    buffer = b""
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8")
+    if buffer:
+        yield buffer.decode("utf-8")
+
+async def iter_csv_records(lines):
+    # Join physical lines until the quotes balance so quoted newlines stay inside their field
+    pending = ""
+    async for line in lines:
+        pending = pending + "\n" + line if pending else line
+        if pending.count('"') % 2 == 0:
+            yield pending
+            pending = ""
+    if pending:
+        yield pending
+
+async def iter_rows(request):
+    # Yields (row_number, dict or parse error) from a JSON array, NDJSON or CSV body.
+    # NDJSON and CSV are read from the request stream without buffering the whole upload.
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+
+    if content_type in NDJSON_TYPES:
+        row_number = 0
+        async for line in iter_lines(request.stream()):
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                yield row_number, json.loads(line)
+            except ValueError as e:
+                yield row_number, e
+
+    elif content_type in CSV_TYPES:
+        header = None
+        row_number = 0
+        async for record in iter_csv_records(iter_lines(request.stream())):
+            if not record.strip():
+                continue
+            values = next(csv.reader(io.StringIO(record)))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            row_number += 1
+            if len(values) != len(header):
+                yield row_number, ValueError(f"Expected {len(header)} columns, got {len(values)}")
+                continue
+            # Empty cells mean "not provided" so optional fields fall back to their defaults
+            yield row_number, {key: value for key, value in zip(header, values) if value != ""}
+
+    else:
+        try:
+            rows = json.loads(await request.body())
+        except ValueError as e:
+            yield 1, e
+            return
+        if not isinstance(rows, list):
+            yield 1, ValueError("Expected a JSON array of records")
+            return
+        for row_number, row in enumerate(rows, start=1):
+            yield row_number, row
+
+def validate(schema, row):
+    if isinstance(row, Exception):
+        return None, str(row)
+    if not isinstance(row, dict):
+        return None, "Expected an object"
+    try:
+        return schema(**row).dict(), None
+    except ValidationError as e:
+        return None, "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+
+def unique_columns(model):
+    return [column for column in model.__table__.columns if column.unique and not column.primary_key]
+
+async def iter_chunks(rows):
+    chunk = []
+    async for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+class BulkLoader:
+    # Inserts each chunk with one executemany and one commit, collecting per-row errors
+
+    def __init__(self, db, model, schema):
+        self.db = db
+        self.model = model
+        self.schema = schema
+        self.unique = unique_columns(model)
+        # Unique values this import has committed, to catch duplicates inside the batch
+        self.seen = {column.name: set() for column in self.unique}
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, row_number, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "error": message})
+
+    def load(self, chunk):
+        valid = []
+        for row_number, row in chunk:
+            data, message = validate(self.schema, row)
+            if message is not None:
+                self.error(row_number, message)
+            else:
+                valid.append((row_number, data))
+        rows = self.drop_duplicates(valid)
+        if not rows:
+            return
+        try:
+            self.db.execute(insert(self.model), [data for _, data in rows])
+            self.db.commit()
+            self.inserted += len(rows)
+            self.remember([data for _, data in rows])
+        except IntegrityError:
+            # Something the pre-checks couldn't see (e.g. a missing foreign key): isolate the bad rows
+            self.db.rollback()
+            self.insert_one_by_one(rows)
+
+    def drop_duplicates(self, chunk):
+        duplicates = {}
+        for column in self.unique:
+            values = {data.get(column.name) for _, data in chunk} - {None}
+            if values:
+                existing = {
+                    value for (value,) in self.db.query(column).filter(column.in_(values))
+                }
+                duplicates[column.name] = existing
+
+        # Values taken by earlier rows of this chunk; they join self.seen once the chunk commits
+        claimed = {column.name: set() for column in self.unique}
+        rows = []
+        for row_number, data in chunk:
+            clash = None
+            for column in self.unique:
+                value = data.get(column.name)
+                if value is None:
+                    continue
+                if value in duplicates.get(column.name, ()) or value in self.seen[column.name] or value in claimed[column.name]:
+                    clash = column.name
+                    break
+            if clash:
+                self.error(row_number, f"Duplicate {clash}: {data[clash]}")
+                continue
+            for column in self.unique:
+                if data.get(column.name) is not None:
+                    claimed[column.name].add(data[column.name])
+            rows.append((row_number, data))
+        return rows
+
+    def remember(self, inserted):
+        for data in inserted:
+            for column in self.unique:
+                if data.get(column.name) is not None:
+                    self.seen[column.name].add(data[column.name])
+
+    def insert_one_by_one(self, rows):
+        inserted = []
+        for row_number, data in rows:
+            try:
+                with self.db.begin_nested():
+                    self.db.execute(insert(self.model), [data])
+                self.inserted += 1
+                inserted.append(data)
+            except IntegrityError as e:
+                self.error(row_number, str(e.orig))
+        self.db.commit()
+        self.remember(inserted)
+
+    def result(self):
+        errors = sorted(self.errors, key=lambda e: e["row"])
+        return {"inserted": self.inserted, "failed": self.failed, "errors": errors}
@@ -0,0 +1,316 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_PREFIX = os.environ.get("CACHE_PREFIX", "hospital")
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", 1024))
+CACHE_TTL = int(os.environ.get("CACHE_TTL_SECONDS", 300))
+# Seconds a Redis call may take before the cache counts as unavailable
+CACHE_REDIS_TIMEOUT = float(os.environ.get("CACHE_REDIS_TIMEOUT_SECONDS", 0.5))
+# Bounds of the exponential backoff between reconnection attempts while Redis is down
+CACHE_REDIS_RETRY_MIN = 0.5
+CACHE_REDIS_RETRY_MAX = float(os.environ.get("CACHE_REDIS_RETRY_MAX_SECONDS", 30))
+
+logger = logging.getLogger("backend.cache")
+
+# The generation of a namespace while the cache can't be reached: get() misses and set() skips
+UNAVAILABLE = -1
+
+class CacheBackend(ABC):
+    # Shared interface of the cache backends. Keys are grouped by namespace (usually a
+    # table name); invalidating a namespace bumps its generation, which makes every older
+    # entry unreachable in O(1). Pass the generation read before computing a value to
+    # set(), so a result that raced with an invalidation is never served. Values must be
+    # JSON-serializable: that is how they are stored in Redis.
+
+    def __init__(self):
+        self.remote_listeners = []
+
+    def start(self):
+        # Runs in the application's startup, once per worker
+        pass
+
+    def stop(self):
+        pass
+
+    def on_remote_invalidate(self, callback):
+        # callback(namespaces) runs when another worker invalidates, for process-local
+        # state that lives outside the cache (e.g. the appointment schedule index).
+        # namespaces is None when invalidations may have been missed: drop everything.
+        self.remote_listeners.append(callback)
+
+    def notify_remote(self, namespaces):
+        for callback in self.remote_listeners:
+            callback(namespaces)
+
+    @abstractmethod
+    def generation(self, namespace):
+        pass
+
+    @abstractmethod
+    def get(self, namespace, key, generation=None):
+        pass
+
+    @abstractmethod
+    def set(self, namespace, key, value, generation=None, ttl=None):
+        pass
+
+    @abstractmethod
+    def invalidate(self, *namespaces):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+class TTLCache(CacheBackend):
+    # In-process LRU whose entries also expire after a TTL. Only safe with a single worker.
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.generations = {}
+        self.lock = threading.Lock()
+
+    def generation(self, namespace):
+        with self.lock:
+            return self.generations.get(namespace, 0)
+
+    def get(self, namespace, key, generation=None):
+        with self.lock:
+            if generation is None:
+                generation = self.generations.get(namespace, 0)
+            full_key = (namespace, generation, key)
+            entry = self.entries.get(full_key)
+            if entry is None:
+                return None
+            if time.monotonic() >= entry[0]:
+                del self.entries[full_key]
+                return None
+            self.entries.move_to_end(full_key)
+            return entry[1]
+
+    def set(self, namespace, key, value, generation=None, ttl=None):
+        with self.lock:
+            if generation is None:
+                generation = self.generations.get(namespace, 0)
+            expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+            self.entries[(namespace, generation, key)] = (expires, value)
+            self.entries.move_to_end((namespace, generation, key))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, *namespaces):
+        with self.lock:
+            for namespace in namespaces:
+                self.generations[namespace] = self.generations.get(namespace, 0) + 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+class RedisCache(CacheBackend):
+    # Values and generations live in Redis (or anything speaking its protocol), so every
+    # worker sees the same entries and one INCR invalidates a namespace everywhere.
+    # Invalidations are also published so workers can drop process-local state.
+    # The cache fails open: a Redis error is logged and requests bypass the cache until a
+    # background thread reconnects, so an outage makes requests slower rather than failing
+    # them after their writes committed, and no worker serves entries it can't invalidate.
+
+    def __init__(self, client, ttl=CACHE_TTL, prefix=CACHE_PREFIX):
+        from redis.exceptions import RedisError
+
+        super().__init__()
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.channel = f"{prefix}:invalidate"
+        self.origin = uuid.uuid4().hex
+        self.listener = None
+        self.errors = RedisError
+        # Namespaces whose invalidation didn't reach Redis, bumped again on reconnect. Until
+        # then other workers may serve their entries; this one bypasses the cache.
+        self.missed = set()
+        self.lock = threading.Lock()
+        self.available = threading.Event()
+        self.available.set()
+        self.stopping = threading.Event()
+
+    def disconnected(self, action, error):
+        with self.lock:
+            was_available = self.available.is_set()
+            self.available.clear()
+            if self.listener is None and not self.stopping.is_set():
+                self.listen()
+        if was_available:
+            logger.warning("Redis cache %s failed, bypassing the cache until it reconnects: %s", action, error)
+
+    def generation_key(self, namespace):
+        return f"{self.prefix}:gen:{namespace}"
+
+    def value_key(self, namespace, generation, key):
+        return f"{self.prefix}:val:{namespace}:{generation}:{key}"
+
+    def generation(self, namespace):
+        if not self.available.is_set():
+            return UNAVAILABLE
+        try:
+            return int(self.client.get(self.generation_key(namespace)) or 0)
+        except self.errors as error:
+            self.disconnected("read", error)
+            return UNAVAILABLE
+
+    def get(self, namespace, key, generation=None):
+        if generation is None:
+            generation = self.generation(namespace)
+        if generation == UNAVAILABLE or not self.available.is_set():
+            return None
+        try:
+            raw = self.client.get(self.value_key(namespace, generation, key))
+        except self.errors as error:
+            self.disconnected("get", error)
+            return None
+        return None if raw is None else json.loads(raw)
+
+    def set(self, namespace, key, value, generation=None, ttl=None):
+        if generation is None:
+            generation = self.generation(namespace)
+        if generation == UNAVAILABLE or not self.available.is_set():
+            return
+        try:
+            self.client.set(self.value_key(namespace, generation, key), json.dumps(value), ex=self.ttl if ttl is None else ttl)
+        except self.errors as error:
+            self.disconnected("set", error)
+
+    def bump(self, namespaces):
+        pipe = self.client.pipeline()
+        for namespace in namespaces:
+            pipe.incr(self.generation_key(namespace))
+        pipe.publish(self.channel, json.dumps({"origin": self.origin, "namespaces": list(namespaces)}))
+        pipe.execute()
+
+    def invalidate(self, *namespaces):
+        with self.lock:
+            if not self.available.is_set():
+                self.missed.update(namespaces)
+                return
+        try:
+            self.bump(namespaces)
+        except self.errors as error:
+            with self.lock:
+                self.missed.update(namespaces)
+            self.disconnected("invalidate", error)
+
+    def clear(self):
+        try:
+            for key in self.client.scan_iter(f"{self.prefix}:val:*"):
+                self.client.delete(key)
+        except self.errors as error:
+            self.disconnected("clear", error)
+
+    def connect(self):
+        # Subscribes first so no invalidation published after the replay is lost, then
+        # bumps what was missed; the cache is used again once nothing is left to replay
+        self.client.ping()
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(self.channel)
+            while True:
+                with self.lock:
+                    namespaces, self.missed = self.missed, set()
+                    if not namespaces:
+                        self.available.set()
+                        return pubsub
+                try:
+                    self.bump(sorted(namespaces))
+                except self.errors:
+                    with self.lock:
+                        self.missed |= namespaces
+                    raise
+        except self.errors:
+            pubsub.close()
+            raise
+
+    def start(self):
+        # Subscribes to the other workers' invalidations; without Redis, bypasses the cache
+        # and keeps reconnecting in the background
+        self.stopping.clear()
+        self.listen()
+        # The first connection attempt finishes before requests are served
+        self.attempted.wait()
+
+    def stop(self):
+        self.stopping.set()
+        if self.listener is not None:
+            self.listener.join()
+            self.listener = None
+
+    def listen(self):
+        # Background thread relaying other workers' invalidations to on_remote_invalidate
+        # callbacks, and reconnecting with exponential backoff while Redis is down
+        if self.listener is not None:
+            return
+        self.available.clear()
+        self.attempted = threading.Event()
+
+        def run():
+            pubsub = None
+            delay = CACHE_REDIS_RETRY_MIN
+            while not self.stopping.is_set():
+                if pubsub is None:
+                    try:
+                        pubsub = self.connect()
+                    except self.errors as error:
+                        logger.warning("Redis cache unreachable, retrying in %.1fs: %s", delay, error)
+                        self.attempted.set()
+                        self.stopping.wait(delay)
+                        delay = min(delay * 2, CACHE_REDIS_RETRY_MAX)
+                        continue
+                    self.attempted.set()
+                    delay = CACHE_REDIS_RETRY_MIN
+                    # Invalidations published while this worker wasn't subscribed never reached it
+                    self.notify_remote(None)
+                try:
+                    # Polled rather than blocking in listen(), which the client's socket timeout would cut short
+                    message = pubsub.get_message(timeout=CACHE_REDIS_TIMEOUT)
+                except self.errors as error:
+                    self.disconnected("listen", error)
+                    message = None
+                if not self.available.is_set():
+                    pubsub.close()
+                    pubsub = None
+                    continue
+                if message is None:
+                    continue
+                try:
+                    event = json.loads(message["data"])
+                except (TypeError, ValueError):
+                    continue
+                if event.get("origin") != self.origin:
+                    self.notify_remote(event.get("namespaces", []))
+            if pubsub is not None:
+                pubsub.close()
+
+        self.listener = threading.Thread(target=run, name="cache-invalidation", daemon=True)
+        self.listener.start()
+
+def create_cache(backend=CACHE_BACKEND):
+    if backend == "memory":
+        return TTLCache()
+    if backend == "redis":
+        import redis
+
+        client = redis.Redis.from_url(CACHE_REDIS_URL, socket_timeout=CACHE_REDIS_TIMEOUT, socket_connect_timeout=CACHE_REDIS_TIMEOUT)
+        return RedisCache(client)
+    raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
+
+response_cache = create_cache()
@@ -1,12 +1,110 @@
-from sqlalchemy import create_engine
+import contextlib
+import os
+
+from sqlalchemy import create_engine as sa_create_engine, event
+from sqlalchemy.engine import Connection
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
+
+SQLALCHEMY_DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./patients.db")
+# Opt-in async request path for the hot endpoints (needs aiosqlite, or asyncpg for PostgreSQL)
+ASYNC_DATABASE_ENABLED = os.environ.get("ASYNC_DATABASE", "").lower() in ("1", "true", "yes")
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+# SQLite tuning, overridable per deployment
+SQLITE_PRAGMAS = {
+    "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    # Negative values are KiB, so this is a 64 MiB page cache per connection
+    "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE", -64 * 1024)),
+    "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+    "foreign_keys": os.environ.get("SQLITE_FOREIGN_KEYS", "ON"),
+    "temp_store": "MEMORY",
+}
+
+def _is_memory_url(url):
+    path = url.partition("://")[2]
+    return path in ("", "/:memory:") or "mode=memory" in url
+
+def create_engine(url=SQLALCHEMY_DATABASE_URL, pragmas=None, **kwargs):
+    if not url.startswith("sqlite"):
+        kwargs.setdefault("pool_pre_ping", True)
+        return sa_create_engine(url, **kwargs)
+
+    pragmas = dict(SQLITE_PRAGMAS if pragmas is None else pragmas)
+    kwargs.setdefault("connect_args", {"check_same_thread": False})
+    if _is_memory_url(url):
+        # Every connection to an in-memory database is a new database, so share one
+        kwargs.setdefault("poolclass", StaticPool)
+        pragmas.pop("journal_mode", None)
+        pragmas.pop("mmap_size", None)
+    else:
+        kwargs.setdefault("poolclass", QueuePool)
+        kwargs.setdefault("pool_size", int(os.environ.get("DB_POOL_SIZE", 10)))
+        kwargs.setdefault("max_overflow", int(os.environ.get("DB_MAX_OVERFLOW", 20)))
+
+    engine = sa_create_engine(url, **kwargs)
+    _apply_pragmas(engine, pragmas)
+    return engine
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./patients.db"
+def _apply_pragmas(engine, pragmas):
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+@contextlib.contextmanager
+def begin(bind):
+    # A transaction on an engine, or the caller's transaction when given a connection (as
+    # migrations do, so their data steps commit together with the schema change)
+    if isinstance(bind, Connection):
+        yield bind
+    else:
+        with bind.begin() as conn:
+            yield conn
+
+def to_async_url(url):
+    scheme, sep, rest = url.partition("://")
+    if "+" in scheme:
+        return url
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+def create_async_engine(url=SQLALCHEMY_DATABASE_URL, pragmas=None, **kwargs):
+    from sqlalchemy.ext.asyncio import create_async_engine as sa_create_async_engine
+
+    url = to_async_url(url)
+    if not url.startswith("sqlite"):
+        kwargs.setdefault("pool_pre_ping", True)
+        return sa_create_async_engine(url, **kwargs)
+
+    pragmas = dict(SQLITE_PRAGMAS if pragmas is None else pragmas)
+    if _is_memory_url(url):
+        kwargs.setdefault("poolclass", StaticPool)
+        pragmas.pop("journal_mode", None)
+        pragmas.pop("mmap_size", None)
+    engine = sa_create_async_engine(url, **kwargs)
+    # Pragmas are set on the sync facade of each new aiosqlite connection
+    _apply_pragmas(engine.sync_engine, pragmas)
+    return engine
+
+engine = create_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
\ No newline at end of file
+async_engine = None
+AsyncSessionLocal = None
+if ASYNC_DATABASE_ENABLED:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = create_async_engine()
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+Base = declarative_base()
@@ -0,0 +1,145 @@
+import csv
+import datetime
+import io
+import json
+
+from sqlalchemy import select
+
+from . import models
+
+# Rows fetched per round trip; also the number of rows joined into each chunk of the response
+YIELD_PER = 1000
+
+# Tables that can be exported. Users are left out on purpose (password hashes).
+EXPORT_TABLES = {
+    "patients": models.Patient.__table__,
+    "doctors": models.Doctor.__table__,
+    "appointments": models.Appointment.__table__,
+    "medical_records": models.MedicalRecord.__table__,
+    "medicines": models.Medicine.__table__,
+    "medicine_batches": models.MedicineBatch.__table__,
+    "stock_movements": models.StockMovement.__table__,
+    "prescriptions": models.Prescription.__table__,
+    "prescription_medicines": models.PrescriptionMedicine.__table__,
+    "bills": models.Bill.__table__,
+    "payments": models.Payment.__table__,
+    "staff": models.Staff.__table__,
+}
+
+# Column that date_from/date_to filter on, for tables where that makes sense
+EXPORT_DATE_COLUMNS = {
+    "appointments": "appointment_time",
+    "medical_records": "record_date",
+    "prescriptions": "prescription_date",
+    "bills": "issue_date",
+    "payments": "payment_date",
+    "stock_movements": "movement_date",
+}
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "feather": "application/vnd.apache.arrow.file",
+}
+# Formats written with pyarrow, which is optional
+COLUMNAR_FORMATS = ("parquet", "feather")
+
+def _plain(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+def build_query(table, date_from=None, date_to=None):
+    query = select(table)
+    date_column = EXPORT_DATE_COLUMNS.get(table.name)
+    if date_column is not None:
+        if date_from is not None:
+            query = query.where(table.c[date_column] >= date_from)
+        if date_to is not None:
+            query = query.where(table.c[date_column] < date_to)
+    # Primary key order is an index walk, and keeps successive exports diffable
+    return query.order_by(*table.primary_key.columns)
+
+class _Sink:
+    # Write-only file for pyarrow that hands its bytes over as they are written, so a columnar
+    # file goes out one row group at a time like the text formats
+    closed = False
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+def arrow_schema(table, columns):
+    import pyarrow as pa
+
+    types = {int: pa.int64(), float: pa.float64(), bool: pa.bool_(), str: pa.string(), datetime.datetime: pa.timestamp("us")}
+    return pa.schema([(name, types[table.c[name].type.python_type]) for name in columns])
+
+def columnar_writer(format, sink, schema):
+    import pyarrow as pa
+
+    if format == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(sink, schema)
+    # Feather v2 is the Arrow IPC file format
+    return pa.ipc.new_file(sink, schema)
+
+def stream_columnar(result, table, format):
+    # Every partition becomes one Arrow record batch (a row group in Parquet)
+    import pyarrow as pa
+
+    schema = arrow_schema(table, list(result.keys()))
+    sink = _Sink()
+    writer = columnar_writer(format, sink, schema)
+    for partition in result.partitions():
+        columns = list(zip(*partition))
+        writer.write_batch(pa.record_batch([pa.array(values, field.type) for values, field in zip(columns, schema)], schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+def stream_rows(engine, query, format, table=None):
+    # Core rows from a server-side cursor, serialized in chunks: no ORM objects and no Pydantic models
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=YIELD_PER).execute(query)
+        columns = list(result.keys())
+
+        if format in COLUMNAR_FORMATS:
+            yield from stream_columnar(result, table, format)
+        elif format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            for partition in result.partitions():
+                writer.writerows([[_plain(v) for v in row] for row in partition])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            for partition in result.partitions():
+                yield "".join(
+                    json.dumps({c: _plain(v) for c, v in zip(columns, row)}) + "\n" for row in partition
+                )
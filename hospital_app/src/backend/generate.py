@@ -0,0 +1,501 @@
+import argparse
+import datetime
+import random
+import sys
+import threading
+import time
+from queue import Queue
+
+from sqlalchemy import false, func, insert, literal, select
+from sqlalchemy.schema import CreateIndex, DropIndex
+
+from . import analytics, database, ledger, migrate, models, scheduling, search
+
+# Rows written per executemany; each chunk is its own transaction
+CHUNK_SIZE = 50000
+
+# Generated dates are relative to this day rather than today, so a seed always yields the same data
+AS_OF = datetime.datetime(2025, 1, 1)
+
+# Per-patient ratios used for any count that isn't given explicitly
+RATIOS = {
+    "appointments": 1.0,
+    "medical_records": 0.5,
+    "prescriptions": 0.5,
+    "bills": 0.25,
+}
+PENDING_PRESCRIPTION_SHARE = 0.1
+QUANTITIES = range(1, 11)
+
+# Durability doesn't matter while building a throwaway database, and the generator only
+# ever references ids it has already written, so per-row foreign key checks are skipped
+BULK_PRAGMAS = dict(database.SQLITE_PRAGMAS, synchronous="OFF", foreign_keys="OFF")
+
+FIRST_NAMES = (
+    "Aarav", "Vivaan", "Aditya", "Vihaan", "Arjun", "Rahul", "Amit", "Rajesh", "Vikram", "Suresh",
+    "Ananya", "Diya", "Priya", "Anita", "Meena", "Kavya", "Isha", "Neha", "Pooja", "Sneha",
+)
+LAST_NAMES = (
+    "Sharma", "Patel", "Singh", "Kumar", "Desai", "Seth", "Babu", "Kumari", "Reddy", "Iyer",
+    "Nair", "Gupta", "Mehta", "Joshi", "Rao", "Das", "Bose", "Khan", "Pillai", "Verma",
+)
+CITIES = ("Bangalore", "Kolkata", "Delhi", "Mumbai", "Chennai", "Hyderabad", "Pune", "Ahmedabad")
+STREETS = ("MG Road", "Park Street", "Connaught Place", "Marine Drive", "Anna Salai", "Residency Road")
+BLOOD_GROUPS = ("A+", "A-", "B+", "B-", "O+", "O-", "AB+", "AB-")
+MARITAL_STATUSES = ("Single", "Married", "Divorced", "Widowed")
+SPECIALIZATIONS = ("Cardiologist", "Pediatrician", "General Physician", "Orthopedic", "Dermatologist", "Neurologist", "Gynecologist", "ENT")
+FEES = (300, 500, 800, 1000, 1500)
+MEDICINES = (
+    ("Paracetamol", "Tablet"), ("Amoxicillin", "Capsule"), ("Cough Syrup", "Syrup"), ("Ibuprofen", "Tablet"),
+    ("Cetirizine", "Tablet"), ("Metformin", "Tablet"), ("Atorvastatin", "Tablet"), ("Omeprazole", "Capsule"),
+    ("Aspirin", "Tablet"), ("Azithromycin", "Tablet"), ("Pantoprazole", "Tablet"), ("Losartan", "Tablet"),
+    ("Gabapentin", "Capsule"), ("Levothyroxine", "Tablet"), ("Prednisone", "Tablet"), ("Albuterol", "Inhaler"),
+    ("Insulin Glargine", "Injection"), ("Clopidogrel", "Tablet"), ("Furosemide", "Tablet"), ("Vitamin D3", "Capsule"),
+)
+SUPPLIERS = ("PharmaCorp", "MediLife", "HealthCare Ltd", "DiabetesCare", "HeartHealth", "GastroMed", "NeuroCare")
+DIAGNOSES = (
+    ("Viral fever", "Rest and fluids"), ("Hypertension", "Lifestyle changes and medication"),
+    ("Type 2 diabetes", "Diet control and metformin"), ("Migraine", "Pain management"),
+    ("Bronchitis", "Antibiotics and rest"), ("Fracture", "Cast and follow-up"),
+)
+STAFF_POSITIONS = (("Nurse", "Nurse"), ("Receptionist", "Admin"), ("Pharmacist", "Pharmacy"), ("Lab Technician", "Nurse"))
+PAYMENT_METHODS = ("Cash", "Card", "PhonePay", "GPay")
+
+# Column order of the generated row tuples
+DOCTOR_COLUMNS = ("id", "name", "specialization", "contact_number", "email", "consultation_fee")
+PATIENT_COLUMNS = (
+    "id", "name", "age", "gender", "contact_number", "address", "aadhar_number", "blood_group", "dob", "email",
+    "emergency_contact_name", "emergency_contact_number", "marital_status", "assigned_doctor_id",
+)
+STAFF_COLUMNS = ("id", "user_id", "name", "position", "contact_number", "email")
+USER_COLUMNS = ("id", "username", "hashed_password", "role")
+MEDICINE_COLUMNS = (
+    "id", "name", "description", "stock", "price", "expiry_date", "batch_number", "manufacture_date",
+    "low_stock_threshold", "category", "supplier",
+)
+BATCH_COLUMNS = ("id", "medicine_id", "batch_number", "expiry_date", "manufacture_date", "quantity", "received_date")
+MOVEMENT_COLUMNS = ("medicine_id", "batch_id", "quantity", "reason", "movement_date")
+APPOINTMENT_COLUMNS = ("patient_id", "doctor_id", "appointment_time", "reason", "status")
+MEDICAL_RECORD_COLUMNS = ("patient_id", "doctor_id", "diagnosis", "treatment", "record_date")
+PRESCRIPTION_COLUMNS = ("id", "patient_id", "doctor_id", "prescription_date", "instructions", "status")
+LINE_COLUMNS = ("prescription_id", "medicine_id", "quantity")
+BILL_COLUMNS = ("id", "patient_id", "amount", "paid_amount", "issue_date", "due_date", "status")
+PAYMENT_COLUMNS = ("bill_id", "amount", "payment_method", "payment_date", "notes")
+
+def scaled_counts(patients, **overrides):
+    counts = {
+        "patients": patients,
+        "doctors": max(5, patients // 1000),
+        "medicines": min(5000, max(20, patients // 200)),
+        **{table: int(patients * ratio) for table, ratio in RATIOS.items()},
+    }
+    counts["staff"] = counts["doctors"] * 2
+    counts.update({table: count for table, count in overrides.items() if count is not None})
+    return counts
+
+_POWERS_OF_TEN = [10 ** width for width in range(19)]
+
+def unique_digits(i, width):
+    # i -> width-digit number, a bijection for i below 10**width: looks random, never repeats
+    return str((i * 387420489 + _POWERS_OF_TEN[width - 1]) % _POWERS_OF_TEN[width]).zfill(width)
+
+def _next_id(engine, model):
+    with engine.connect() as conn:
+        return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+def _within(column, ids):
+    # The rows of an id range this run generated
+    return column.between(ids[0], ids[-1]) if ids else false()
+
+def _chunks(ids):
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+def datetime_formatter(dialect):
+    # Row values go to the driver as-is, so dates must already be in the form SQLAlchemy would
+    # send. On SQLite that is text in isoformat(" ", "microseconds") form, produced here several
+    # times faster than by the dialect's bind processor; other drivers take datetime objects.
+    if dialect.name == "sqlite":
+        return lambda value: value.isoformat(" ", "microseconds")
+    return lambda value: value
+
+class TableWriter:
+    # executemany of plain tuples straight on the DBAPI cursor, skipping Core's per-row
+    # parameter handling. Values must be ready for the driver (see datetime_formatter).
+
+    def __init__(self, conn, model, columns):
+        compiled = insert(model.__table__).compile(dialect=conn.dialect, column_keys=list(columns))
+        self.conn = conn
+        self.sql = str(compiled)
+        self.columns = columns
+        self.order = None
+        if conn.dialect.positional and list(compiled.positiontup) != list(columns):
+            # Value order the compiled statement expects, as positions in our tuples
+            self.order = [columns.index(key) for key in compiled.positiontup]
+
+    def write(self, rows):
+        if not rows:
+            return 0
+        if not self.conn.dialect.positional:
+            rows = [dict(zip(self.columns, row)) for row in rows]
+        elif self.order is not None:
+            rows = [tuple(row[n] for n in self.order) for row in rows]
+        self.conn.exec_driver_sql(self.sql, rows)
+        return len(rows)
+
+def _prefetch(items, depth=2):
+    # Produces the next items on a thread while the caller works on the current one. The
+    # sqlite3 module releases the GIL while SQLite runs, so on a multi-core machine row
+    # generation overlaps with the inserts and index builds.
+    queue = Queue(maxsize=depth)
+    done = object()
+
+    def produce():
+        try:
+            for item in items:
+                queue.put(item)
+            queue.put(done)
+        except Exception as e:
+            queue.put(e)
+
+    threading.Thread(target=produce, name="generate-prefetch", daemon=True).start()
+    while True:
+        item = queue.get()
+        if item is done:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+def _write(engine, transactions):
+    # Each transaction is a list of (model, columns, rows); returns the rows written to the first model
+    total = 0
+    for transaction in _prefetch(transactions):
+        with engine.begin() as conn:
+            for n, (model, columns, rows) in enumerate(transaction):
+                written = TableWriter(conn, model, columns).write(rows)
+                if n == 0:
+                    total += written
+    return total
+
+class Generator:
+    # Writes a referentially consistent hospital straight through the engine. Ids are assigned
+    # here, starting after whatever the tables already hold, so related rows can be generated
+    # without reading anything back. Random values are drawn a column at a time per chunk,
+    # which is several times cheaper than drawing them row by row. Each step yields one
+    # transaction per chunk for _write.
+
+    def __init__(self, engine, counts, seed=0, as_of=AS_OF):
+        self.engine = engine
+        self.counts = counts
+        self.rng = random.Random(seed)
+        self.as_of = as_of
+        self.ids = {}
+        self.stamp = datetime_formatter(engine.dialect)
+
+    def id_range(self, name, model, count=None):
+        first = _next_id(self.engine, model)
+        self.ids[name] = range(first, first + (self.counts[name] if count is None else count))
+        return self.ids[name]
+
+    def past(self, days, k):
+        # k random moments in the given number of days before AS_OF, ready to write
+        as_of, stamp = self.as_of, self.stamp
+        return [stamp(as_of - datetime.timedelta(seconds=s)) for s in self.rng.choices(range(days * 86400), k=k)]
+
+    def doctors(self):
+        rng = self.rng
+        for ids in _chunks(self.id_range("doctors", models.Doctor)):
+            k = len(ids)
+            yield [(models.Doctor, DOCTOR_COLUMNS, [
+                (i, f"Dr. {first} {last}", specialization, "9" + unique_digits(i, 9),
+                 f"{first.lower()}.{last.lower()}.{i}@hospital.example", fee)
+                for i, first, last, specialization, fee in zip(
+                    ids, rng.choices(FIRST_NAMES, k=k), rng.choices(LAST_NAMES, k=k),
+                    rng.choices(SPECIALIZATIONS, k=k), rng.choices(FEES, k=k),
+                )
+            ])]
+
+    def patients(self):
+        rng = self.rng
+        doctors = self.ids["doctors"]
+        ages = range(1, 95)
+        # (name, lowercase name) pairs, so emails don't lowercase per row
+        firsts = [(name, name.lower()) for name in FIRST_NAMES]
+        lasts = [(name, name.lower()) for name in LAST_NAMES]
+        # Birthdays by days before AS_OF
+        birthdays = [self.stamp(self.as_of - datetime.timedelta(days=days)) for days in range(95 * 365)]
+        for ids in _chunks(self.id_range("patients", models.Patient)):
+            k = len(ids)
+            rows = []
+            for i, (first, first_lower), (last, last_lower), age, gender, house, street, city, blood_group, day, contact, marital_status, doctor in zip(
+                ids, rng.choices(firsts, k=k), rng.choices(lasts, k=k), rng.choices(ages, k=k),
+                rng.choices(("Male", "Female"), k=k), rng.choices(range(1, 999), k=k), rng.choices(STREETS, k=k),
+                rng.choices(CITIES, k=k), rng.choices(BLOOD_GROUPS, k=k), rng.choices(range(365), k=k),
+                rng.choices(FIRST_NAMES, k=k), rng.choices(MARITAL_STATUSES, k=k), rng.choices(doctors, k=k),
+            ):
+                phone = unique_digits(i, 9)
+                rows.append((
+                    i, f"{first} {last}", age, gender, "8" + phone, f"{house}, {street}, {city}", unique_digits(i, 12),
+                    blood_group, birthdays[age * 365 + day], f"{first_lower}.{last_lower}.{i}@example.com",
+                    f"{contact} {last}", "7" + phone, marital_status if age >= 18 else "Single", doctor,
+                ))
+            yield [(models.Patient, PATIENT_COLUMNS, rows)]
+
+    def staff(self):
+        # One login per staff member, written in the same transaction
+        users = self.id_range("users", models.User, self.counts["staff"])
+        staff_ids = self.id_range("staff", models.Staff)
+        k = len(staff_ids)
+        positions = self.rng.choices(STAFF_POSITIONS, k=k)
+        yield [
+            # Same placeholder scheme as POST /users/
+            (models.User, USER_COLUMNS, [
+                (user_id, f"staff{user_id}", "changeme" + "notreallyhashed", role)
+                for user_id, (_, role) in zip(users, positions)
+            ]),
+            (models.Staff, STAFF_COLUMNS, [
+                (i, user_id, f"{first} {last}", position, "6" + unique_digits(i, 9), f"staff{i}@hospital.example")
+                for i, user_id, (position, _), first, last in zip(
+                    staff_ids, users, positions, self.rng.choices(FIRST_NAMES, k=k), self.rng.choices(LAST_NAMES, k=k),
+                )
+            ]),
+        ]
+
+    def medicines(self):
+        # Every medicine's stock is one batch, opened in the stock ledger as of its manufacture date
+        rng = self.rng
+        as_of, stamp = self.as_of, self.stamp
+        medicine_ids = self.id_range("medicines", models.Medicine)
+        batch_ids = self.id_range("medicine_batches", models.MedicineBatch, len(medicine_ids))
+        for ids in _chunks(medicine_ids):
+            rows, batches, movements = [], [], []
+            for i, age in zip(ids, rng.choices(range(720), k=len(ids))):
+                manufactured = as_of - datetime.timedelta(days=age)
+                base, category = MEDICINES[i % len(MEDICINES)]
+                # A few medicines start at or under their threshold so the low-stock views aren't empty
+                stock = rng.randrange(0, 10) if rng.random() < 0.05 else rng.randrange(200, 5000)
+                expiry, batch_id = stamp(manufactured + datetime.timedelta(days=rng.randrange(180, 1100))), batch_ids[i - medicine_ids[0]]
+                rows.append((
+                    i, f"{base} {rng.choice((5, 10, 20, 50, 100, 250, 500))}mg #{i}", f"{base} ({category.lower()})",
+                    stock, rng.randrange(5, 600), expiry, f"BATCH{i:06d}", stamp(manufactured), 10, category, rng.choice(SUPPLIERS),
+                ))
+                batches.append((batch_id, i, f"BATCH{i:06d}", expiry, stamp(manufactured), stock, stamp(manufactured)))
+                movements.append((i, batch_id, stock, ledger.OPENING, stamp(manufactured)))
+            yield [
+                (models.Medicine, MEDICINE_COLUMNS, rows),
+                (models.MedicineBatch, BATCH_COLUMNS, batches),
+                (models.StockMovement, MOVEMENT_COLUMNS, movements),
+            ]
+
+    def appointments(self):
+        # Each doctor's appointments fill consecutive slots, so none of them overlap. Half lie
+        # before AS_OF (completed or cancelled), half after (scheduled).
+        rng = self.rng
+        patients = self.ids["patients"]
+        doctors = self.ids["doctors"]
+        day_start = datetime.datetime.combine(self.as_of.date(), scheduling.DAY_START)
+        slots_per_day = int((datetime.datetime.combine(self.as_of.date(), scheduling.DAY_END) - day_start) / scheduling.SLOT)
+        per_doctor = -(-self.counts["appointments"] // len(doctors))
+        first_day = day_start - datetime.timedelta(days=per_doctor // slots_per_day // 2)
+        # Every slot time the doctors share, in order, and whether it is still upcoming
+        slot_times = [
+            first_day + datetime.timedelta(days=slot // slots_per_day) + scheduling.SLOT * (slot % slots_per_day)
+            for slot in range(per_doctor)
+        ]
+        slots = [(self.stamp(moment), moment >= self.as_of) for moment in slot_times]
+        reasons = ("Checkup", "Follow-up", "Consultation", "Emergency")
+        for ns in _chunks(range(self.counts["appointments"])):
+            k = len(ns)
+            rows = []
+            for n, patient, reason, roll in zip(ns, rng.choices(patients, k=k), rng.choices(reasons, k=k), [rng.random() for _ in ns]):
+                moment, upcoming = slots[n // len(doctors)]
+                status = "Scheduled" if upcoming else ("Cancelled" if roll < 0.1 else "Completed")
+                rows.append((patient, doctors[n % len(doctors)], moment, reason, status))
+            yield [(models.Appointment, APPOINTMENT_COLUMNS, rows)]
+
+    def medical_records(self):
+        rng = self.rng
+        patients, doctors = self.ids["patients"], self.ids["doctors"]
+        for ns in _chunks(range(self.counts["medical_records"])):
+            k = len(ns)
+            yield [(models.MedicalRecord, MEDICAL_RECORD_COLUMNS, [
+                (patient, doctor, diagnosis, treatment, date)
+                for patient, doctor, (diagnosis, treatment), date in zip(
+                    rng.choices(patients, k=k), rng.choices(doctors, k=k), rng.choices(DIAGNOSES, k=k), self.past(730, k),
+                )
+            ])]
+
+    def prescriptions(self):
+        # Each chunk of prescriptions is written in the same transaction as its medicine lines
+        rng = self.rng
+        patients, doctors, medicines = self.ids["patients"], self.ids["doctors"], self.ids["medicines"]
+        instructions = ("Twice daily after food", "Once daily", "Complete the course", "As needed")
+        per_prescription = min(len(medicines), 3)
+        for ids in _chunks(self.id_range("prescriptions", models.Prescription)):
+            k = len(ids)
+            prescriptions = [
+                (i, patient, doctor, date, instruction, "Pending" if roll < PENDING_PRESCRIPTION_SHARE else "Billed")
+                for i, patient, doctor, date, instruction, roll in zip(
+                    ids, rng.choices(patients, k=k), rng.choices(doctors, k=k), self.past(365, k),
+                    rng.choices(instructions, k=k), [rng.random() for _ in ids],
+                )
+            ]
+            # 1-3 distinct medicines per prescription: a random one and the next ones by id
+            quantities = iter(rng.choices(QUANTITIES, k=k * per_prescription))
+            lines = [
+                (i, medicines[(start + n) % len(medicines)], next(quantities))
+                for i, start, count in zip(ids, rng.choices(range(len(medicines)), k=k), rng.choices(range(1, per_prescription + 1), k=k))
+                for n in range(count)
+            ]
+            yield [(models.Prescription, PRESCRIPTION_COLUMNS, prescriptions), (models.PrescriptionMedicine, LINE_COLUMNS, lines)]
+
+    def bills(self):
+        # Roughly half the bills are paid in full, a quarter in part and a quarter not at all.
+        # paid_amount is always the sum of the bill's payments, and each chunk of bills is
+        # written in the same transaction as its payments.
+        rng = self.rng
+        patients = self.ids["patients"]
+        as_of, stamp = self.as_of, self.stamp
+        month = datetime.timedelta(days=30)
+        for ids in _chunks(self.id_range("bills", models.Bill)):
+            k = len(ids)
+            bills, payments = [], []
+            for i, patient, age, amount, roll in zip(
+                ids, rng.choices(patients, k=k), rng.choices(range(365 * 86400), k=k), rng.choices(range(100, 20000), k=k),
+                [rng.random() for _ in ids],
+            ):
+                issued = as_of - datetime.timedelta(seconds=age)
+                due = issued + month
+                if roll < 0.5:
+                    first = amount // 2 if roll < 0.15 else amount
+                    paid = [first, amount - first] if first < amount else [amount]
+                elif roll < 0.75:
+                    paid = [rng.randrange(1, amount)]
+                else:
+                    paid = []
+                for n, part in enumerate(paid):
+                    payments.append((
+                        i, part, rng.choice(PAYMENT_METHODS),
+                        stamp(min(as_of, issued + datetime.timedelta(days=rng.randrange(1, 20) * (n + 1)))), None,
+                    ))
+                paid_amount = sum(paid)
+                if paid_amount >= amount:
+                    status = "Paid"
+                elif paid:
+                    status = "Partial"
+                else:
+                    status = "Overdue" if due < as_of else "Pending"
+                bills.append((i, patient, amount, paid_amount, stamp(issued), stamp(due), status))
+            yield [(models.Bill, BILL_COLUMNS, bills), (models.Payment, PAYMENT_COLUMNS, payments)]
+
+    def bill_prescriptions(self):
+        # Prescriptions meant to be billed are charged on the patient's first bill issued on or after
+        # them; with no such bill they stay Pending. Each bill dispenses its prescriptions' medicines
+        # from the medicine's batch, recorded as one Dispense movement per medicine as billing does.
+        # The generated stock is what is left on hand, so each batch's opening movement is raised by
+        # what was dispensed from it.
+        prescriptions, bills = models.Prescription.__table__, models.Bill.__table__
+        lines, batches, movements = models.PrescriptionMedicine.__table__, models.MedicineBatch.__table__, models.StockMovement.__table__
+        generated = _within(prescriptions.c.id, self.ids["prescriptions"])
+        later = select(bills.c.id).where(
+            bills.c.patient_id == prescriptions.c.patient_id, bills.c.issue_date >= prescriptions.c.prescription_date
+        ).order_by(bills.c.issue_date, bills.c.id).limit(1).scalar_subquery()
+        with self.engine.begin() as conn:
+            conn.execute(prescriptions.update().where(generated, prescriptions.c.status == "Billed").values(bill_id=later))
+            conn.execute(prescriptions.update().where(generated, prescriptions.c.bill_id.is_(None)).values(status="Pending"))
+            # The fee each bill charged, as billing records it
+            doctors = models.Doctor.__table__
+            conn.execute(prescriptions.update().where(generated, prescriptions.c.bill_id.is_not(None)).values(consultation_fee=func.coalesce(
+                select(doctors.c.consultation_fee).where(doctors.c.id == prescriptions.c.doctor_id).scalar_subquery(),
+                models.DEFAULT_CONSULTATION_FEE,
+            )))
+            conn.execute(insert(movements).from_select(
+                ["medicine_id", "batch_id", "quantity", "reason", "bill_id", "movement_date"],
+                select(
+                    lines.c.medicine_id, batches.c.id, -func.sum(lines.c.quantity), literal(ledger.DISPENSE),
+                    prescriptions.c.bill_id, bills.c.issue_date,
+                ).select_from(lines).join(prescriptions, prescriptions.c.id == lines.c.prescription_id).join(
+                    bills, bills.c.id == prescriptions.c.bill_id
+                ).join(batches, batches.c.medicine_id == lines.c.medicine_id).where(
+                    generated, prescriptions.c.bill_id.is_not(None)
+                ).group_by(prescriptions.c.bill_id, lines.c.medicine_id, batches.c.id, bills.c.issue_date),
+            ))
+            dispensed = movements.alias("dispensed")
+            conn.execute(movements.update().where(
+                movements.c.reason == ledger.OPENING,
+                _within(movements.c.batch_id, self.ids["medicine_batches"]),
+            ).values(quantity=movements.c.quantity - func.coalesce(select(func.sum(dispensed.c.quantity)).where(
+                dispensed.c.batch_id == movements.c.batch_id, dispensed.c.reason == ledger.DISPENSE
+            ).scalar_subquery(), 0)))
+
+    def suspend_indexes(self, tables):
+        # Building an index once after the load is much cheaper than updating it on every insert
+        indexes = [index for model in tables for index in model.__table__.indexes]
+        with self.engine.begin() as conn:
+            for index in indexes:
+                conn.execute(DropIndex(index, if_exists=True))
+        return indexes
+
+    def restore_indexes(self, indexes):
+        with self.engine.begin() as conn:
+            for index in indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+    def run(self, log=print):
+        migrate.upgrade(self.engine)
+        search.suspend_search_index(self.engine)
+        try:
+            # Tables whose indexes are rebuilt after each step, and the step's transactions
+            steps = [
+                ((models.Doctor,), self.doctors),
+                ((models.Patient,), self.patients),
+                ((models.Staff, models.User), self.staff),
+                ((models.Medicine, models.MedicineBatch, models.StockMovement), self.medicines),
+                ((models.Appointment,), self.appointments),
+                ((models.MedicalRecord,), self.medical_records),
+                ((models.Prescription, models.PrescriptionMedicine), self.prescriptions),
+                ((models.Bill, models.Payment), self.bills),
+            ]
+            for tables, step in steps:
+                start = time.perf_counter()
+                indexes = self.suspend_indexes(tables)
+                try:
+                    count = _write(self.engine, step())
+                finally:
+                    self.restore_indexes(indexes)
+                log(f"{tables[0].__tablename__}: {count} rows in {time.perf_counter() - start:.1f}s")
+            start = time.perf_counter()
+            self.bill_prescriptions()
+            log(f"prescriptions billed and dispensed in {time.perf_counter() - start:.1f}s")
+            start = time.perf_counter()
+            analytics.rebuild(self.engine)
+            log(f"analytics rollups rebuilt in {time.perf_counter() - start:.1f}s")
+        finally:
+            start = time.perf_counter()
+            search.rebuild_search_index(self.engine)
+            log(f"search index rebuilt in {time.perf_counter() - start:.1f}s")
+        return self.ids
+
+def generate(engine, counts, seed=0, as_of=AS_OF, log=print):
+    return Generator(engine, counts, seed, as_of).run(log)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m backend.generate", description="Fill a database with synthetic hospital data.")
+    parser.add_argument("--patients", type=int, default=1000)
+    for table in ("doctors", "medicines", "staff", *RATIOS):
+        parser.add_argument(f"--{table.replace('_', '-')}", type=int, help="default: scaled to --patients")
+    parser.add_argument("--seed", type=int, default=0, help="the same seed always produces the same data")
+    parser.add_argument("--database-url", default=database.SQLALCHEMY_DATABASE_URL)
+    args = parser.parse_args(argv)
+
+    counts = scaled_counts(args.patients, **{table: getattr(args, table) for table in ("doctors", "medicines", "staff", *RATIOS)})
+    engine = database.create_engine(args.database_url, pragmas=BULK_PRAGMAS)
+    start = time.perf_counter()
+    generate(engine, counts, args.seed)
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+    engine.dispose()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
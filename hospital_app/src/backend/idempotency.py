@@ -0,0 +1,26 @@
+import hashlib
+import json
+
+from . import models
+
+# Idempotency-Key support for write endpoints. The stored response is written in the same
+# transaction as the write it describes, and (scope, key) is unique, so of two concurrent
+# requests with one key exactly one commits; the other finds its response and replays it.
+
+MAX_KEY_LENGTH = 255
+
+def fingerprint(body):
+    # Stable hash of the request body, to tell a retry from a different request reusing the key
+    return hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()
+
+def lookup(db, scope, key):
+    # (request hash, stored response) for a key already used in this scope, or None
+    row = db.query(models.IdempotencyKey.request_hash, models.IdempotencyKey.response).filter(
+        models.IdempotencyKey.scope == scope, models.IdempotencyKey.key == key
+    ).first()
+    if row is None:
+        return None
+    return row.request_hash, json.loads(row.response)
+
+def save(db, scope, key, request_hash, response):
+    db.add(models.IdempotencyKey(scope=scope, key=key, request_hash=request_hash, response=json.dumps(response)))
@@ -0,0 +1,148 @@
+import asyncio
+import datetime
+import json
+import os
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_, select
+
+from . import database, models
+from .cache import response_cache
+
+# Medicines expiring within this many days are alerts on the stream
+EXPIRY_ALERT_DAYS = int(os.environ.get("EXPIRY_ALERT_DAYS", 30))
+# The expiry window moves with the clock, so alerts are also recomputed this often without any writes
+REFRESH_SECONDS = int(os.environ.get("INVENTORY_ALERT_REFRESH_SECONDS", 60))
+KEEPALIVE_SECONDS = 15
+# Events buffered per subscriber; a client that falls further behind gets a fresh snapshot instead
+SUBSCRIBER_BUFFER = 100
+
+ALERT_COLUMNS = (
+    models.Medicine.id,
+    models.Medicine.name,
+    models.Medicine.stock,
+    models.Medicine.low_stock_threshold,
+    models.Medicine.low_stock,
+    models.Medicine.expiry_date,
+    models.Medicine.batch_number,
+)
+
+def expiry_threshold(days=EXPIRY_ALERT_DAYS):
+    return datetime.datetime.utcnow() + datetime.timedelta(days=days)
+
+def alert_clause(threshold):
+    # Each side is served by its own index (ix_medicines_low_stock, ix_medicines_expiry_date)
+    return or_(models.Medicine.low_stock, models.Medicine.expiry_date <= threshold)
+
+def load_alerts(engine):
+    threshold = expiry_threshold()
+    with engine.connect() as conn:
+        rows = conn.execute(select(*ALERT_COLUMNS).where(alert_clause(threshold))).mappings().all()
+    alerts = {}
+    for row in rows:
+        alert = dict(row)
+        alert["low_stock"] = bool(row["low_stock"])
+        alert["expiring"] = row["expiry_date"] is not None and row["expiry_date"] <= threshold
+        alert["expiry_date"] = row["expiry_date"].isoformat() if row["expiry_date"] else None
+        alerts[row["id"]] = alert
+    return alerts
+
+def diff(previous, current):
+    events = []
+    for medicine_id, alert in current.items():
+        if previous.get(medicine_id) != alert:
+            events.append(("alert", alert))
+    for medicine_id in previous.keys() - current.keys():
+        events.append(("cleared", {"id": medicine_id}))
+    return events
+
+def format_event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+class AlertBroadcaster:
+    # One refresh loop per worker recomputes the alert set (a small, index-served query) when
+    # medicine stock changes, and pushes only the rows that entered, changed or left it to every
+    # subscribed stream. Nothing runs while no stream is open.
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.alerts = {}
+        self.subscribers = set()
+        self.loop = None
+        self.wake = None
+        self.task = None
+
+    def notify(self):
+        # Safe to call from any thread, e.g. sync handlers on the threadpool
+        loop = self.loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self.wake.set)
+
+    async def refresh(self):
+        current = await run_in_threadpool(load_alerts, self.engine)
+        events = diff(self.alerts, current)
+        self.alerts = current
+        for queue in self.subscribers:
+            for event in events:
+                try:
+                    queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    # Too far behind to catch up event by event: start it over from the current state
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait(("snapshot", list(current.values())))
+                    break
+
+    async def run(self):
+        while self.subscribers:
+            try:
+                await asyncio.wait_for(self.wake.wait(), REFRESH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self.wake.clear()
+            if self.subscribers:
+                await self.refresh()
+
+    async def subscribe(self):
+        if self.loop is not asyncio.get_running_loop():
+            self.loop = asyncio.get_running_loop()
+            self.wake = asyncio.Event()
+            self.task = None
+        queue = asyncio.Queue(SUBSCRIBER_BUFFER)
+        if self.task is None or self.task.done():
+            await self.refresh()
+            self.subscribers.add(queue)
+            self.task = asyncio.create_task(self.run())
+        else:
+            self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+        if not self.subscribers and self.wake is not None:
+            # Let the refresh loop see there is nobody left and exit
+            self.notify()
+
+    async def stream(self, request):
+        queue = await self.subscribe()
+        try:
+            yield format_event("snapshot", list(self.alerts.values()))
+            while not await request.is_disconnected():
+                try:
+                    name, data = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment line: keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_event(name, data)
+        finally:
+            self.unsubscribe(queue)
+
+alerts = AlertBroadcaster(database.engine)
+
+def _on_remote_invalidate(namespaces):
+    # Another worker changed medicines; its subscribers are served by its own loop
+    if namespaces is None or "medicines" in namespaces:
+        alerts.notify()
+
+response_cache.on_remote_invalidate(_on_remote_invalidate)
@@ -0,0 +1,224 @@
+import asyncio
+import datetime
+import logging
+import os
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import inventory, ledger, models, search
+from .cache import response_cache
+
+# Background jobs run inside the API process. Their schedule and progress live in the jobs
+# table, so a restart picks up where the last run stopped, and with several workers a lease
+# makes sure each run happens on one worker only. Every job works in bounded chunks, each in
+# its own short transaction on the threadpool, with a pause in between so the database is
+# never held away from requests for long.
+JOBS_ENABLED = os.environ.get("JOBS_ENABLED", "1").lower() in ("1", "true", "yes")
+CHUNK_SIZE = int(os.environ.get("JOB_CHUNK_SIZE", 1000))
+CHUNK_PAUSE = int(os.environ.get("JOB_CHUNK_PAUSE_MS", 50)) / 1000
+POLL_SECONDS = 30
+LEASE = datetime.timedelta(minutes=5)
+
+# Scheduled appointments this long past their time are taken to have happened
+APPOINTMENT_COMPLETE_AFTER = datetime.timedelta(hours=int(os.environ.get("APPOINTMENT_AUTO_COMPLETE_HOURS", 24)))
+IDEMPOTENCY_KEY_RETENTION = datetime.timedelta(hours=int(os.environ.get("IDEMPOTENCY_KEY_RETENTION_HOURS", 72)))
+# Pages of FTS5 segments merged per chunk of index maintenance
+MERGE_PAGES = 64
+
+logger = logging.getLogger("backend.jobs")
+
+Job = models.Job
+
+# A step runs one chunk of a job and returns (rows processed, cursor). The cursor is None once
+# the run is complete; otherwise it is stored and handed to the next step, also after a restart.
+# Steps that need no position return 0 to ask for another chunk.
+
+def sweep_overdue_bills(engine, cursor):
+    # Unpaid bills past their due date; partially paid ones stay Partial
+    bills = models.Bill.__table__
+    due = select(bills.c.id).where(
+        bills.c.status == "Pending", bills.c.due_date < datetime.datetime.utcnow(), bills.c.amount > 0
+    ).limit(CHUNK_SIZE)
+    with engine.begin() as conn:
+        swept = conn.execute(bills.update().where(bills.c.id.in_(due)).values(status="Overdue")).rowcount
+    return swept, 0 if swept == CHUNK_SIZE else None
+
+def complete_appointments(engine, cursor):
+    appointments = models.Appointment.__table__
+    past = select(appointments.c.id).where(
+        appointments.c.status == "Scheduled",
+        appointments.c.appointment_time < datetime.datetime.utcnow() - APPOINTMENT_COMPLETE_AFTER,
+    ).limit(CHUNK_SIZE)
+    with engine.begin() as conn:
+        completed = conn.execute(appointments.update().where(appointments.c.id.in_(past)).values(status="Completed")).rowcount
+    if completed:
+        response_cache.invalidate("appointments", "dashboard")
+    return completed, 0 if completed == CHUNK_SIZE else None
+
+def recompute_expiry_alerts(engine, cursor):
+    # Re-points every medicine at its next batch to expire, a chunk of medicines at a time, then
+    # pushes the result to the alert streams: the expiry window moves even when stock doesn't
+    with Session(bind=engine) as db:
+        ids = db.scalars(
+            select(models.Medicine.id).where(models.Medicine.id > (cursor or 0)).order_by(models.Medicine.id).limit(CHUNK_SIZE)
+        ).all()
+        if ids:
+            ledger.refresh_next_batch(db, ids)
+            db.commit()
+    if len(ids) == CHUNK_SIZE:
+        return len(ids), ids[-1]
+    response_cache.invalidate("medicines", "dashboard")
+    inventory.alerts.notify()
+    return len(ids), None
+
+def maintain_indexes(engine, cursor):
+    # First chunk refreshes the planner statistics; the rest merge the search index a step at a time
+    if cursor is None:
+        if engine.dialect.name == "sqlite":
+            with engine.connect() as conn:
+                conn.exec_driver_sql("PRAGMA optimize")
+        return 0, 0
+    if search.merge_search_index(engine, MERGE_PAGES):
+        return MERGE_PAGES, cursor + 1
+    return 0, None
+
+def prune_idempotency_keys(engine, cursor):
+    keys = models.IdempotencyKey.__table__
+    expired = select(keys.c.id).where(
+        keys.c.created_at < datetime.datetime.utcnow() - IDEMPOTENCY_KEY_RETENTION
+    ).limit(CHUNK_SIZE)
+    with engine.begin() as conn:
+        pruned = conn.execute(delete(keys).where(keys.c.id.in_(expired))).rowcount
+    return pruned, 0 if pruned == CHUNK_SIZE else None
+
+# name: (how often it runs, step)
+JOBS = {
+    "overdue_bills": (datetime.timedelta(minutes=15), sweep_overdue_bills),
+    "complete_appointments": (datetime.timedelta(minutes=15), complete_appointments),
+    "expiry_alerts": (datetime.timedelta(hours=1), recompute_expiry_alerts),
+    "index_maintenance": (datetime.timedelta(days=1), maintain_indexes),
+    "idempotency_keys": (datetime.timedelta(hours=1), prune_idempotency_keys),
+}
+
+class Scheduler:
+    def __init__(self, engine, jobs=JOBS):
+        self.engine = engine
+        self.jobs = jobs
+        self.wake = asyncio.Event()
+        self.loop = None
+        self.task = None
+
+    def register(self):
+        # A row per job, due now the first time the application starts
+        with self.engine.begin() as conn:
+            existing = set(conn.scalars(select(Job.name)))
+            missing = [
+                {"name": name, "status": "Idle", "next_run_at": datetime.datetime.utcnow()}
+                for name in self.jobs if name not in existing
+            ]
+            if missing:
+                try:
+                    conn.execute(insert(Job), missing)
+                except IntegrityError:
+                    # Another worker registered them at the same moment
+                    pass
+
+    def claim(self, name):
+        # Takes a due job unless a live lease says another worker is running it. Returns
+        # (claimed, cursor to resume from).
+        now = datetime.datetime.utcnow()
+        with self.engine.begin() as conn:
+            claimed = conn.execute(
+                update(Job)
+                .where(Job.name == name, Job.next_run_at <= now)
+                .where((Job.status != "Running") | (Job.lease_expires_at < now))
+                .values(status="Running", lease_expires_at=now + LEASE, last_started_at=now)
+            ).rowcount
+            if not claimed:
+                return False, None
+            return True, conn.execute(select(Job.cursor).where(Job.name == name)).scalar()
+
+    def checkpoint(self, name, cursor):
+        with self.engine.begin() as conn:
+            conn.execute(update(Job).where(Job.name == name).values(cursor=cursor, lease_expires_at=datetime.datetime.utcnow() + LEASE))
+
+    def finish(self, name, processed, error=None):
+        # A failed run keeps its cursor and is retried, from there, at the next interval
+        now = datetime.datetime.utcnow()
+        values = {
+            "status": "Failed" if error else "Idle",
+            "lease_expires_at": None,
+            "next_run_at": now + self.jobs[name][0],
+            "last_finished_at": now,
+            "last_processed": processed,
+            "last_error": error,
+        }
+        if error is None:
+            values["cursor"] = None
+        with self.engine.begin() as conn:
+            conn.execute(update(Job).where(Job.name == name).values(**values))
+
+    def release(self, name, cursor):
+        # Shutting down mid-run: leave the job due so the next start resumes it straight away
+        with self.engine.begin() as conn:
+            conn.execute(update(Job).where(Job.name == name).values(status="Idle", lease_expires_at=None, cursor=cursor))
+
+    async def execute(self, name, cursor):
+        step = self.jobs[name][1]
+        processed = 0
+        try:
+            while True:
+                count, cursor = await run_in_threadpool(step, self.engine, cursor)
+                processed += count
+                if cursor is None:
+                    break
+                await run_in_threadpool(self.checkpoint, name, cursor)
+                await asyncio.sleep(CHUNK_PAUSE)
+        except asyncio.CancelledError:
+            self.release(name, cursor)
+            raise
+        except Exception as e:
+            logger.exception("Job %s failed", name)
+            await run_in_threadpool(self.finish, name, processed, str(e))
+            return
+        await run_in_threadpool(self.finish, name, processed)
+        logger.info("Job %s processed %d rows", name, processed)
+
+    async def run(self):
+        await run_in_threadpool(self.register)
+        while True:
+            for name in self.jobs:
+                claimed, cursor = await run_in_threadpool(self.claim, name)
+                if claimed:
+                    await self.execute(name, cursor)
+            try:
+                await asyncio.wait_for(self.wake.wait(), POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self.wake.clear()
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def run_now(self, db, name):
+        # Makes a job due immediately; returns False for an unknown job
+        if name not in self.jobs:
+            return False
+        db.execute(update(Job).where(Job.name == name).values(next_run_at=datetime.datetime.utcnow()))
+        db.commit()
+        if self.task is not None:
+            self.loop.call_soon_threadsafe(self.wake.set)
+        return True
@@ -0,0 +1,134 @@
+import datetime
+
+from sqlalchemy import bindparam, func, insert, literal, select, update
+
+from . import models
+from .database import begin
+
+# Reasons recorded on stock movements
+OPENING = "Opening"
+RECEIPT = "Receipt"
+DISPENSE = "Dispense"
+ADJUSTMENT = "Adjustment"
+
+Batch = models.MedicineBatch
+Medicine = models.Medicine
+
+# Stock is kept in three places that always move in the same transaction: the batch quantity,
+# the medicine's stock (the on-hand balance, so reads never sum batches) and an appended
+# stock_movements row. The ledger is insert-only, so auditing it never holds locks on medicines.
+
+def movement(medicine_id, batch_id, quantity, reason, bill_id=None):
+    return {"medicine_id": medicine_id, "batch_id": batch_id, "quantity": quantity, "reason": reason, "bill_id": bill_id}
+
+def record(db, movements):
+    if movements:
+        db.execute(insert(models.StockMovement), movements)
+
+def _next_batch(column):
+    # Value from the medicine's first batch to expire that still has stock; unchanged once all run out
+    first = select(column).where(
+        Batch.medicine_id == Medicine.id, Batch.quantity > 0
+    ).order_by(Batch.expiry_date, Batch.id).limit(1).scalar_subquery()
+    return func.coalesce(first, getattr(Medicine, column.key))
+
+def refresh_next_batch(db, medicine_ids):
+    # Points each medicine's batch_number and expiry_date at the batch that dispenses next,
+    # so the list views and expiry alerts follow the stock that is actually on the shelf
+    db.execute(
+        update(Medicine)
+        .where(Medicine.id.in_(medicine_ids))
+        .values(batch_number=_next_batch(Batch.batch_number), expiry_date=_next_batch(Batch.expiry_date)),
+        execution_options={"synchronize_session": False},
+    )
+
+def open_batch(db, medicine):
+    # A new medicine's stock becomes its first batch
+    batch = Batch(
+        medicine_id=medicine.id, batch_number=medicine.batch_number, expiry_date=medicine.expiry_date,
+        manufacture_date=medicine.manufacture_date, quantity=medicine.stock or 0,
+    )
+    db.add(batch)
+    db.flush()
+    record(db, [movement(medicine.id, batch.id, batch.quantity, OPENING)])
+    return batch
+
+def open_missing_batches(bind):
+    # Medicines written outside the API (bulk imports, databases from before the ledger) get an
+    # opening batch holding their current stock, so every unit on hand belongs to a batch
+    with begin(bind) as conn:
+        last_batch = conn.execute(select(func.max(Batch.id))).scalar() or 0
+        now = datetime.datetime.utcnow()
+        conn.execute(insert(Batch).from_select(
+            ["medicine_id", "batch_number", "expiry_date", "manufacture_date", "quantity", "received_date"],
+            select(
+                Medicine.id, Medicine.batch_number, Medicine.expiry_date, Medicine.manufacture_date,
+                func.coalesce(Medicine.stock, 0), literal(now, models.MedicineBatch.received_date.type),
+            ).where(~select(Batch.id).where(Batch.medicine_id == Medicine.id).exists()),
+        ))
+        conn.execute(insert(models.StockMovement).from_select(
+            ["medicine_id", "batch_id", "quantity", "reason", "movement_date"],
+            select(
+                Batch.medicine_id, Batch.id, Batch.quantity, literal(OPENING),
+                literal(now, models.StockMovement.movement_date.type),
+            ).where(Batch.id > last_batch),
+        ))
+
+def find_batch(db, medicine_id, batch_number):
+    return db.query(Batch).filter(Batch.medicine_id == medicine_id, Batch.batch_number == batch_number).first()
+
+def adjust(db, batch, quantity, reason):
+    # Moves one batch (and its medicine's balance) by a signed quantity; False if that would
+    # take the batch below zero
+    moved = db.execute(
+        update(Batch).where(Batch.id == batch.id, Batch.quantity + quantity >= 0).values(quantity=Batch.quantity + quantity),
+        execution_options={"synchronize_session": False},
+    ).rowcount
+    if not moved:
+        return False
+    db.execute(
+        update(Medicine).where(Medicine.id == batch.medicine_id).values(stock=func.coalesce(Medicine.stock, 0) + quantity),
+        execution_options={"synchronize_session": False},
+    )
+    record(db, [movement(batch.medicine_id, batch.id, quantity, reason)])
+    refresh_next_batch(db, [batch.medicine_id])
+    return True
+
+def allocate(db, required):
+    # First-expiry-first-out allocation of {medicine_id: quantity}. One read over the drugs'
+    # batches in stock, in ix_medicine_batches_fefo order, so the work per drug is bounded by
+    # its batch count. Returns [(medicine_id, batch_id, quantity, left in batch)], or None if
+    # stock is short.
+    remaining = dict(required)
+    allocations = []
+    batches = db.execute(
+        select(Batch.medicine_id, Batch.id, Batch.quantity)
+        .where(Batch.medicine_id.in_(required), Batch.quantity > 0)
+        .order_by(Batch.medicine_id, Batch.expiry_date, Batch.id)
+    )
+    for medicine_id, batch_id, available in batches:
+        if remaining[medicine_id] > 0:
+            taken = min(remaining[medicine_id], available)
+            allocations.append((medicine_id, batch_id, taken, available - taken))
+            remaining[medicine_id] -= taken
+    if any(quantity > 0 for quantity in remaining.values()):
+        return None
+    return allocations
+
+def take(db, allocations):
+    # Atomic per-batch decrement; False if another transaction took from the same batches first
+    batches = Batch.__table__
+    taken = db.connection().execute(
+        batches.update()
+        .where(batches.c.id == bindparam("batch_id"), batches.c.quantity >= bindparam("take"))
+        .values(quantity=batches.c.quantity - bindparam("take")),
+        [{"batch_id": batch_id, "take": quantity} for _, batch_id, quantity, _ in allocations],
+    ).rowcount
+    return taken == len(allocations)
+
+def emptied(allocations):
+    # Medicines whose next batch changes because dispensing used one up
+    return {medicine_id for medicine_id, _, _, left in allocations if left == 0}
+
+def dispensed(allocations, bill_id):
+    return [movement(medicine_id, batch_id, -quantity, DISPENSE, bill_id) for medicine_id, batch_id, quantity, _ in allocations]
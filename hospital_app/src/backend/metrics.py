@@ -0,0 +1,161 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+# Statements slower than this are logged with their SQL; 0 turns the log off
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 0))
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger("backend.sql")
+
+class RequestStats:
+    def __init__(self):
+        self.statements = 0
+        self.sql_seconds = 0.0
+
+# Set by the middleware for the duration of a request. Sync handlers run on the threadpool
+# with a copy of the request's context, so they see (and update) the same RequestStats.
+current_request = contextvars.ContextVar("current_request", default=None)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Registry:
+    # Prometheus-style counters and latency histograms, keyed by route template (not raw path)
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.latency = {}
+        self.requests = {}
+        self.sql = {}
+        self.statements_total = 0
+        self.sql_seconds_total = 0.0
+        self.slow_queries_total = 0
+
+    def observe_request(self, method, route, status, seconds, stats):
+        with self.lock:
+            key = (method, route)
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+            self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+            statements, sql_seconds = self.sql.get(key, (0, 0.0))
+            self.sql[key] = (statements + stats.statements, sql_seconds + stats.sql_seconds)
+
+    def observe_statement(self, seconds, slow):
+        with self.lock:
+            self.statements_total += 1
+            self.sql_seconds_total += seconds
+            if slow:
+                self.slow_queries_total += 1
+
+    def render(self):
+        with self.lock:
+            lines = [
+                "# HELP http_request_duration_seconds Request latency by route.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), (counts, total, count) in sorted(self.latency.items()):
+                labels = f'method="{method}",route="{_escape(route)}"'
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {bucket_count}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {total}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {count}")
+
+            lines += ["# HELP http_requests_total Requests by route and status.", "# TYPE http_requests_total counter"]
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {count}')
+
+            lines += ["# HELP http_request_sql_statements_total SQL statements issued while serving a route.", "# TYPE http_request_sql_statements_total counter"]
+            for (method, route), (statements, _) in sorted(self.sql.items()):
+                lines.append(f'http_request_sql_statements_total{{method="{method}",route="{_escape(route)}"}} {statements}')
+
+            lines += ["# HELP http_request_sql_seconds_total Time spent in SQL while serving a route.", "# TYPE http_request_sql_seconds_total counter"]
+            for (method, route), (_, sql_seconds) in sorted(self.sql.items()):
+                lines.append(f'http_request_sql_seconds_total{{method="{method}",route="{_escape(route)}"}} {sql_seconds}')
+
+            lines += [
+                "# HELP db_statements_total SQL statements executed, including outside requests.",
+                "# TYPE db_statements_total counter",
+                f"db_statements_total {self.statements_total}",
+                "# HELP db_statement_seconds_total Time spent executing SQL statements.",
+                "# TYPE db_statement_seconds_total counter",
+                f"db_statement_seconds_total {self.sql_seconds_total}",
+                "# HELP db_slow_statements_total Statements slower than SLOW_QUERY_MS.",
+                "# TYPE db_slow_statements_total counter",
+                f"db_slow_statements_total {self.slow_queries_total}",
+            ]
+            return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+def instrument_engine(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_start_time"].pop()
+        stats = current_request.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.sql_seconds += seconds
+        slow = SLOW_QUERY_MS > 0 and seconds * 1000 >= SLOW_QUERY_MS
+        if slow:
+            logger.warning("Slow query (%.1f ms): %s", seconds * 1000, statement)
+        registry.observe_statement(seconds, slow)
+
+class MetricsMiddleware:
+    # Pure ASGI so streamed responses (exports, SSE) pass straight through
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                total_ms = (time.perf_counter() - start) * 1000
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f'app;dur={total_ms:.1f}, db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.statements} queries"',
+                )
+                headers.append("Timing-Allow-Origin", "*")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request.reset(token)
+            route = scope.get("route")
+            registry.observe_request(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status,
+                time.perf_counter() - start,
+                stats,
+            )
@@ -0,0 +1,94 @@
+import argparse
+import logging
+import os
+import sys
+
+from . import database
+
+# Versioned schema migrations (Alembic, scripts in backend/migrations/versions). They run as a
+# deploy step, `python -m backend.migrate upgrade`, never when a worker starts: the API only
+# checks that the database is at the revision its code expects.
+MIGRATIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+def alembic_config(url=database.SQLALCHEMY_DATABASE_URL, connection=None):
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS)
+    # ConfigParser interpolation would read a % in the URL (an escaped password) as a reference
+    config.set_main_option("sqlalchemy.url", url.replace("%", "%%"))
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+def head_revision():
+    from alembic.script import ScriptDirectory
+
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+def current_revision(conn):
+    from alembic.runtime.migration import MigrationContext
+
+    return MigrationContext.configure(conn).get_current_revision()
+
+def upgrade(engine, revision="head"):
+    from alembic import command
+
+    with engine.connect() as conn:
+        # Databases from before migrations have no alembic_version yet and run every revision;
+        # those only add what is missing (see 0001)
+        command.upgrade(alembic_config(engine.url.render_as_string(hide_password=False), conn), revision)
+        conn.commit()
+
+def check(engine):
+    # Raised at startup rather than failing later on a missing table or column
+    with engine.connect() as conn:
+        current = current_revision(conn)
+    head = head_revision()
+    if current != head:
+        raise RuntimeError(
+            f"Database schema is at revision {current or 'none'}, this code needs {head}. "
+            "Run `python -m backend.migrate upgrade` first."
+        )
+
+def main(argv=None):
+    from alembic import command
+
+    parser = argparse.ArgumentParser(prog="python -m backend.migrate", description="Apply or inspect schema migrations.")
+    parser.add_argument("--database-url", default=database.SQLALCHEMY_DATABASE_URL)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("upgrade", help="migrate to the latest revision, or --revision").add_argument("--revision", default="head")
+    commands.add_parser("downgrade", help="migrate back to a revision").add_argument("revision")
+    commands.add_parser("current", help="show the database's revision")
+    commands.add_parser("history", help="list the revisions")
+    revision = commands.add_parser("revision", help="create a new migration script")
+    revision.add_argument("-m", "--message", required=True)
+    revision.add_argument("--autogenerate", action="store_true", help="diff the models against the database")
+    args = parser.parse_args(argv)
+    # Alembic reports each revision it runs through its logger
+    logging.basicConfig(format="%(message)s")
+    logging.getLogger("alembic").setLevel(logging.INFO)
+
+    if args.command == "history":
+        command.history(alembic_config(args.database_url))
+        return 0
+    engine = database.create_engine(args.database_url)
+    try:
+        if args.command == "upgrade":
+            upgrade(engine, args.revision)
+        else:
+            with engine.connect() as conn:
+                config = alembic_config(args.database_url, conn)
+                if args.command == "downgrade":
+                    command.downgrade(config, args.revision)
+                elif args.command == "current":
+                    command.current(config, verbose=True)
+                else:
+                    command.revision(config, message=args.message, autogenerate=args.autogenerate)
+                conn.commit()
+    finally:
+        engine.dispose()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
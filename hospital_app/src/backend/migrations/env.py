@@ -0,0 +1,44 @@
+from alembic import context
+
+from backend import database, models, search
+
+config = context.config
+target_metadata = models.Base.metadata
+
+# The FTS5 search tables (and the shadow tables FTS5 keeps next to them) are created by
+# search.py, not declared on the models, so autogenerate must not try to drop them
+SEARCH_PREFIXES = tuple(fts_table for fts_table, _ in search.SEARCH_TABLES.values())
+
+def include_object(object, name, type_, reflected, compare_to):
+    return not (type_ == "table" and reflected and compare_to is None and name.startswith(SEARCH_PREFIXES))
+
+def configure(**kwargs):
+    # Batch mode lets autogenerated migrations alter SQLite tables by copying them
+    context.configure(target_metadata=target_metadata, include_object=include_object, render_as_batch=True, **kwargs)
+
+def run_migrations_offline():
+    configure(url=config.get_main_option("sqlalchemy.url"), literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations(connection):
+    configure(connection=connection)
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    # migrate.py hands over its own connection; the alembic command line gets an engine here
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        run_migrations(connection)
+        return
+    engine = database.create_engine(config.get_main_option("sqlalchemy.url"))
+    with engine.connect() as connection:
+        run_migrations(connection)
+        connection.commit()
+    engine.dispose()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
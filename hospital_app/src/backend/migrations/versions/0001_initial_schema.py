@@ -0,0 +1,185 @@
+"""Initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+The tables as the first releases created them with create_all. Databases from before there
+were migrations were created at whatever version was running, so here a table that exists
+already only gets the columns and indexes it is missing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def add_column(table, column):
+    # SQLite can add a column with a REFERENCES clause, but not the separate foreign key
+    # constraint Alembic adds it with
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite" or not column.foreign_keys:
+        op.add_column(table, column)
+        return
+    target_table, target_column = next(iter(column.foreign_keys)).target_fullname.split(".")
+    spec = sa.schema.CreateColumn(column).compile(dialect=bind.dialect)
+    op.execute(f"ALTER TABLE {table} ADD COLUMN {spec} REFERENCES {target_table} ({target_column})")
+
+def ensure_table(name, *columns):
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(name):
+        op.create_table(name, *columns)
+        return
+    existing = {column["name"] for column in inspector.get_columns(name)}
+    for column in columns:
+        if column.name not in existing:
+            add_column(name, column)
+
+def upgrade():
+    ensure_table(
+        "users",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("username", sa.String),
+        sa.Column("hashed_password", sa.String),
+        sa.Column("role", sa.String),
+    )
+    op.create_index("ix_users_id", "users", ["id"], if_not_exists=True)
+    op.create_index("ix_users_username", "users", ["username"], unique=True, if_not_exists=True)
+
+    ensure_table(
+        "doctors",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("name", sa.String),
+        sa.Column("specialization", sa.String),
+        sa.Column("contact_number", sa.String),
+        sa.Column("email", sa.String),
+        sa.Column("consultation_fee", sa.Integer),
+    )
+    op.create_index("ix_doctors_id", "doctors", ["id"], if_not_exists=True)
+    op.create_index("ix_doctors_name", "doctors", ["name"], if_not_exists=True)
+    op.create_index("ix_doctors_contact_number", "doctors", ["contact_number"], unique=True, if_not_exists=True)
+    op.create_index("ix_doctors_email", "doctors", ["email"], unique=True, if_not_exists=True)
+
+    ensure_table(
+        "patients",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("name", sa.String),
+        sa.Column("age", sa.Integer),
+        sa.Column("gender", sa.String),
+        sa.Column("contact_number", sa.String),
+        sa.Column("address", sa.String),
+        sa.Column("aadhar_number", sa.String),
+        sa.Column("blood_group", sa.String),
+        sa.Column("dob", sa.DateTime),
+        sa.Column("email", sa.String),
+        sa.Column("emergency_contact_name", sa.String),
+        sa.Column("emergency_contact_number", sa.String),
+        sa.Column("marital_status", sa.String),
+        sa.Column("assigned_doctor_id", sa.Integer, sa.ForeignKey("doctors.id")),
+    )
+    op.create_index("ix_patients_id", "patients", ["id"], if_not_exists=True)
+    op.create_index("ix_patients_name", "patients", ["name"], if_not_exists=True)
+    op.create_index("ix_patients_contact_number", "patients", ["contact_number"], if_not_exists=True)
+    op.create_index("ix_patients_aadhar_number", "patients", ["aadhar_number"], unique=True, if_not_exists=True)
+
+    ensure_table(
+        "staff",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id")),
+        sa.Column("name", sa.String),
+        sa.Column("position", sa.String),
+        sa.Column("contact_number", sa.String),
+        sa.Column("email", sa.String),
+    )
+    op.create_index("ix_staff_id", "staff", ["id"], if_not_exists=True)
+    op.create_index("ix_staff_email", "staff", ["email"], unique=True, if_not_exists=True)
+
+    ensure_table(
+        "appointments",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("patient_id", sa.Integer, sa.ForeignKey("patients.id")),
+        sa.Column("doctor_id", sa.Integer, sa.ForeignKey("doctors.id")),
+        sa.Column("appointment_time", sa.DateTime),
+        sa.Column("reason", sa.String),
+        sa.Column("status", sa.String),
+    )
+    op.create_index("ix_appointments_id", "appointments", ["id"], if_not_exists=True)
+
+    ensure_table(
+        "medical_records",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("patient_id", sa.Integer, sa.ForeignKey("patients.id")),
+        sa.Column("doctor_id", sa.Integer, sa.ForeignKey("doctors.id")),
+        sa.Column("diagnosis", sa.String),
+        sa.Column("treatment", sa.String),
+        sa.Column("record_date", sa.DateTime),
+    )
+    op.create_index("ix_medical_records_id", "medical_records", ["id"], if_not_exists=True)
+
+    ensure_table(
+        "medicines",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("name", sa.String),
+        sa.Column("description", sa.String),
+        sa.Column("stock", sa.Integer),
+        sa.Column("price", sa.Integer),
+        sa.Column("expiry_date", sa.DateTime),
+        sa.Column("batch_number", sa.String),
+        sa.Column("manufacture_date", sa.DateTime),
+        sa.Column("low_stock_threshold", sa.Integer),
+        sa.Column("category", sa.String),
+        sa.Column("supplier", sa.String),
+    )
+    op.create_index("ix_medicines_id", "medicines", ["id"], if_not_exists=True)
+    op.create_index("ix_medicines_name", "medicines", ["name"], unique=True, if_not_exists=True)
+    op.create_index("ix_medicines_batch_number", "medicines", ["batch_number"], if_not_exists=True)
+    op.create_index("ix_medicines_category", "medicines", ["category"], if_not_exists=True)
+
+    ensure_table(
+        "prescriptions",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("patient_id", sa.Integer, sa.ForeignKey("patients.id")),
+        sa.Column("doctor_id", sa.Integer, sa.ForeignKey("doctors.id")),
+        sa.Column("prescription_date", sa.DateTime),
+        sa.Column("instructions", sa.String),
+        sa.Column("status", sa.String),
+    )
+    op.create_index("ix_prescriptions_id", "prescriptions", ["id"], if_not_exists=True)
+
+    ensure_table(
+        "prescription_medicines",
+        sa.Column("prescription_id", sa.Integer, sa.ForeignKey("prescriptions.id"), primary_key=True),
+        sa.Column("medicine_id", sa.Integer, sa.ForeignKey("medicines.id"), primary_key=True),
+        sa.Column("quantity", sa.Integer),
+    )
+
+    ensure_table(
+        "bills",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("patient_id", sa.Integer, sa.ForeignKey("patients.id")),
+        sa.Column("amount", sa.Integer),
+        sa.Column("paid_amount", sa.Integer),
+        sa.Column("issue_date", sa.DateTime),
+        sa.Column("due_date", sa.DateTime),
+        sa.Column("status", sa.String),
+    )
+    op.create_index("ix_bills_id", "bills", ["id"], if_not_exists=True)
+
+    ensure_table(
+        "payments",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("bill_id", sa.Integer, sa.ForeignKey("bills.id")),
+        sa.Column("amount", sa.Integer),
+        sa.Column("payment_method", sa.String),
+        sa.Column("payment_date", sa.DateTime),
+        sa.Column("notes", sa.String),
+    )
+
+def downgrade():
+    for table in (
+        "payments", "bills", "prescription_medicines", "prescriptions", "medicines",
+        "medical_records", "appointments", "staff", "patients", "doctors", "users",
+    ):
+        op.drop_table(table)
@@ -0,0 +1,266 @@
+"""Stock ledger, idempotency keys, jobs, analytics rollups and search
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+Everything added to the schema since the first releases. Databases that create_all kept up to
+date may have any of it already, so each step skips what exists.
+"""
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+NAME_INDEXES = ("patients", "doctors", "medicines", "staff")
+
+# The data steps below are frozen copies of what the application did when this revision was
+# written, over sa.table() definitions rather than the models, so later changes to either
+# can't change what this migration does.
+
+# External-content FTS5 indexes (SQLite only): table -> (index, columns)
+SEARCH_TABLES = {
+    "patients": ("patients_fts", ["name", "address", "email", "contact_number"]),
+    "medicines": ("medicines_fts", ["name", "description", "category", "supplier"]),
+}
+
+medicines = sa.table(
+    "medicines",
+    sa.column("id", sa.Integer), sa.column("batch_number", sa.String), sa.column("expiry_date", sa.DateTime),
+    sa.column("manufacture_date", sa.DateTime), sa.column("stock", sa.Integer),
+)
+medicine_batches = sa.table(
+    "medicine_batches",
+    sa.column("id", sa.Integer), sa.column("medicine_id", sa.Integer), sa.column("batch_number", sa.String),
+    sa.column("expiry_date", sa.DateTime), sa.column("manufacture_date", sa.DateTime), sa.column("quantity", sa.Integer),
+    sa.column("received_date", sa.DateTime),
+)
+stock_movements = sa.table(
+    "stock_movements",
+    sa.column("medicine_id", sa.Integer), sa.column("batch_id", sa.Integer), sa.column("quantity", sa.Integer),
+    sa.column("reason", sa.String), sa.column("movement_date", sa.DateTime),
+)
+bills = sa.table("bills", sa.column("id", sa.Integer), sa.column("issue_date", sa.DateTime), sa.column("amount", sa.Integer))
+payments = sa.table(
+    "payments",
+    sa.column("id", sa.Integer), sa.column("payment_date", sa.DateTime), sa.column("payment_method", sa.String), sa.column("amount", sa.Integer),
+)
+prescriptions = sa.table(
+    "prescriptions",
+    sa.column("doctor_id", sa.Integer), sa.column("prescription_date", sa.DateTime), sa.column("status", sa.String),
+)
+doctors = sa.table("doctors", sa.column("id", sa.Integer), sa.column("consultation_fee", sa.Integer))
+appointments = sa.table(
+    "appointments",
+    sa.column("id", sa.Integer), sa.column("appointment_time", sa.DateTime), sa.column("doctor_id", sa.Integer), sa.column("status", sa.String),
+)
+
+# SQLite keeps DateTime as text; a bucket must be the exact text the ORM writes
+SQLITE_BUCKETS = {"hour": "%Y-%m-%d %H:00:00.000000", "day": "%Y-%m-%d 00:00:00.000000"}
+ROLLUP_COLUMNS = ("bucket", "metric", "doctor_id", "payment_method", "amount", "count")
+
+def rollup_table(name):
+    op.create_table(
+        name,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("bucket", sa.DateTime),
+        sa.Column("metric", sa.String),
+        sa.Column("doctor_id", sa.Integer),
+        sa.Column("payment_method", sa.String),
+        sa.Column("amount", sa.Integer),
+        sa.Column("count", sa.Integer),
+        sa.UniqueConstraint("bucket", "metric", "doctor_id", "payment_method", name=f"uq_{name}_key"),
+        if_not_exists=True,
+    )
+    op.create_index(f"ix_{name}_id", name, ["id"], if_not_exists=True)
+    op.create_index(f"ix_{name}_metric_bucket", name, ["metric", "bucket"], if_not_exists=True)
+
+def create_search_index(bind):
+    # Indexes whatever rows the tables already hold
+    if bind.dialect.name != "sqlite":
+        return
+    for table, (fts_table, columns) in SEARCH_TABLES.items():
+        exists = bind.execute(
+            sa.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": fts_table}
+        ).first()
+        if exists:
+            continue
+        cols = ", ".join(columns)
+        new_values = ", ".join(f"new.{c}" for c in columns)
+        old_values = ", ".join(f"old.{c}" for c in columns)
+        for statement in (
+            f"CREATE VIRTUAL TABLE {fts_table} USING fts5({cols}, content='{table}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+            f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.id, {new_values}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+            f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); "
+            f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.id, {new_values}); END",
+            f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')",
+        ):
+            bind.exec_driver_sql(statement)
+
+def open_missing_batches(bind):
+    # An opening batch holding each medicine's current stock, so every unit on hand belongs to a batch
+    last_batch = bind.execute(sa.select(sa.func.max(medicine_batches.c.id))).scalar() or 0
+    now = datetime.datetime.utcnow()
+    op.execute(medicine_batches.insert().from_select(
+        ["medicine_id", "batch_number", "expiry_date", "manufacture_date", "quantity", "received_date"],
+        sa.select(
+            medicines.c.id, medicines.c.batch_number, medicines.c.expiry_date, medicines.c.manufacture_date,
+            sa.func.coalesce(medicines.c.stock, 0), sa.literal(now, sa.DateTime),
+        ).where(~sa.select(medicine_batches.c.id).where(medicine_batches.c.medicine_id == medicines.c.id).exists()),
+    ))
+    op.execute(stock_movements.insert().from_select(
+        ["medicine_id", "batch_id", "quantity", "reason", "movement_date"],
+        sa.select(
+            medicine_batches.c.medicine_id, medicine_batches.c.id, medicine_batches.c.quantity, sa.literal("Opening"),
+            sa.literal(now, sa.DateTime),
+        ).where(medicine_batches.c.id > last_batch),
+    ))
+
+def fact_sources():
+    # (moment, metric, doctor_id, payment_method, amount) of every bill, billed prescription,
+    # payment and active appointment
+    return [
+        sa.select(bills.c.issue_date, sa.literal("billed"), sa.literal(0), sa.literal(""), sa.func.coalesce(bills.c.amount, 0)),
+        sa.select(
+            prescriptions.c.prescription_date, sa.literal("consultation"), sa.func.coalesce(prescriptions.c.doctor_id, 0),
+            sa.literal(""), sa.func.coalesce(doctors.c.consultation_fee, 0),
+        ).join_from(prescriptions, doctors, doctors.c.id == prescriptions.c.doctor_id).where(prescriptions.c.status == "Billed"),
+        sa.select(
+            payments.c.payment_date, sa.literal("collected"), sa.literal(0), sa.func.coalesce(payments.c.payment_method, ""),
+            sa.func.coalesce(payments.c.amount, 0),
+        ),
+        sa.select(
+            appointments.c.appointment_time, sa.literal("appointments"), sa.func.coalesce(appointments.c.doctor_id, 0), sa.literal(""), sa.literal(0),
+        ).where(appointments.c.status != "Cancelled"),
+    ]
+
+def build_rollups(bind):
+    # Databases from before the rollups get them built from the existing bills, payments and appointments
+    if bind.execute(sa.text("SELECT 1 FROM daily_rollups LIMIT 1")).first() is not None:
+        return
+    for grain, name in (("hour", "hourly_rollups"), ("day", "daily_rollups")):
+        grouped = []
+        for source in fact_sources():
+            facts = source.subquery()
+            moment, metric, doctor_id, payment_method, amount = facts.c
+            if bind.dialect.name == "postgresql":
+                bucket = sa.func.date_trunc(sa.literal_column(f"'{grain}'"), moment)
+            else:
+                bucket = sa.func.strftime(SQLITE_BUCKETS[grain], moment)
+            key = (bucket, metric, doctor_id, payment_method)
+            grouped.append(sa.select(*key, sa.func.sum(amount), sa.func.count()).where(moment.is_not(None)).group_by(*key))
+        rollup = sa.table(name, *(sa.column(column) for column in ROLLUP_COLUMNS))
+        op.execute(rollup.insert().from_select(ROLLUP_COLUMNS, sa.union_all(*grouped)))
+
+def upgrade():
+    bind = op.get_bind()
+
+    # Low-stock flag computed by the database. SQLite can only add a virtual generated column to
+    # an existing table; the index stores the value either way.
+    medicine_columns = {column["name"] for column in sa.inspect(bind).get_columns("medicines")}
+    if "low_stock" not in medicine_columns:
+        op.add_column("medicines", sa.Column("low_stock", sa.Boolean, sa.Computed("stock <= low_stock_threshold")))
+    op.create_index("ix_medicines_low_stock", "medicines", ["low_stock"], if_not_exists=True)
+
+    # Case-insensitive prefix search on names
+    for table in NAME_INDEXES:
+        op.create_index(f"ix_{table}_name_lower", table, [sa.text("lower(name)")], if_not_exists=True)
+    # Early databases created payments by hand, without the id index the model declares
+    op.create_index("ix_payments_id", "payments", ["id"], if_not_exists=True)
+
+    op.create_table(
+        "medicine_batches",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("medicine_id", sa.Integer, sa.ForeignKey("medicines.id")),
+        sa.Column("batch_number", sa.String),
+        sa.Column("expiry_date", sa.DateTime),
+        sa.Column("manufacture_date", sa.DateTime),
+        sa.Column("quantity", sa.Integer),
+        sa.Column("received_date", sa.DateTime),
+        sa.UniqueConstraint("medicine_id", "batch_number", name="uq_medicine_batches_medicine_batch"),
+        if_not_exists=True,
+    )
+    op.create_index("ix_medicine_batches_id", "medicine_batches", ["id"], if_not_exists=True)
+    op.create_index("ix_medicine_batches_batch_number", "medicine_batches", ["batch_number"], if_not_exists=True)
+    op.create_index("ix_medicine_batches_fefo", "medicine_batches", ["medicine_id", "expiry_date"], if_not_exists=True)
+
+    op.create_table(
+        "stock_movements",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("medicine_id", sa.Integer, sa.ForeignKey("medicines.id")),
+        sa.Column("batch_id", sa.Integer, sa.ForeignKey("medicine_batches.id")),
+        sa.Column("bill_id", sa.Integer, sa.ForeignKey("bills.id")),
+        sa.Column("quantity", sa.Integer),
+        sa.Column("reason", sa.String),
+        sa.Column("movement_date", sa.DateTime),
+        if_not_exists=True,
+    )
+    op.create_index("ix_stock_movements_id", "stock_movements", ["id"], if_not_exists=True)
+    op.create_index("ix_stock_movements_medicine", "stock_movements", ["medicine_id", "id"], if_not_exists=True)
+    op.create_index("ix_stock_movements_batch", "stock_movements", ["batch_id"], if_not_exists=True)
+    op.create_index("ix_stock_movements_bill", "stock_movements", ["bill_id"], if_not_exists=True)
+    op.create_index("ix_stock_movements_date", "stock_movements", ["movement_date"], if_not_exists=True)
+
+    op.create_table(
+        "idempotency_keys",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("scope", sa.String),
+        sa.Column("key", sa.String),
+        sa.Column("request_hash", sa.String),
+        sa.Column("response", sa.String),
+        sa.Column("created_at", sa.DateTime),
+        sa.UniqueConstraint("scope", "key", name="uq_idempotency_keys_scope_key"),
+        if_not_exists=True,
+    )
+    op.create_index("ix_idempotency_keys_id", "idempotency_keys", ["id"], if_not_exists=True)
+    op.create_index("ix_idempotency_keys_created_at", "idempotency_keys", ["created_at"], if_not_exists=True)
+
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("name", sa.String),
+        sa.Column("status", sa.String),
+        sa.Column("next_run_at", sa.DateTime),
+        sa.Column("lease_expires_at", sa.DateTime),
+        sa.Column("cursor", sa.Integer),
+        sa.Column("last_started_at", sa.DateTime),
+        sa.Column("last_finished_at", sa.DateTime),
+        sa.Column("last_processed", sa.Integer),
+        sa.Column("last_error", sa.String),
+        if_not_exists=True,
+    )
+    op.create_index("ix_jobs_id", "jobs", ["id"], if_not_exists=True)
+    op.create_index("ix_jobs_name", "jobs", ["name"], unique=True, if_not_exists=True)
+
+    rollup_table("hourly_rollups")
+    rollup_table("daily_rollups")
+
+    # Data the new tables start from, in the same migration: the search index over existing rows,
+    # an opening batch for each medicine's stock, and the rollups of existing bills and payments
+    create_search_index(bind)
+    open_missing_batches(bind)
+    build_rollups(bind)
+
+def downgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        for fts_table, _ in SEARCH_TABLES.values():
+            for suffix in ("ai", "ad", "au"):
+                op.execute(f"DROP TRIGGER IF EXISTS {fts_table}_{suffix}")
+            op.execute(f"DROP TABLE IF EXISTS {fts_table}")
+    for table in ("daily_rollups", "hourly_rollups", "jobs", "idempotency_keys", "stock_movements", "medicine_batches"):
+        op.drop_table(table)
+    op.drop_index("ix_payments_id", "payments", if_exists=True)
+    for table in NAME_INDEXES:
+        op.drop_index(f"ix_{table}_name_lower", table, if_exists=True)
+    op.drop_index("ix_medicines_low_stock", "medicines", if_exists=True)
+    op.drop_column("medicines", "low_stock")
@@ -0,0 +1,77 @@
+"""Link billed prescriptions to their bill
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+Consultation income is counted at the issue date of the bill that charged it. Prescriptions
+billed before this revision are linked to the patient's first bill issued on or after the
+prescription, or failing that the patient's latest bill, and the consultation rollups are
+recomputed from those links.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+DEFAULT_CONSULTATION_FEE = 500
+SQLITE_BUCKETS = {"hour": "%Y-%m-%d %H:00:00.000000", "day": "%Y-%m-%d 00:00:00.000000"}
+ROLLUP_COLUMNS = ("bucket", "metric", "doctor_id", "payment_method", "amount", "count")
+
+prescriptions = sa.table(
+    "prescriptions",
+    sa.column("id", sa.Integer), sa.column("patient_id", sa.Integer), sa.column("doctor_id", sa.Integer),
+    sa.column("prescription_date", sa.DateTime), sa.column("status", sa.String), sa.column("bill_id", sa.Integer),
+)
+bills = sa.table("bills", sa.column("id", sa.Integer), sa.column("patient_id", sa.Integer), sa.column("issue_date", sa.DateTime))
+doctors = sa.table("doctors", sa.column("id", sa.Integer), sa.column("consultation_fee", sa.Integer))
+
+def link_billed_prescriptions():
+    later = sa.select(bills.c.id).where(
+        bills.c.patient_id == prescriptions.c.patient_id, bills.c.issue_date >= prescriptions.c.prescription_date
+    ).order_by(bills.c.issue_date, bills.c.id).limit(1).scalar_subquery()
+    latest = sa.select(bills.c.id).where(
+        bills.c.patient_id == prescriptions.c.patient_id
+    ).order_by(bills.c.issue_date.desc(), bills.c.id.desc()).limit(1).scalar_subquery()
+    op.execute(
+        prescriptions.update()
+        .where(prescriptions.c.status == "Billed", prescriptions.c.bill_id.is_(None))
+        .values(bill_id=sa.func.coalesce(later, latest))
+    )
+
+def rebuild_consultations(bind):
+    # The consultation rows were keyed on the prescription date; nothing else in the rollups changes
+    for grain, name in (("hour", "hourly_rollups"), ("day", "daily_rollups")):
+        rollup = sa.table(name, *(sa.column(column) for column in ROLLUP_COLUMNS))
+        op.execute(rollup.delete().where(rollup.c.metric == "consultation"))
+        if bind.dialect.name == "postgresql":
+            bucket = sa.func.date_trunc(sa.literal_column(f"'{grain}'"), bills.c.issue_date)
+        else:
+            bucket = sa.func.strftime(SQLITE_BUCKETS[grain], bills.c.issue_date)
+        doctor_id = sa.func.coalesce(prescriptions.c.doctor_id, 0)
+        key = (bucket, doctor_id)
+        op.execute(rollup.insert().from_select(ROLLUP_COLUMNS, sa.select(
+            bucket, sa.literal_column("'consultation'"), doctor_id, sa.literal_column("''"),
+            sa.func.sum(sa.func.coalesce(doctors.c.consultation_fee, DEFAULT_CONSULTATION_FEE)), sa.func.count(),
+        ).select_from(prescriptions).join(bills, bills.c.id == prescriptions.c.bill_id).outerjoin(
+            doctors, doctors.c.id == prescriptions.c.doctor_id
+        ).where(bills.c.issue_date.is_not(None)).group_by(*key)))
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        # SQLite can add a column with a REFERENCES clause, but not a separate foreign key constraint
+        op.execute("ALTER TABLE prescriptions ADD COLUMN bill_id INTEGER REFERENCES bills (id)")
+    else:
+        op.add_column("prescriptions", sa.Column("bill_id", sa.Integer, sa.ForeignKey("bills.id")))
+    op.create_index("ix_prescriptions_bill_id", "prescriptions", ["bill_id"])
+    link_billed_prescriptions()
+    rebuild_consultations(bind)
+
+def downgrade():
+    # The rollups keep the consultation rows keyed on bill dates
+    op.drop_index("ix_prescriptions_bill_id", "prescriptions")
+    op.drop_column("prescriptions", "bill_id")
@@ -0,0 +1,55 @@
+"""Unique active appointment per doctor and start time
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+The booking endpoints already refuse overlapping appointments; this index makes the database
+refuse two active appointments for one doctor at the same start time, including rows written
+around the API (bulk imports, other clients).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+ACTIVE = sa.text("status != 'Cancelled'")
+
+appointments = sa.table(
+    "appointments", sa.column("doctor_id", sa.Integer), sa.column("appointment_time", sa.DateTime), sa.column("status", sa.String),
+)
+
+def online():
+    # As in 0003, PostgreSQL builds the index CONCURRENTLY so bookings carry on meanwhile
+    return op.get_bind().dialect.name == "postgresql"
+
+def upgrade():
+    clashes = op.get_bind().execute(
+        sa.select(appointments.c.doctor_id, appointments.c.appointment_time)
+        .where(ACTIVE).group_by(appointments.c.doctor_id, appointments.c.appointment_time)
+        .having(sa.func.count() > 1).limit(5)
+    ).all()
+    if clashes:
+        # Which of the two to cancel is for the clinic to decide, not the migration
+        listed = ", ".join(f"doctor {doctor_id} at {moment}" for doctor_id, moment in clashes)
+        raise RuntimeError(f"Active appointments share a doctor and start time ({listed}); cancel one of each before upgrading")
+    if online():
+        with op.get_context().autocommit_block():
+            op.create_index(
+                "uq_appointments_doctor_slot", "appointments", ["doctor_id", "appointment_time"], unique=True,
+                postgresql_where=ACTIVE, postgresql_concurrently=True,
+            )
+    else:
+        op.create_index(
+            "uq_appointments_doctor_slot", "appointments", ["doctor_id", "appointment_time"], unique=True, sqlite_where=ACTIVE,
+        )
+
+def downgrade():
+    if online():
+        with op.get_context().autocommit_block():
+            op.drop_index("uq_appointments_doctor_slot", "appointments", postgresql_concurrently=True)
+    else:
+        op.drop_index("uq_appointments_doctor_slot", "appointments")
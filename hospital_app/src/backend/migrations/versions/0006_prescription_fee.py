@@ -0,0 +1,35 @@
+"""Record the consultation fee each bill charged
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+Consultation income is counted from the fee stored on the prescription when it was billed, so
+a later change to the doctor's fee can't alter what a bill is taken out of the rollups with.
+Prescriptions already billed get the fee their consultation rows were counted at: the doctor's
+current fee, or the default when there is none.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+DEFAULT_CONSULTATION_FEE = 500
+
+prescriptions = sa.table(
+    "prescriptions", sa.column("doctor_id", sa.Integer), sa.column("bill_id", sa.Integer), sa.column("consultation_fee", sa.Integer),
+)
+doctors = sa.table("doctors", sa.column("id", sa.Integer), sa.column("consultation_fee", sa.Integer))
+
+def upgrade():
+    op.add_column("prescriptions", sa.Column("consultation_fee", sa.Integer))
+    op.execute(prescriptions.update().where(prescriptions.c.bill_id.is_not(None)).values(consultation_fee=sa.func.coalesce(
+        sa.select(doctors.c.consultation_fee).where(doctors.c.id == prescriptions.c.doctor_id).scalar_subquery(),
+        DEFAULT_CONSULTATION_FEE,
+    )))
+
+def downgrade():
+    op.drop_column("prescriptions", "consultation_fee")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Computed, Integer, String, ForeignKey, DateTime, Boolean, Index, UniqueConstraint, func, text
 from sqlalchemy.orm import relationship
 from .database import Base
 import datetime
@@ -6,6 +6,11 @@ import datetime
 class Patient(Base):
     __tablename__ = "patients"
 
+    __table_args__ = (
+        # Case-insensitive prefix search on name
+        Index("ix_patients_name_lower", func.lower(text("name"))),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     age = Column(Integer)
@@ -19,22 +24,30 @@ class Patient(Base):
     emergency_contact_name = Column(String)
     emergency_contact_number = Column(String)
     marital_status = Column(String)
-    assigned_doctor_id = Column(Integer, ForeignKey("doctors.id"))
+    assigned_doctor_id = Column(Integer, ForeignKey("doctors.id"), index=True)
 
     appointments = relationship("Appointment", back_populates="patient")
     medical_records = relationship("MedicalRecord", back_populates="patient")
     bills = relationship("Bill", back_populates="patient")
+    prescriptions = relationship("Prescription", back_populates="patient")
     assigned_doctor = relationship("Doctor")
 
+# Charged for a prescription whose doctor is gone or has no fee on record
+DEFAULT_CONSULTATION_FEE = 500
+
 class Doctor(Base):
     __tablename__ = "doctors"
 
+    __table_args__ = (
+        Index("ix_doctors_name_lower", func.lower(text("name"))),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     specialization = Column(String)
     contact_number = Column(String, unique=True, index=True)
     email = Column(String, unique=True, index=True)
-    consultation_fee = Column(Integer, default=500)
+    consultation_fee = Column(Integer, default=DEFAULT_CONSULTATION_FEE)
 
     appointments = relationship("Appointment", back_populates="doctor")
     prescriptions = relationship("Prescription", back_populates="doctor")
@@ -42,6 +55,17 @@ class Doctor(Base):
 class Appointment(Base):
     __tablename__ = "appointments"
 
+    __table_args__ = (
+        Index("ix_appointments_doctor_time", "doctor_id", "appointment_time"),
+        Index("ix_appointments_patient_time", "patient_id", "appointment_time"),
+        Index("ix_appointments_status_time", "status", "appointment_time"),
+        # A doctor can't have two active appointments starting at the same time, whatever wrote them
+        Index(
+            "uq_appointments_doctor_slot", "doctor_id", "appointment_time", unique=True,
+            sqlite_where=text("status != 'Cancelled'"), postgresql_where=text("status != 'Cancelled'"),
+        ),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("patients.id"))
     doctor_id = Column(Integer, ForeignKey("doctors.id"))
@@ -55,6 +79,11 @@ class Appointment(Base):
 class MedicalRecord(Base):
     __tablename__ = "medical_records"
 
+    __table_args__ = (
+        Index("ix_medical_records_patient_date", "patient_id", "record_date"),
+        Index("ix_medical_records_doctor_id", "doctor_id"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("patients.id"))
     doctor_id = Column(Integer, ForeignKey("doctors.id"))
@@ -68,37 +97,104 @@ class MedicalRecord(Base):
 class Medicine(Base):
     __tablename__ = "medicines"
 
+    __table_args__ = (
+        Index("ix_medicines_name_lower", func.lower(text("name"))),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True)
     description = Column(String)
-    stock = Column(Integer)
+    stock = Column(Integer) # On-hand balance across all batches, moved together with each ledger entry
     price = Column(Integer)
-    expiry_date = Column(DateTime)
+    # Batch that dispenses next (first to expire among those in stock)
+    expiry_date = Column(DateTime, index=True)
     batch_number = Column(String, index=True)
     manufacture_date = Column(DateTime)
     low_stock_threshold = Column(Integer, default=10)
+    # Kept current by the database on every write to stock or the threshold, so the
+    # low-stock alerts are an index lookup instead of a comparison across two columns.
+    # Virtual on SQLite (only those can be added to an existing table), stored on PostgreSQL.
+    low_stock = Column(Boolean, Computed("stock <= low_stock_threshold"), index=True)
     category = Column(String, index=True)
     supplier = Column(String)
 
     prescriptions = relationship("PrescriptionMedicine", back_populates="medicine")
+    # The ledger is history, so deleting a medicine never takes its batches or movements along;
+    # the foreign keys reject the delete instead (see delete_medicine)
+    batches = relationship("MedicineBatch", back_populates="medicine", passive_deletes="all")
+    movements = relationship("StockMovement", back_populates="medicine", passive_deletes="all")
+
+class MedicineBatch(Base):
+    __tablename__ = "medicine_batches"
+
+    __table_args__ = (
+        UniqueConstraint("medicine_id", "batch_number", name="uq_medicine_batches_medicine_batch"),
+        # First-expiry-first-out: a drug's batches in dispensing order
+        Index("ix_medicine_batches_fefo", "medicine_id", "expiry_date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    medicine_id = Column(Integer, ForeignKey("medicines.id"))
+    batch_number = Column(String, index=True)
+    expiry_date = Column(DateTime)
+    manufacture_date = Column(DateTime)
+    quantity = Column(Integer, default=0) # On hand in this batch
+    received_date = Column(DateTime, default=datetime.datetime.utcnow)
+
+    medicine = relationship("Medicine", back_populates="batches")
+
+class StockMovement(Base):
+    # Append-only ledger: every change to a batch's quantity, signed (receipts positive, dispensing negative)
+    __tablename__ = "stock_movements"
+
+    __table_args__ = (
+        Index("ix_stock_movements_medicine", "medicine_id", "id"),
+        Index("ix_stock_movements_batch", "batch_id"),
+        Index("ix_stock_movements_bill", "bill_id"),
+        Index("ix_stock_movements_date", "movement_date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    medicine_id = Column(Integer, ForeignKey("medicines.id"))
+    batch_id = Column(Integer, ForeignKey("medicine_batches.id"))
+    bill_id = Column(Integer, ForeignKey("bills.id"))
+    quantity = Column(Integer)
+    reason = Column(String) # Opening, Receipt, Dispense, Adjustment
+    movement_date = Column(DateTime, default=datetime.datetime.utcnow)
+
+    medicine = relationship("Medicine", back_populates="movements")
+    batch = relationship("MedicineBatch")
 
 class Prescription(Base):
     __tablename__ = "prescriptions"
 
+    __table_args__ = (
+        Index("ix_prescriptions_patient_status", "patient_id", "status"),
+        Index("ix_prescriptions_doctor_id", "doctor_id"),
+        Index("ix_prescriptions_bill_id", "bill_id"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("patients.id"))
     doctor_id = Column(Integer, ForeignKey("doctors.id"))
     prescription_date = Column(DateTime, default=datetime.datetime.utcnow)
     instructions = Column(String)
     status = Column(String, default="Pending") # Pending, Billed
+    bill_id = Column(Integer, ForeignKey("bills.id")) # the bill that charged it
+    consultation_fee = Column(Integer) # the fee that bill charged for it
 
-    patient = relationship("Patient")
+    patient = relationship("Patient", back_populates="prescriptions")
     doctor = relationship("Doctor", back_populates="prescriptions")
     medicines = relationship("PrescriptionMedicine", back_populates="prescription")
 
 class PrescriptionMedicine(Base):
     __tablename__ = "prescription_medicines"
 
+    __table_args__ = (
+        # The primary key leads with prescription_id; this serves lookups by medicine
+        Index("ix_prescription_medicines_medicine_id", "medicine_id"),
+    )
+
     prescription_id = Column(Integer, ForeignKey("prescriptions.id"), primary_key=True)
     medicine_id = Column(Integer, ForeignKey("medicines.id"), primary_key=True)
     quantity = Column(Integer)
@@ -109,6 +205,12 @@ class PrescriptionMedicine(Base):
 class Bill(Base):
     __tablename__ = "bills"
 
+    __table_args__ = (
+        Index("ix_bills_patient_status", "patient_id", "status"),
+        Index("ix_bills_status_issue_date", "status", "issue_date"),
+        Index("ix_bills_status_due_date", "status", "due_date"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     patient_id = Column(Integer, ForeignKey("patients.id"))
     amount = Column(Integer)
@@ -118,10 +220,16 @@ class Bill(Base):
     status = Column(String, default="Pending") # Pending, Paid, Overdue, Partial
 
     patient = relationship("Patient", back_populates="bills")
+    payments = relationship("Payment", back_populates="bill")
 
 class Payment(Base):
     __tablename__ = "payments"
 
+    __table_args__ = (
+        Index("ix_payments_bill_id", "bill_id"),
+        Index("ix_payments_date", "payment_date"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     bill_id = Column(Integer, ForeignKey("bills.id"))
     amount = Column(Integer)
@@ -129,6 +237,74 @@ class Payment(Base):
     payment_date = Column(DateTime, default=datetime.datetime.utcnow)
     notes = Column(String)
 
+    bill = relationship("Bill", back_populates="payments")
+
+class IdempotencyKey(Base):
+    # Response of a write made with an Idempotency-Key header, replayed when the key is reused
+    __tablename__ = "idempotency_keys"
+
+    __table_args__ = (
+        UniqueConstraint("scope", "key", name="uq_idempotency_keys_scope_key"),
+        Index("ix_idempotency_keys_created_at", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String) # Endpoint the key was used on
+    key = Column(String)
+    request_hash = Column(String)
+    response = Column(String) # JSON
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class Job(Base):
+    # Schedule and progress of a background job; see jobs.py
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True)
+    status = Column(String, default="Idle") # Idle, Running, Failed
+    next_run_at = Column(DateTime)
+    # While Running, the worker holding the job; another worker may take over once this passes
+    lease_expires_at = Column(DateTime)
+    cursor = Column(Integer) # Where an interrupted run resumes
+    last_started_at = Column(DateTime)
+    last_finished_at = Column(DateTime)
+    last_processed = Column(Integer)
+    last_error = Column(String)
+
+class HourlyRollup(Base):
+    # Per-hour totals maintained by analytics.py
+    __tablename__ = "hourly_rollups"
+
+    __table_args__ = (
+        UniqueConstraint("bucket", "metric", "doctor_id", "payment_method", name="uq_hourly_rollups_key"),
+        Index("ix_hourly_rollups_metric_bucket", "metric", "bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    bucket = Column(DateTime) # Start of the hour
+    metric = Column(String) # billed, consultation, collected, appointments
+    doctor_id = Column(Integer, default=0) # 0 when the metric isn't per doctor
+    payment_method = Column(String, default="") # "" when the metric isn't per method
+    amount = Column(Integer, default=0)
+    count = Column(Integer, default=0)
+
+class DailyRollup(Base):
+    # Per-day totals maintained by analytics.py, same shape as HourlyRollup
+    __tablename__ = "daily_rollups"
+
+    __table_args__ = (
+        UniqueConstraint("bucket", "metric", "doctor_id", "payment_method", name="uq_daily_rollups_key"),
+        Index("ix_daily_rollups_metric_bucket", "metric", "bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    bucket = Column(DateTime) # Midnight starting the day
+    metric = Column(String)
+    doctor_id = Column(Integer, default=0)
+    payment_method = Column(String, default="")
+    amount = Column(Integer, default=0)
+    count = Column(Integer, default=0)
+
 class User(Base):
     __tablename__ = "users"
 
@@ -140,8 +316,12 @@ class User(Base):
 class Staff(Base):
     __tablename__ = "staff"
 
+    __table_args__ = (
+        Index("ix_staff_name_lower", func.lower(text("name"))),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     name = Column(String)
     position = Column(String)
     contact_number = Column(String)
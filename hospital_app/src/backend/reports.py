@@ -0,0 +1,242 @@
+import argparse
+import datetime
+import itertools
+import json
+import os
+import sys
+
+import numpy as np
+from sqlalchemy import func, or_, select
+
+from . import database, export, models
+from .analytics import naive_utc
+
+# Month-end finance reports over the whole history. Rows are read straight off the Core cursor a
+# chunk at a time into NumPy columns and folded into small running totals with vectorized
+# operations, so no ORM objects are built and memory is bounded by CHUNK_SIZE, not table size.
+CHUNK_SIZE = int(os.environ.get("REPORT_CHUNK_SIZE", 100000))
+
+# Days past due at which each ageing bucket starts; bills not yet due are "current"
+AGEING_EDGES = (1, 31, 61, 91)
+AGEING_BUCKETS = ("current", "1-30", "31-60", "61-90", "90+")
+
+MEDICINE_SORTS = ("revenue", "turnover")
+
+# Tables written by --snapshot: the inputs of these reports
+SNAPSHOT_TABLES = ("bills", "payments", "prescriptions", "prescription_medicines", "medicines", "stock_movements")
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+def epoch_days(engine, column):
+    # Dates come back from the database as fractional days since 1970, so no datetime objects
+    # are parsed per row
+    if engine.dialect.name == "sqlite":
+        return func.julianday(column) - 2440587.5
+    return func.extract("epoch", column) / 86400.0
+
+def to_days(moment):
+    return (moment - EPOCH).total_seconds() / 86400
+
+def read_columns(engine, query, chunk_size=CHUNK_SIZE):
+    # Yields each chunk of a query's rows as float64 columns (NULLs become NaN); empty chunks are skipped
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+        width = len(result.keys())
+        for partition in result.partitions():
+            values = np.fromiter(itertools.chain.from_iterable(partition), dtype=np.float64, count=len(partition) * width)
+            yield values.reshape(len(partition), width).T
+
+def months(days):
+    # Months since 1970-01 for an array of epoch days
+    return np.floor(days).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+def month_label(month):
+    return str(np.datetime64(int(month), "M"))
+
+def add_grouped(totals, keys, *values):
+    # Adds each value array into totals[key], one bincount per array, over the distinct keys only
+    unique, inverse = np.unique(keys, return_inverse=True)
+    sums = [np.bincount(inverse, weights=value, minlength=len(unique)) for value in values]
+    for i, key in enumerate(unique.tolist()):
+        total = totals.setdefault(key, [0.0] * len(values))
+        for j, column in enumerate(sums):
+            total[j] += column[i]
+
+def date_filters(column, date_from, date_to):
+    filters = []
+    if date_from is not None:
+        filters.append(column >= date_from)
+    if date_to is not None:
+        filters.append(column < date_to)
+    return filters
+
+def ageing(engine, as_of=None):
+    # Receivables outstanding at as_of by how long they are past due. Payments made after as_of
+    # are added back, so a past month-end reports what was owed then.
+    as_of = naive_utc(as_of) or datetime.datetime.utcnow()
+    bills, payments = models.Bill.__table__, models.Payment.__table__
+    paid_since = select(func.coalesce(func.sum(payments.c.amount), 0)).where(
+        payments.c.bill_id == bills.c.id, payments.c.payment_date > as_of
+    ).scalar_subquery()
+    outstanding = func.coalesce(bills.c.amount, 0) - func.coalesce(bills.c.paid_amount, 0)
+    query = select(
+        epoch_days(engine, func.coalesce(bills.c.due_date, bills.c.issue_date)),
+        outstanding + paid_since,
+    ).where(
+        bills.c.issue_date <= as_of,
+        or_(outstanding > 0, select(payments.c.id).where(payments.c.bill_id == bills.c.id, payments.c.payment_date > as_of).exists()),
+    )
+    amounts = np.zeros(len(AGEING_BUCKETS))
+    counts = np.zeros(len(AGEING_BUCKETS), dtype=np.int64)
+    as_of_day = to_days(as_of)
+    for due_day, owed in read_columns(engine, query):
+        owed = np.nan_to_num(owed)
+        open_bills = owed > 0
+        bucket = np.digitize(np.floor(as_of_day - due_day[open_bills]), AGEING_EDGES)
+        amounts += np.bincount(bucket, weights=owed[open_bills], minlength=len(AGEING_BUCKETS))
+        counts += np.bincount(bucket, minlength=len(AGEING_BUCKETS))
+    total = amounts.sum()
+    return {
+        "as_of": as_of,
+        "outstanding": int(total),
+        "buckets": [
+            {"bucket": name, "bills": int(count), "outstanding": int(amount), "share": float(amount / total) if total else 0.0}
+            for name, count, amount in zip(AGEING_BUCKETS, counts, amounts)
+        ],
+    }
+
+def collection_row(month, billed, collected, received, bills):
+    return {
+        "month": month, "bills": int(bills), "billed": int(billed), "collected": int(collected), "received": int(received),
+        "collection_rate": float(collected / billed) if billed else None,
+    }
+
+def collection(engine, date_from=None, date_to=None):
+    # Per month: what was billed, how much of those bills has been paid since (the collection
+    # rate), and the payments received during the month whatever bill they settle
+    date_from, date_to = naive_utc(date_from), naive_utc(date_to)
+    bills, payments = models.Bill.__table__, models.Payment.__table__
+    billed = select(
+        epoch_days(engine, bills.c.issue_date), func.coalesce(bills.c.amount, 0), func.coalesce(bills.c.paid_amount, 0)
+    ).where(bills.c.issue_date.is_not(None), *date_filters(bills.c.issue_date, date_from, date_to))
+    received = select(epoch_days(engine, payments.c.payment_date), payments.c.amount).where(
+        payments.c.payment_date.is_not(None), *date_filters(payments.c.payment_date, date_from, date_to)
+    )
+    # month: [billed, collected, bills, received]
+    totals = {}
+    for issue_day, amount, paid in read_columns(engine, billed):
+        add_grouped(totals, months(issue_day), amount, np.minimum(paid, amount), np.ones(len(amount)), np.zeros(len(amount)))
+    for payment_day, amount in read_columns(engine, received):
+        month_totals = {}
+        add_grouped(month_totals, months(payment_day), np.nan_to_num(amount))
+        for month, (value,) in month_totals.items():
+            totals.setdefault(month, [0.0, 0.0, 0.0, 0.0])[3] += value
+    rows = [
+        collection_row(month_label(month), billed, collected, received, count)
+        for month, (billed, collected, count, received) in sorted(totals.items())
+    ]
+    sums = np.array([[row["billed"], row["collected"], row["received"], row["bills"]] for row in rows]).sum(axis=0) if rows else np.zeros(4)
+    return {"months": rows, "total": collection_row("total", *sums)}
+
+def medicines(engine, date_from=None, date_to=None, sort="revenue", limit=20):
+    # Revenue and units of each medicine from prescriptions billed in the period, and its stock
+    # turnover: units dispensed over the average of opening and closing stock. Stock levels are
+    # worked back from today's balance through the stock ledger. Revenue uses current prices.
+    # Per-medicine arrays are indexed by medicine id
+    date_from, date_to = naive_utc(date_from), naive_utc(date_to)
+    with engine.connect() as conn:
+        last_id = conn.execute(select(func.max(models.Medicine.id))).scalar()
+    if last_id is None:
+        return []
+    size = last_id + 1
+    price = np.zeros(size)
+    stock = np.zeros(size)
+    known = np.zeros(size, dtype=bool)
+    for ids, prices, stocks in read_columns(engine, select(
+        models.Medicine.id, func.coalesce(models.Medicine.price, 0), func.coalesce(models.Medicine.stock, 0)
+    )):
+        ids = ids.astype(np.int64)
+        price[ids], stock[ids], known[ids] = prices, stocks, True
+
+    lines = models.PrescriptionMedicine.__table__
+    prescriptions = models.Prescription.__table__
+    units = np.zeros(size)
+    for ids, quantities in read_columns(engine, select(lines.c.medicine_id, func.coalesce(lines.c.quantity, 0)).join(
+        prescriptions, prescriptions.c.id == lines.c.prescription_id
+    ).where(prescriptions.c.status == "Billed", *date_filters(prescriptions.c.prescription_date, date_from, date_to))):
+        units += np.bincount(ids.astype(np.int64), weights=quantities, minlength=size)[:size]
+
+    # Net stock movement after the period (to get from today back to closing stock), and during it
+    movements = models.StockMovement.__table__
+    after, during = np.zeros(size), np.zeros(size)
+    period_end = to_days(date_to) if date_to is not None else np.inf
+    for ids, quantities, days in read_columns(engine, select(
+        movements.c.medicine_id, movements.c.quantity, epoch_days(engine, movements.c.movement_date)
+    ).where(*date_filters(movements.c.movement_date, date_from, None))):
+        ids = ids.astype(np.int64)
+        later = days >= period_end
+        after += np.bincount(ids[later], weights=quantities[later], minlength=size)[:size]
+        during += np.bincount(ids[~later], weights=quantities[~later], minlength=size)[:size]
+    closing = stock - after
+    opening = closing - during
+    average = (opening + closing) / 2
+    revenue = units * price
+    turnover = np.divide(units, average, out=np.zeros(size), where=average > 0)
+
+    ranking = revenue if sort == "revenue" else turnover
+    candidates = np.flatnonzero(known & (units > 0))
+    top = candidates[np.argsort(-ranking[candidates], kind="stable")][:limit]
+    names = dict(select_names(engine, top.tolist()))
+    return [
+        {
+            "medicine_id": int(i), "name": names.get(int(i)), "units": int(units[i]), "revenue": int(revenue[i]),
+            "opening_stock": int(opening[i]), "closing_stock": int(closing[i]), "turnover": round(float(turnover[i]), 4),
+        }
+        for i in top
+    ]
+
+def select_names(engine, ids):
+    if not ids:
+        return []
+    with engine.connect() as conn:
+        return conn.execute(select(models.Medicine.id, models.Medicine.name).where(models.Medicine.id.in_(ids))).all()
+
+def snapshot(engine, directory, format="parquet", date_from=None, date_to=None, log=print):
+    # Columnar copies of the report inputs for offline analysis, streamed to disk a chunk at a time
+    date_from, date_to = naive_utc(date_from), naive_utc(date_to)
+    os.makedirs(directory, exist_ok=True)
+    for name in SNAPSHOT_TABLES:
+        table = export.EXPORT_TABLES[name]
+        path = os.path.join(directory, f"{name}.{format}")
+        with open(path, "wb") as output:
+            for chunk in export.stream_rows(engine, export.build_query(table, date_from, date_to), format, table):
+                output.write(chunk)
+        log(f"{path}: {os.path.getsize(path)} bytes")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m backend.reports", description="Print month-end finance reports as JSON.")
+    parser.add_argument("report", choices=("ageing", "collection", "medicines"))
+    parser.add_argument("--from", dest="date_from", type=datetime.datetime.fromisoformat)
+    parser.add_argument("--to", dest="date_to", type=datetime.datetime.fromisoformat, help="exclusive; the as-of date for ageing")
+    parser.add_argument("--sort", choices=MEDICINE_SORTS, default="revenue")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--snapshot", metavar="DIR", help="also write the report's input tables to DIR")
+    parser.add_argument("--format", choices=export.COLUMNAR_FORMATS, default="parquet")
+    parser.add_argument("--database-url", default=database.SQLALCHEMY_DATABASE_URL)
+    args = parser.parse_args(argv)
+
+    engine = database.create_engine(args.database_url)
+    if args.report == "ageing":
+        report = ageing(engine, args.date_to)
+    elif args.report == "collection":
+        report = collection(engine, args.date_from, args.date_to)
+    else:
+        report = medicines(engine, args.date_from, args.date_to, args.sort, args.limit)
+    print(json.dumps(report, default=str, indent=2))
+    if args.snapshot:
+        snapshot(engine, args.snapshot, args.format, args.date_from, args.date_to, log=lambda line: print(line, file=sys.stderr))
+    engine.dispose()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
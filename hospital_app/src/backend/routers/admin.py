@@ -0,0 +1,292 @@
+import datetime
+import importlib.util
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .. import analytics, bulk, database, inventory, ledger, metrics, models, search
+from ..cache import response_cache
+from ..schemas import (
+    AgeingReport, AppointmentCountRow, BillTotals, BulkResult, CollectionReport, DashboardCounts, DashboardSummary,
+    DoctorCreate, JobStatus, MedicineCreate, MedicineReportRow, PatientCreate, RevenueRow, SearchResults, Staff,
+    StaffCreate, User, UserCreate,
+)
+from .common import cached_response, get_db, name_prefix, paginate
+
+router = APIRouter()
+
+# API Endpoints for User Module (Authentication/Authorization will be added later)
+@router.post("/users/", response_model=User)
+def create_user(user: UserCreate, db: Session = Depends(get_db)):
+    # In a real application, hash the password before storing
+    hashed_password = user.password + "notreallyhashed" # Placeholder
+    db_user = models.User(username=user.username, hashed_password=hashed_password, role=user.role)
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
+@router.get("/users/", response_model=list[User])
+def read_users(response: Response, skip: int = 0, limit: int = 100, after: Optional[int] = None, db: Session = Depends(get_db)):
+    users = paginate(db.query(models.User), models.User.id, response, skip, limit, after)
+    return users
+
+@router.get("/users/{user_id}", response_model=User)
+def read_user(user_id: int, db: Session = Depends(get_db)):
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+@router.put("/users/{user_id}", response_model=User)
+def update_user(user_id: int, user: UserCreate, db: Session = Depends(get_db)):
+    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    hashed_password = user.password + "notreallyhashed" # Placeholder
+    db_user.username = user.username
+    db_user.hashed_password = hashed_password
+    db_user.role = user.role
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
+@router.delete("/users/{user_id}", response_model=User)
+def delete_user(user_id: int, db: Session = Depends(get_db)):
+    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    db.delete(db_user)
+    db.commit()
+    return db_user
+
+# API Endpoints for Staff Module
+@router.post("/staff/", response_model=Staff)
+def create_staff(staff: StaffCreate, db: Session = Depends(get_db)):
+    db_staff = models.Staff(**staff.dict())
+    db.add(db_staff)
+    db.commit()
+    response_cache.invalidate("staff", "dashboard")
+    db.refresh(db_staff)
+    return db_staff
+
+@router.get("/staff/", response_model=list[Staff])
+def read_staff(request: Request, skip: int = 0, limit: int = 100, after: Optional[int] = None, name: Optional[str] = None, position: Optional[str] = None, db: Session = Depends(get_db)):
+    def load(response):
+        query = db.query(models.Staff)
+        if name:
+            query = query.filter(name_prefix(models.Staff.name, name))
+        if position:
+            query = query.filter(models.Staff.position == position)
+        return paginate(query, models.Staff.id, response, skip, limit, after)
+    return cached_response(request, "staff", list[Staff], load)
+
+@router.get("/staff/{staff_id}", response_model=Staff)
+def read_staff_member(request: Request, staff_id: int, db: Session = Depends(get_db)):
+    def load(response):
+        staff_member = db.query(models.Staff).filter(models.Staff.id == staff_id).first()
+        if staff_member is None:
+            raise HTTPException(status_code=404, detail="Staff member not found")
+        return staff_member
+    return cached_response(request, "staff", Staff, load)
+
+@router.put("/staff/{staff_id}", response_model=Staff)
+def update_staff(staff_id: int, staff: StaffCreate, db: Session = Depends(get_db)):
+    db_staff = db.query(models.Staff).filter(models.Staff.id == staff_id).first()
+    if db_staff is None:
+        raise HTTPException(status_code=404, detail="Staff member not found")
+    for key, value in staff.dict().items():
+        setattr(db_staff, key, value)
+    db.commit()
+    response_cache.invalidate("staff", "dashboard")
+    db.refresh(db_staff)
+    return db_staff
+
+@router.delete("/staff/{staff_id}", response_model=Staff)
+def delete_staff(staff_id: int, db: Session = Depends(get_db)):
+    db_staff = db.query(models.Staff).filter(models.Staff.id == staff_id).first()
+    if db_staff is None:
+        raise HTTPException(status_code=404, detail="Staff member not found")
+    db.delete(db_staff)
+    db.commit()
+    response_cache.invalidate("staff", "dashboard")
+    return db_staff
+
+# API Endpoints for Dashboard Module
+DASHBOARD_RECENT_LIMIT = 5
+DASHBOARD_LOW_STOCK_LIMIT = 20
+DASHBOARD_CACHE_TTL = 30
+# Handlers that change a count, a recent row, the low-stock list or the bill totals invalidate
+# "dashboard" themselves; the TTL bounds how stale writes made around the API can leave it
+
+def build_dashboard_summary(db: Session):
+    counts = DashboardCounts(
+        patients=db.query(func.count(models.Patient.id)).scalar(),
+        doctors=db.query(func.count(models.Doctor.id)).scalar(),
+        appointments=db.query(func.count(models.Appointment.id)).scalar(),
+        medicines=db.query(func.count(models.Medicine.id)).scalar(),
+        prescriptions=db.query(func.count(models.Prescription.id)).scalar(),
+        bills=db.query(func.count(models.Bill.id)).scalar(),
+        staff=db.query(func.count(models.Staff.id)).scalar(),
+    )
+
+    recent_patients = db.query(models.Patient).order_by(models.Patient.id.desc()).limit(DASHBOARD_RECENT_LIMIT).all()
+    recent_appointments = db.query(models.Appointment).order_by(models.Appointment.id.desc()).limit(DASHBOARD_RECENT_LIMIT).all()
+
+    low_stock_count = db.query(func.count(models.Medicine.id)).filter(models.Medicine.low_stock).scalar()
+    low_stock_medicines = db.query(models.Medicine).filter(models.Medicine.low_stock).order_by(
+        models.Medicine.stock
+    ).limit(DASHBOARD_LOW_STOCK_LIMIT).all()
+
+    billed, paid, pending_count = db.query(
+        func.coalesce(func.sum(models.Bill.amount), 0),
+        func.coalesce(func.sum(models.Bill.paid_amount), 0),
+        func.count(models.Bill.id).filter(models.Bill.status != "Paid"),
+    ).one()
+
+    return DashboardSummary(
+        counts=counts,
+        recent_patients=recent_patients,
+        recent_appointments=recent_appointments,
+        low_stock_medicines=low_stock_medicines,
+        low_stock_count=low_stock_count,
+        bill_totals=BillTotals(billed=billed, paid=paid, outstanding=billed - paid, pending_count=pending_count),
+    )
+
+@router.get("/dashboard/summary", response_model=DashboardSummary)
+def get_dashboard_summary(db: Session = Depends(get_db)):
+    generation = response_cache.generation("dashboard")
+    summary = response_cache.get("dashboard", "summary", generation)
+    if summary is None:
+        summary = build_dashboard_summary(db).model_dump(mode="json")
+        response_cache.set("dashboard", "summary", summary, generation, ttl=DASHBOARD_CACHE_TTL)
+    return summary
+
+# API Endpoints for Search Module
+SEARCH_TYPES = {"patients": models.Patient, "medicines": models.Medicine}
+
+@router.get("/search", response_model=SearchResults)
+def full_text_search(q: str, type: Optional[str] = None, skip: int = 0, limit: int = 20, db: Session = Depends(get_db)):
+    if not search.search_supported(database.engine):
+        raise HTTPException(status_code=501, detail="Full-text search requires SQLite FTS5")
+    if type is not None and type not in SEARCH_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown search type: {type}")
+
+    results = {}
+    for table, model in SEARCH_TYPES.items():
+        if type is not None and type != table:
+            continue
+        ids = search.search_ids(db, table, q, skip, limit)
+        # Preserve the FTS rank order when loading the rows
+        rows = {row.id: row for row in db.query(model).filter(model.id.in_(ids))} if ids else {}
+        results[table] = [rows[i] for i in ids if i in rows]
+    return SearchResults(**results)
+
+# API Endpoints for Bulk Import Module
+BULK_IMPORTS = {
+    "patients": (models.Patient, PatientCreate),
+    "doctors": (models.Doctor, DoctorCreate),
+    "medicines": (models.Medicine, MedicineCreate),
+    "staff": (models.Staff, StaffCreate),
+}
+
+@router.post("/bulk/{table}", response_model=BulkResult)
+async def bulk_import(table: str, request: Request):
+    # Body may be a JSON array, NDJSON (application/x-ndjson) or CSV (text/csv) with a header row
+    if table not in BULK_IMPORTS:
+        raise HTTPException(status_code=404, detail=f"Bulk import is not supported for {table}")
+    model, schema = BULK_IMPORTS[table]
+    db = database.SessionLocal()
+    try:
+        loader = bulk.BulkLoader(db, model, schema)
+        async for chunk in bulk.iter_chunks(bulk.iter_rows(request)):
+            # Parsing stays on the event loop; each chunk's inserts run on the threadpool
+            await run_in_threadpool(loader.load, chunk)
+        if table == "medicines":
+            await run_in_threadpool(ledger.open_missing_batches, database.engine)
+        return loader.result()
+    finally:
+        response_cache.invalidate(table, "dashboard")
+        if table == "medicines":
+            inventory.alerts.notify()
+        db.close()
+
+# API Endpoints for Export Module
+# Like reports, the export module is loaded on the first export rather than when a worker starts
+@router.get("/export/{table}")
+def export_table(table: str, format: str = "ndjson", date_from: Optional[datetime.datetime] = None, date_to: Optional[datetime.datetime] = None):
+    from .. import export
+
+    if table not in export.EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail=f"Export is not supported for {table}")
+    if format not in export.MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+    if format in export.COLUMNAR_FORMATS and importlib.util.find_spec("pyarrow") is None:
+        raise HTTPException(status_code=400, detail=f"Exporting {format} needs pyarrow installed on the server")
+    query = export.build_query(export.EXPORT_TABLES[table], date_from, date_to)
+    return StreamingResponse(
+        export.stream_rows(database.engine, query, format, export.EXPORT_TABLES[table]),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{format}"'},
+    )
+
+# API Endpoints for Analytics Module
+@router.get("/analytics/revenue", response_model=list[RevenueRow])
+def read_revenue(date_from: Optional[datetime.datetime] = Query(None, alias="from"), date_to: Optional[datetime.datetime] = Query(None, alias="to"), group_by: Optional[str] = None, db: Session = Depends(get_db)):
+    if group_by is not None and group_by not in analytics.REVENUE_GROUPS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of: {', '.join(analytics.REVENUE_GROUPS)}")
+    return analytics.revenue(db, date_from, date_to, group_by)
+
+@router.get("/analytics/appointments", response_model=list[AppointmentCountRow])
+def read_appointment_counts(date_from: Optional[datetime.datetime] = Query(None, alias="from"), date_to: Optional[datetime.datetime] = Query(None, alias="to"), group_by: Optional[str] = None, db: Session = Depends(get_db)):
+    if group_by is not None and group_by not in analytics.APPOINTMENT_GROUPS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of: {', '.join(analytics.APPOINTMENT_GROUPS)}")
+    return analytics.appointments(db, date_from, date_to, group_by)
+
+# API Endpoints for Reports Module
+# Reports read whole tables in chunks through the engine rather than a request session. They
+# import NumPy, so the module is loaded on the first report rather than when a worker starts.
+@router.get("/reports/ageing", response_model=AgeingReport)
+def read_ageing_report(as_of: Optional[datetime.datetime] = None):
+    from .. import reports
+
+    return reports.ageing(database.engine, as_of)
+
+@router.get("/reports/collection", response_model=CollectionReport)
+def read_collection_report(date_from: Optional[datetime.datetime] = Query(None, alias="from"), date_to: Optional[datetime.datetime] = Query(None, alias="to")):
+    from .. import reports
+
+    return reports.collection(database.engine, date_from, date_to)
+
+@router.get("/reports/medicines", response_model=list[MedicineReportRow])
+def read_medicine_report(date_from: Optional[datetime.datetime] = Query(None, alias="from"), date_to: Optional[datetime.datetime] = Query(None, alias="to"), sort: str = "revenue", limit: int = 20):
+    from .. import reports
+
+    if sort not in reports.MEDICINE_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(reports.MEDICINE_SORTS)}")
+    return reports.medicines(database.engine, date_from, date_to, sort, max(1, min(limit, 1000)))
+
+# API Endpoints for Jobs Module
+@router.get("/jobs/", response_model=list[JobStatus])
+def read_jobs(db: Session = Depends(get_db)):
+    return db.query(models.Job).order_by(models.Job.name).all()
+
+@router.post("/jobs/{name}/run", response_model=JobStatus)
+def run_job(request: Request, name: str, db: Session = Depends(get_db)):
+    # The scheduler is created by the application's lifespan
+    if not request.app.state.job_scheduler.run_now(db, name):
+        raise HTTPException(status_code=404, detail="Job not found")
+    job = db.query(models.Job).filter(models.Job.name == name).first()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job has not been registered yet")
+    return job
+
+# API Endpoints for Metrics Module
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def read_metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
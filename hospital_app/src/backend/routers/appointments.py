@@ -0,0 +1,105 @@
+import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .. import analytics, models, scheduling
+from ..cache import response_cache
+from ..schemas import Appointment, AppointmentCreate
+from .common import date_range, get_async_db, get_db, paginate, sync_or_async
+
+router = APIRouter()
+
+# API Endpoints for Appointment Module
+DOUBLE_BOOKING_DETAIL = "Doctor already has an appointment in this slot."
+
+def book_appointment(db: Session, appointment: AppointmentCreate):
+    values = appointment.dict()
+    values["appointment_time"] = scheduling.normalize(values["appointment_time"])
+    if values["status"] == "Cancelled":
+        db_appointment = models.Appointment(**values)
+        db.add(db_appointment)
+        db.commit()
+        response_cache.invalidate("appointments", "dashboard")
+        db.refresh(db_appointment)
+        return db_appointment
+
+    appointment_id = scheduling.insert_if_free(db, values)
+    if appointment_id is None:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=DOUBLE_BOOKING_DETAIL)
+    analytics.record(db, analytics.appointment_facts(values))
+    db.commit()
+    scheduling.schedule_index.add(values["doctor_id"], values["appointment_time"])
+    response_cache.invalidate("appointments", "dashboard")
+    return db.get(models.Appointment, appointment_id)
+
+def create_appointment(appointment: AppointmentCreate, db: Session = Depends(get_db)):
+    return book_appointment(db, appointment)
+
+async def create_appointment_async(appointment: AppointmentCreate, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(book_appointment, appointment)
+
+router.post("/appointments/", response_model=Appointment)(sync_or_async(create_appointment, create_appointment_async))
+
+@router.get("/appointments/", response_model=list[Appointment])
+def read_appointments(response: Response, skip: int = 0, limit: int = 100, after: Optional[int] = None, patient_id: Optional[int] = None, doctor_id: Optional[int] = None, status: Optional[str] = None, date_from: Optional[datetime.datetime] = None, date_to: Optional[datetime.datetime] = None, db: Session = Depends(get_db)):
+    query = db.query(models.Appointment)
+    if patient_id is not None:
+        query = query.filter(models.Appointment.patient_id == patient_id)
+    if doctor_id is not None:
+        query = query.filter(models.Appointment.doctor_id == doctor_id)
+    if status:
+        query = query.filter(models.Appointment.status == status)
+    query = query.filter(*date_range(models.Appointment.appointment_time, date_from, date_to))
+    appointments = paginate(query, models.Appointment.id, response, skip, limit, after)
+    return appointments
+
+@router.get("/appointments/{appointment_id}", response_model=Appointment)
+def read_appointment(appointment_id: int, db: Session = Depends(get_db)):
+    appointment = db.query(models.Appointment).filter(models.Appointment.id == appointment_id).first()
+    if appointment is None:
+        raise HTTPException(status_code=404, detail="Appointment not found")
+    return appointment
+
+@router.put("/appointments/{appointment_id}", response_model=Appointment)
+def update_appointment(appointment_id: int, appointment: AppointmentCreate, db: Session = Depends(get_db)):
+    db_appointment = db.query(models.Appointment).filter(models.Appointment.id == appointment_id).first()
+    if db_appointment is None:
+        raise HTTPException(status_code=404, detail="Appointment not found")
+    previous = (db_appointment.doctor_id, db_appointment.appointment_time)
+    # The appointment leaves its old rollup bucket and enters the new one
+    facts = analytics.appointment_facts(
+        {"doctor_id": db_appointment.doctor_id, "appointment_time": db_appointment.appointment_time, "status": db_appointment.status}, -1
+    )
+    values = appointment.dict()
+    values["appointment_time"] = scheduling.normalize(values["appointment_time"])
+    if values["status"] == "Cancelled":
+        for key, value in values.items():
+            setattr(db_appointment, key, value)
+    elif not scheduling.update_if_free(db, appointment_id, values):
+        db.rollback()
+        raise HTTPException(status_code=409, detail=DOUBLE_BOOKING_DETAIL)
+    analytics.record(db, facts + analytics.appointment_facts(values))
+    db.commit()
+    scheduling.schedule_index.invalidate(previous[0], previous[1].date())
+    scheduling.schedule_index.invalidate(values["doctor_id"], values["appointment_time"].date())
+    response_cache.invalidate("appointments", "dashboard")
+    db.refresh(db_appointment)
+    return db_appointment
+
+@router.delete("/appointments/{appointment_id}", response_model=Appointment)
+def delete_appointment(appointment_id: int, db: Session = Depends(get_db)):
+    db_appointment = db.query(models.Appointment).filter(models.Appointment.id == appointment_id).first()
+    if db_appointment is None:
+        raise HTTPException(status_code=404, detail="Appointment not found")
+    analytics.record(db, analytics.appointment_facts(
+        {"doctor_id": db_appointment.doctor_id, "appointment_time": db_appointment.appointment_time, "status": db_appointment.status}, -1
+    ))
+    db.delete(db_appointment)
+    db.commit()
+    scheduling.schedule_index.invalidate(db_appointment.doctor_id, db_appointment.appointment_time.date())
+    response_cache.invalidate("appointments", "dashboard")
+    return db_appointment
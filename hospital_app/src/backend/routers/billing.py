@@ -0,0 +1,296 @@
+import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from sqlalchemy import bindparam, case, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .. import analytics, idempotency, inventory, ledger, models
+from ..cache import response_cache
+from ..schemas import Bill, BillCreate, Payment, PaymentCreate
+from .common import date_range, get_async_db, get_db, paginate, sync_or_async
+
+router = APIRouter()
+
+# API Endpoints for Bill Module
+def pending_charges(db: Session, patient_id: int):
+    # The patient's pending prescriptions, their medicine lines and the total they come to.
+    # The statement count is fixed regardless of how many prescriptions are pending.
+    pending_ids = [row.id for row in db.query(models.Prescription.id).filter(
+        models.Prescription.patient_id == patient_id,
+        models.Prescription.status == "Pending"
+    )]
+    if not pending_ids:
+        return pending_ids, [], 0
+
+    lines = db.query(
+        models.Medicine.id,
+        models.Medicine.price,
+        func.sum(models.PrescriptionMedicine.quantity).label("quantity"),
+    ).join(
+        models.PrescriptionMedicine, models.PrescriptionMedicine.medicine_id == models.Medicine.id
+    ).filter(
+        models.PrescriptionMedicine.prescription_id.in_(pending_ids)
+    ).group_by(models.Medicine.id, models.Medicine.price).all()
+    medicine_total = sum(line.price * line.quantity for line in lines)
+
+    # Consultation fee of the prescribing doctor, falling back to the default if the doctor is gone
+    consultation_total = db.query(
+        func.sum(func.coalesce(models.Doctor.consultation_fee, models.DEFAULT_CONSULTATION_FEE))
+    ).select_from(models.Prescription).outerjoin(
+        models.Doctor, models.Doctor.id == models.Prescription.doctor_id
+    ).filter(models.Prescription.id.in_(pending_ids)).scalar() or 0
+
+    return pending_ids, lines, medicine_total + consultation_total
+
+def charged_fee():
+    # The prescribing doctor's fee as pending_charges() totals it, for a Prescription UPDATE
+    return func.coalesce(
+        select(models.Doctor.consultation_fee).where(models.Doctor.id == models.Prescription.doctor_id).scalar_subquery(),
+        models.DEFAULT_CONSULTATION_FEE,
+    )
+
+def charge_pending(db: Session, bill_id: int, pending_ids: list[int], lines):
+    # Marks the prescriptions as billed on the bill and dispenses their medicines. Returns the
+    # batch allocations to record in the stock ledger.
+    # Claim the prescriptions first so a concurrent bill can't charge them twice
+    claimed = db.execute(
+        update(models.Prescription)
+        .where(models.Prescription.id.in_(pending_ids), models.Prescription.status == "Pending")
+        .values(status="Billed", bill_id=bill_id, consultation_fee=charged_fee()),
+        execution_options={"synchronize_session": False},
+    ).rowcount
+    if claimed != len(pending_ids):
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Prescriptions for this patient are already being billed. Please retry.")
+    if not lines:
+        return []
+
+    # Atomic decrement: a row only changes if it still has enough stock
+    medicines = models.Medicine.__table__
+    decremented = db.connection().execute(
+        medicines.update()
+        .where(medicines.c.id == bindparam("medicine_id"), medicines.c.stock >= bindparam("quantity"))
+        .values(stock=medicines.c.stock - bindparam("quantity")),
+        [{"medicine_id": line.id, "quantity": line.quantity} for line in lines],
+    ).rowcount
+    if decremented != len(lines):
+        db.rollback()
+        required = {line.id: line.quantity for line in lines}
+        for medicine in db.query(models.Medicine).filter(models.Medicine.id.in_(required)):
+            available = medicine.stock or 0
+            if available < required[medicine.id]:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Insufficient stock for medicine: {medicine.name}. Available: {available}, Required: {required[medicine.id]}"
+                )
+        raise HTTPException(status_code=409, detail="Medicine stock changed while billing. Please retry.")
+
+    # The balance covered every line, so the batches do too unless a concurrent bill got to them
+    required = {line.id: line.quantity for line in lines}
+    allocations = ledger.allocate(db, required)
+    if allocations is None or not ledger.take(db, allocations):
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Medicine stock changed while billing. Please retry.")
+    emptied = ledger.emptied(allocations)
+    if emptied:
+        ledger.refresh_next_batch(db, emptied)
+    return allocations
+
+def generate_bill(db: Session, bill: BillCreate):
+    # Auto-calculate bill amount based on patient's prescriptions and medicines
+    patient = db.query(models.Patient.id).filter(models.Patient.id == bill.patient_id).first()
+    if not patient:
+        raise HTTPException(status_code=404, detail="Patient not found")
+
+    # Create bill with calculated amount
+    bill_data = bill.dict()
+    pending_ids, lines, bill_data['amount'] = pending_charges(db, bill.patient_id)
+
+    db_bill = models.Bill(**bill_data)
+    db.add(db_bill)
+    db.flush()
+    if pending_ids:
+        ledger.record(db, ledger.dispensed(charge_pending(db, db_bill.id, pending_ids, lines), db_bill.id))
+    analytics.record_bill(db, db_bill.id)
+    db.commit()
+    # Billing decrements medicine stock
+    response_cache.invalidate("medicines", "dashboard")
+    inventory.alerts.notify()
+    db.refresh(db_bill)
+    return db_bill
+
+def create_bill(bill: BillCreate, db: Session = Depends(get_db)):
+    return generate_bill(db, bill)
+
+async def create_bill_async(bill: BillCreate, db: AsyncSession = Depends(get_async_db)):
+    # The set-based billing engine runs unchanged on the async connection
+    return await db.run_sync(generate_bill, bill)
+
+router.post("/bills/", response_model=Bill)(sync_or_async(create_bill, create_bill_async))
+
+@router.get("/bills/", response_model=list[Bill])
+def read_bills(response: Response, skip: int = 0, limit: int = 100, after: Optional[int] = None, patient_id: Optional[int] = None, status: Optional[str] = None, date_from: Optional[datetime.datetime] = None, date_to: Optional[datetime.datetime] = None, db: Session = Depends(get_db)):
+    query = db.query(models.Bill)
+    if patient_id is not None:
+        query = query.filter(models.Bill.patient_id == patient_id)
+    if status:
+        query = query.filter(models.Bill.status == status)
+    query = query.filter(*date_range(models.Bill.issue_date, date_from, date_to))
+    bills = paginate(query, models.Bill.id, response, skip, limit, after)
+    return bills
+
+@router.get("/bills/{bill_id}", response_model=Bill)
+def read_bill(bill_id: int, db: Session = Depends(get_db)):
+    bill = db.query(models.Bill).filter(models.Bill.id == bill_id).first()
+    if bill is None:
+        raise HTTPException(status_code=404, detail="Bill not found")
+    return bill
+
+@router.put("/bills/{bill_id}", response_model=Bill)
+def update_bill(bill_id: int, bill: BillCreate, db: Session = Depends(get_db)):
+    db_bill = db.query(models.Bill).filter(models.Bill.id == bill_id).first()
+    if db_bill is None:
+        raise HTTPException(status_code=404, detail="Bill not found")
+    analytics.record_bill(db, bill_id, -1)
+    for key, value in bill.dict().items():
+        setattr(db_bill, key, value)
+    db.flush()
+    analytics.record_bill(db, bill_id)
+    db.commit()
+    response_cache.invalidate("dashboard")
+    db.refresh(db_bill)
+    return db_bill
+
+@router.delete("/bills/{bill_id}", response_model=Bill)
+def delete_bill(bill_id: int, db: Session = Depends(get_db)):
+    db_bill = db.query(models.Bill).filter(models.Bill.id == bill_id).first()
+    if db_bill is None:
+        raise HTTPException(status_code=404, detail="Bill not found")
+    # Stock it dispensed stays in the ledger, so a bill that dispensed anything is kept; checked
+    # before the rollups change so a refused delete leaves them alone
+    dispensed = db.query(models.StockMovement.id).filter(
+        models.StockMovement.bill_id == bill_id, models.StockMovement.reason == ledger.DISPENSE
+    ).first()
+    if dispensed is not None:
+        raise HTTPException(status_code=409, detail="Bill has dispensed stock and can't be deleted")
+    # Its prescriptions' consultation fees go with it
+    analytics.record_bill(db, bill_id, -1)
+    db.execute(
+        update(models.Prescription).where(models.Prescription.bill_id == bill_id).values(bill_id=None),
+        execution_options={"synchronize_session": False},
+    )
+    db.delete(db_bill)
+    db.commit()
+    response_cache.invalidate("dashboard")
+    return db_bill
+
+# API Endpoints for Payment Module
+def apply_payments(db: Session, totals: dict[int, int]):
+    # Adds {bill_id: amount} to the bills in one statement per bill, with the status derived in
+    # the same UPDATE, so concurrent payments to a bill can't overwrite each other. Returns the
+    # ids of bills that don't exist.
+    bills = models.Bill.__table__
+    paid = func.coalesce(bills.c.paid_amount, 0) + bindparam("payment_amount")
+    updated = db.connection().execute(
+        bills.update()
+        .where(bills.c.id == bindparam("payment_bill_id"))
+        .values(paid_amount=paid, status=case((paid >= bills.c.amount, "Paid"), (paid > 0, "Partial"), else_=bills.c.status)),
+        [{"payment_bill_id": bill_id, "payment_amount": amount} for bill_id, amount in totals.items()],
+    ).rowcount
+    if updated == len(totals):
+        return set()
+    return set(totals) - {row.id for row in db.query(models.Bill.id).filter(models.Bill.id.in_(totals))}
+
+def idempotent(db: Session, scope: str, key: Optional[str], body, response: Response, post):
+    # Runs post() once per Idempotency-Key; a retry with the same key and body gets the first
+    # response back instead of posting again
+    if key is None:
+        return post()
+    if len(key) > idempotency.MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+    request_hash = idempotency.fingerprint(body)
+
+    def replay(stored):
+        if stored[0] != request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        response.headers["Idempotent-Replayed"] = "true"
+        return stored[1]
+
+    stored = idempotency.lookup(db, scope, key)
+    if stored is not None:
+        return replay(stored)
+    try:
+        return post(lambda result: idempotency.save(db, scope, key, request_hash, result))
+    except IntegrityError:
+        # A concurrent request with the same key committed first
+        db.rollback()
+        stored = idempotency.lookup(db, scope, key)
+        if stored is None:
+            raise
+        return replay(stored)
+
+def post_payment(db: Session, payment: PaymentCreate, idempotency_key: Optional[str] = None, response: Optional[Response] = None):
+    def post(remember=None):
+        missing = apply_payments(db, {payment.bill_id: payment.amount})
+        if missing:
+            db.rollback()
+            raise HTTPException(status_code=404, detail="Bill not found")
+        db_payment = models.Payment(**payment.dict())
+        db.add(db_payment)
+        db.flush()
+        analytics.record(db, analytics.payment_facts([db_payment]))
+        result = Payment.model_validate(db_payment).model_dump(mode="json")
+        if remember:
+            remember(result)
+        db.commit()
+        response_cache.invalidate("dashboard")
+        return result
+    return idempotent(db, "payments", idempotency_key, payment.dict(), response, post)
+
+def create_payment(payment: PaymentCreate, response: Response, idempotency_key: Optional[str] = Header(None), db: Session = Depends(get_db)):
+    return post_payment(db, payment, idempotency_key, response)
+
+async def create_payment_async(payment: PaymentCreate, response: Response, idempotency_key: Optional[str] = Header(None), db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(post_payment, payment, idempotency_key, response)
+
+router.post("/payments/", response_model=Payment)(sync_or_async(create_payment, create_payment_async))
+
+@router.post("/payments/batch", response_model=list[Payment])
+def create_payment_batch(payments: list[PaymentCreate], response: Response, idempotency_key: Optional[str] = Header(None), db: Session = Depends(get_db)):
+    # Reconciles a gateway settlement: every payment is posted, or none is
+    def post(remember=None):
+        totals = {}
+        for payment in payments:
+            totals[payment.bill_id] = totals.get(payment.bill_id, 0) + payment.amount
+        missing = apply_payments(db, totals) if totals else set()
+        if missing:
+            db.rollback()
+            raise HTTPException(status_code=404, detail=f"Bills not found: {', '.join(map(str, sorted(missing)))}")
+        db_payments = db.scalars(insert(models.Payment).returning(models.Payment, sort_by_parameter_order=True), [payment.dict() for payment in payments]).all() if payments else []
+        analytics.record(db, analytics.payment_facts(db_payments))
+        result = [Payment.model_validate(db_payment).model_dump(mode="json") for db_payment in db_payments]
+        if remember:
+            remember(result)
+        db.commit()
+        response_cache.invalidate("dashboard")
+        return result
+    return idempotent(db, "payments/batch", idempotency_key, [payment.dict() for payment in payments], response, post)
+
+@router.get("/payments/", response_model=list[Payment])
+def read_payments(response: Response, skip: int = 0, limit: int = 100, after: Optional[int] = None, bill_id: Optional[int] = None, payment_method: Optional[str] = None, date_from: Optional[datetime.datetime] = None, date_to: Optional[datetime.datetime] = None, db: Session = Depends(get_db)):
+    query = db.query(models.Payment)
+    if bill_id is not None:
+        query = query.filter(models.Payment.bill_id == bill_id)
+    if payment_method:
+        query = query.filter(models.Payment.payment_method == payment_method)
+    query = query.filter(*date_range(models.Payment.payment_date, date_from, date_to))
+    payments = paginate(query, models.Payment.id, response, skip, limit, after)
+    return payments
+
+@router.get("/payments/bill/{bill_id}", response_model=list[Payment])
+def get_payments_by_bill(bill_id: int, db: Session = Depends(get_db)):
+    payments = db.query(models.Payment).filter(models.Payment.bill_id == bill_id).all()
+    return payments
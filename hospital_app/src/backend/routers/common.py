@@ -0,0 +1,80 @@
+import datetime
+import functools
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import and_, func
+
+from .. import database
+from ..cache import response_cache
+
+# Dependencies and query helpers shared by the routers
+
+def get_db():
+    db = database.SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with database.AsyncSessionLocal() as db:
+        yield db
+
+def sync_or_async(sync_handler, async_handler):
+    # Hot endpoints have an async variant that is served when ASYNC_DATABASE is enabled
+    return async_handler if database.ASYNC_DATABASE_ENABLED else sync_handler
+
+def paginate(query, key, response: Response, skip: int, limit: int, after: Optional[int]):
+    # Keyset mode (?after=<cursor>) seeks on the primary key index, so deep pages cost the same as the first.
+    # Offset mode (?skip=) is kept for existing clients. Both advertise the next cursor in X-Next-Cursor.
+    query = query.order_by(key)
+    if after is not None:
+        rows = query.filter(key > after).limit(limit).all()
+    else:
+        rows = query.offset(skip).limit(limit).all()
+    if limit > 0 and len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(getattr(rows[-1], key.key))
+    return rows
+
+@functools.lru_cache(maxsize=None)
+def type_adapter(schema):
+    return TypeAdapter(schema)
+
+def cached_response(request: Request, namespace: str, schema, load):
+    # Serves reference data (doctors, medicines, staff) from response_cache with a strong ETag.
+    # load(response) runs only on a miss; headers it sets (e.g. X-Next-Cursor) are cached with the body.
+    key = request.url.path + "?" + str(request.query_params)
+    generation = response_cache.generation(namespace)
+    entry = response_cache.get(namespace, key, generation)
+    if entry is None:
+        loaded = Response()
+        adapter = type_adapter(schema)
+        body = adapter.dump_json(adapter.validate_python(load(loaded), from_attributes=True))
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        entry = (body.decode(), etag, {k: v for k, v in loaded.headers.items() if k.lower().startswith("x-")})
+        response_cache.set(namespace, key, entry, generation)
+
+    body, etag, headers = entry
+    headers = {**headers, "ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def prefix_match(expression, prefix: str):
+    # Half-open range rather than LIKE so SQLite can seek on the column (or lower(column)) index
+    return and_(expression >= prefix, expression < prefix + "\uffff")
+
+def name_prefix(column, prefix: str):
+    return prefix_match(func.lower(column), prefix.lower())
+
+def date_range(column, date_from: Optional[datetime.datetime], date_to: Optional[datetime.datetime]):
+    conditions = []
+    if date_from is not None:
+        conditions.append(column >= date_from)
+    if date_to is not None:
+        conditions.append(column < date_to)
+    return conditions
@@ -0,0 +1,76 @@
+import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.orm import Session
+
+from .. import models, scheduling
+from ..cache import response_cache
+from ..schemas import Doctor, DoctorAvailability, DoctorCreate
+from .common import cached_response, get_db, name_prefix, paginate
+
+router = APIRouter()
+
+# API Endpoints for Doctor Module
+@router.post("/doctors/", response_model=Doctor)
+def create_doctor(doctor: DoctorCreate, db: Session = Depends(get_db)):
+    db_doctor = models.Doctor(**doctor.dict())
+    db.add(db_doctor)
+    db.commit()
+    response_cache.invalidate("doctors", "dashboard")
+    db.refresh(db_doctor)
+    return db_doctor
+
+@router.get("/doctors/", response_model=list[Doctor])
+def read_doctors(request: Request, skip: int = 0, limit: int = 100, after: Optional[int] = None, name: Optional[str] = None, specialization: Optional[str] = None, db: Session = Depends(get_db)):
+    def load(response):
+        query = db.query(models.Doctor)
+        if name:
+            query = query.filter(name_prefix(models.Doctor.name, name))
+        if specialization:
+            query = query.filter(models.Doctor.specialization == specialization)
+        return paginate(query, models.Doctor.id, response, skip, limit, after)
+    return cached_response(request, "doctors", list[Doctor], load)
+
+@router.get("/doctors/{doctor_id}", response_model=Doctor)
+def read_doctor(request: Request, doctor_id: int, db: Session = Depends(get_db)):
+    def load(response):
+        doctor = db.query(models.Doctor).filter(models.Doctor.id == doctor_id).first()
+        if doctor is None:
+            raise HTTPException(status_code=404, detail="Doctor not found")
+        return doctor
+    return cached_response(request, "doctors", Doctor, load)
+
+@router.put("/doctors/{doctor_id}", response_model=Doctor)
+def update_doctor(doctor_id: int, doctor: DoctorCreate, db: Session = Depends(get_db)):
+    db_doctor = db.query(models.Doctor).filter(models.Doctor.id == doctor_id).first()
+    if db_doctor is None:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    for key, value in doctor.dict().items():
+        setattr(db_doctor, key, value)
+    db.commit()
+    response_cache.invalidate("doctors", "dashboard")
+    db.refresh(db_doctor)
+    return db_doctor
+
+@router.delete("/doctors/{doctor_id}", response_model=Doctor)
+def delete_doctor(doctor_id: int, db: Session = Depends(get_db)):
+    db_doctor = db.query(models.Doctor).filter(models.Doctor.id == doctor_id).first()
+    if db_doctor is None:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    db.delete(db_doctor)
+    db.commit()
+    response_cache.invalidate("doctors", "dashboard")
+    return db_doctor
+
+@router.get("/doctors/{doctor_id}/availability", response_model=DoctorAvailability)
+def read_doctor_availability(doctor_id: int, date: datetime.date, db: Session = Depends(get_db)):
+    if db.get(models.Doctor, doctor_id) is None:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    return DoctorAvailability(
+        doctor_id=doctor_id,
+        date=date,
+        slot_minutes=scheduling.SLOT_MINUTES,
+        booked=scheduling.schedule_index.booked(db, doctor_id, date),
+        free_slots=scheduling.schedule_index.free_slots(db, doctor_id, date),
+    )
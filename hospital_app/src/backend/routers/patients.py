@@ -0,0 +1,166 @@
+import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+
+from .. import models
+from ..cache import response_cache
+from ..schemas import MedicalRecord, MedicalRecordCreate, Patient, PatientCreate, PatientOverview
+from .common import date_range, get_async_db, get_db, name_prefix, paginate, prefix_match, sync_or_async
+from .pharmacy import query_prescriptions
+
+router = APIRouter()
+
+# API Endpoints for Patient Module
+@router.post("/patients/", response_model=Patient)
+def create_patient(patient: PatientCreate, db: Session = Depends(get_db)):
+    try:
+        db_patient = models.Patient(**patient.dict())
+        db.add(db_patient)
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if "patients.aadhar_number" in str(e.orig) or "ix_patients_aadhar_number" in str(e.orig):
+            raise HTTPException(status_code=400, detail="Patient with this Aadhar Number already exists.")
+        # A missing assigned doctor or another constraint: the app-wide handler answers without the SQL
+        raise
+    response_cache.invalidate("dashboard")
+    db.refresh(db_patient)
+    return db_patient
+
+@router.get("/patients/", response_model=list[Patient])
+def read_patients(response: Response, skip: int = 0, limit: int = 100, after: Optional[int] = None, q: Optional[str] = None, name: Optional[str] = None, contact: Optional[str] = None, assigned_doctor_id: Optional[int] = None, db: Session = Depends(get_db)):
+    query = db.query(models.Patient)
+    if q:
+        # Front-desk search box: name, phone or Aadhar prefix, each served by its own index, or
+        # the patient's ID when the box holds a number
+        matches = [
+            name_prefix(models.Patient.name, q),
+            prefix_match(models.Patient.contact_number, q),
+            prefix_match(models.Patient.aadhar_number, q),
+        ]
+        if q.isdigit():
+            matches.append(models.Patient.id == int(q))
+        query = query.filter(or_(*matches))
+    if name:
+        query = query.filter(name_prefix(models.Patient.name, name))
+    if contact:
+        query = query.filter(prefix_match(models.Patient.contact_number, contact))
+    if assigned_doctor_id is not None:
+        query = query.filter(models.Patient.assigned_doctor_id == assigned_doctor_id)
+    patients = paginate(query, models.Patient.id, response, skip, limit, after)
+    return patients
+
+def read_patient(patient_id: int, db: Session = Depends(get_db)):
+    patient = db.query(models.Patient).filter(models.Patient.id == patient_id).first()
+    if patient is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return patient
+
+async def read_patient_async(patient_id: int, db: AsyncSession = Depends(get_async_db)):
+    patient = await db.get(models.Patient, patient_id)
+    if patient is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return patient
+
+router.get("/patients/{patient_id}", response_model=Patient)(sync_or_async(read_patient, read_patient_async))
+
+@router.get("/patients/{patient_id}/overview", response_model=PatientOverview)
+def read_patient_overview(patient_id: int, appointments_limit: int = 20, records_limit: int = 20, prescriptions_limit: int = 20, bills_limit: int = 20, db: Session = Depends(get_db)):
+    # Everything a patient card shows, newest first, in one round trip. Each section is one
+    # query on its patient_id index; medicine lines and payments ride along via selectinload.
+    patient = db.get(models.Patient, patient_id)
+    if patient is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    appointments = db.query(models.Appointment).filter(
+        models.Appointment.patient_id == patient_id
+    ).order_by(models.Appointment.appointment_time.desc()).limit(appointments_limit).all()
+    medical_records = db.query(models.MedicalRecord).filter(
+        models.MedicalRecord.patient_id == patient_id
+    ).order_by(models.MedicalRecord.record_date.desc()).limit(records_limit).all()
+    prescriptions = query_prescriptions(db).filter(
+        models.Prescription.patient_id == patient_id
+    ).order_by(models.Prescription.id.desc()).limit(prescriptions_limit).all()
+    bills = db.query(models.Bill).options(selectinload(models.Bill.payments)).filter(
+        models.Bill.patient_id == patient_id
+    ).order_by(models.Bill.id.desc()).limit(bills_limit).all()
+    return PatientOverview(
+        patient=patient,
+        appointments=appointments,
+        medical_records=medical_records,
+        prescriptions=prescriptions,
+        bills=bills,
+    )
+
+@router.put("/patients/{patient_id}", response_model=Patient)
+def update_patient(patient_id: int, patient: PatientCreate, db: Session = Depends(get_db)):
+    db_patient = db.query(models.Patient).filter(models.Patient.id == patient_id).first()
+    if db_patient is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    for key, value in patient.dict().items():
+        setattr(db_patient, key, value)
+    db.commit()
+    response_cache.invalidate("dashboard")
+    db.refresh(db_patient)
+    return db_patient
+
+@router.delete("/patients/{patient_id}", response_model=Patient)
+def delete_patient(patient_id: int, db: Session = Depends(get_db)):
+    db_patient = db.query(models.Patient).filter(models.Patient.id == patient_id).first()
+    if db_patient is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    db.delete(db_patient)
+    db.commit()
+    response_cache.invalidate("dashboard")
+    return db_patient
+
+# API Endpoints for Medical Record Module
+@router.post("/medical_records/", response_model=MedicalRecord)
+def create_medical_record(medical_record: MedicalRecordCreate, db: Session = Depends(get_db)):
+    db_medical_record = models.MedicalRecord(**medical_record.dict())
+    db.add(db_medical_record)
+    db.commit()
+    db.refresh(db_medical_record)
+    return db_medical_record
+
+@router.get("/medical_records/", response_model=list[MedicalRecord])
+def read_medical_records(response: Response, skip: int = 0, limit: int = 100, after: Optional[int] = None, patient_id: Optional[int] = None, doctor_id: Optional[int] = None, date_from: Optional[datetime.datetime] = None, date_to: Optional[datetime.datetime] = None, db: Session = Depends(get_db)):
+    query = db.query(models.MedicalRecord)
+    if patient_id is not None:
+        query = query.filter(models.MedicalRecord.patient_id == patient_id)
+    if doctor_id is not None:
+        query = query.filter(models.MedicalRecord.doctor_id == doctor_id)
+    query = query.filter(*date_range(models.MedicalRecord.record_date, date_from, date_to))
+    medical_records = paginate(query, models.MedicalRecord.id, response, skip, limit, after)
+    return medical_records
+
+@router.get("/medical_records/{record_id}", response_model=MedicalRecord)
+def read_medical_record(record_id: int, db: Session = Depends(get_db)):
+    medical_record = db.query(models.MedicalRecord).filter(models.MedicalRecord.id == record_id).first()
+    if medical_record is None:
+        raise HTTPException(status_code=404, detail="Medical Record not found")
+    return medical_record
+
+@router.put("/medical_records/{record_id}", response_model=MedicalRecord)
+def update_medical_record(record_id: int, medical_record: MedicalRecordCreate, db: Session = Depends(get_db)):
+    db_medical_record = db.query(models.MedicalRecord).filter(models.MedicalRecord.id == record_id).first()
+    if db_medical_record is None:
+        raise HTTPException(status_code=404, detail="Medical Record not found")
+    for key, value in medical_record.dict().items():
+        setattr(db_medical_record, key, value)
+    db.commit()
+    db.refresh(db_medical_record)
+    return db_medical_record
+
+@router.delete("/medical_records/{record_id}", response_model=MedicalRecord)
+def delete_medical_record(record_id: int, db: Session = Depends(get_db)):
+    db_medical_record = db.query(models.MedicalRecord).filter(models.MedicalRecord.id == record_id).first()
+    if db_medical_record is None:
+        raise HTTPException(status_code=404, detail="Medical Record not found")
+    db.delete(db_medical_record)
+    db.commit()
+    return db_medical_record
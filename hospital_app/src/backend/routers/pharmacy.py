@@ -0,0 +1,315 @@
+import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session, selectinload
+
+from .. import analytics, inventory, ledger, models
+from ..cache import response_cache
+from ..schemas import (
+    Medicine, MedicineBatch, MedicineBatchCreate, MedicineCreate, Prescription, PrescriptionCreate,
+    PrescriptionMedicine, PrescriptionMedicineCreate, PrescriptionMedicineLine, StockMovement,
+)
+from .common import cached_response, date_range, get_db, name_prefix, paginate
+
+router = APIRouter()
+
+# API Endpoints for Medicine Module
+@router.post("/medicines/", response_model=Medicine)
+def create_medicine(medicine: MedicineCreate, db: Session = Depends(get_db)):
+    db_medicine = models.Medicine(**medicine.dict())
+    db.add(db_medicine)
+    db.flush()
+    ledger.open_batch(db, db_medicine)
+    db.commit()
+    response_cache.invalidate("medicines", "dashboard")
+    inventory.alerts.notify()
+    db.refresh(db_medicine)
+    return db_medicine
+
+def has_batch(batch_number: str):
+    return models.Medicine.id.in_(
+        select(models.MedicineBatch.medicine_id).where(models.MedicineBatch.batch_number == batch_number)
+    )
+
+@router.get("/medicines/", response_model=list[Medicine])
+def read_medicines(request: Request, skip: int = 0, limit: int = 100, after: Optional[int] = None, name: Optional[str] = None, category: Optional[str] = None, batch_number: Optional[str] = None, db: Session = Depends(get_db)):
+    def load(response):
+        query = db.query(models.Medicine)
+        if name:
+            query = query.filter(name_prefix(models.Medicine.name, name))
+        if category:
+            query = query.filter(models.Medicine.category == category)
+        if batch_number:
+            query = query.filter(has_batch(batch_number))
+        return paginate(query, models.Medicine.id, response, skip, limit, after)
+    return cached_response(request, "medicines", list[Medicine], load)
+
+# Additional Medicine Endpoints for Inventory Management
+@router.get("/medicines/low-stock", response_model=list[Medicine])
+def get_low_stock_medicines(response: Response, skip: int = 0, limit: int = 100, after: Optional[int] = None, db: Session = Depends(get_db)):
+    query = db.query(models.Medicine).filter(models.Medicine.low_stock)
+    return paginate(query, models.Medicine.id, response, skip, limit, after)
+
+@router.get("/medicines/expiring-soon", response_model=list[Medicine])
+def get_expiring_soon_medicines(response: Response, days: int = inventory.EXPIRY_ALERT_DAYS, skip: int = 0, limit: int = 100, after: Optional[int] = None, db: Session = Depends(get_db)):
+    query = db.query(models.Medicine).filter(models.Medicine.expiry_date <= inventory.expiry_threshold(days))
+    return paginate(query, models.Medicine.id, response, skip, limit, after)
+
+@router.get("/medicines/alerts/stream")
+def stream_medicine_alerts(request: Request):
+    # Server-sent events: a snapshot of every low-stock or expiring medicine, then only the
+    # alerts that appear, change or clear as stock moves
+    return StreamingResponse(
+        inventory.alerts.stream(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/medicines/batches/{batch_number}", response_model=list[Medicine])
+def get_medicines_by_batch(batch_number: str, db: Session = Depends(get_db)):
+    medicines = db.query(models.Medicine).filter(has_batch(batch_number)).all()
+    return medicines
+
+@router.get("/medicines/{medicine_id}", response_model=Medicine)
+def read_medicine(request: Request, medicine_id: int, db: Session = Depends(get_db)):
+    def load(response):
+        medicine = db.query(models.Medicine).filter(models.Medicine.id == medicine_id).first()
+        if medicine is None:
+            raise HTTPException(status_code=404, detail="Medicine not found")
+        return medicine
+    return cached_response(request, "medicines", Medicine, load)
+
+@router.put("/medicines/{medicine_id}", response_model=Medicine)
+def update_medicine(medicine_id: int, medicine: MedicineCreate, db: Session = Depends(get_db)):
+    db_medicine = db.query(models.Medicine).filter(models.Medicine.id == medicine_id).first()
+    if db_medicine is None:
+        raise HTTPException(status_code=404, detail="Medicine not found")
+    values = medicine.dict()
+    # Stock is the total on hand: a change to it is an adjustment of the named batch
+    stock = values.pop("stock")
+    batch_values = {key: values.pop(key) for key in ("batch_number", "expiry_date", "manufacture_date")}
+    for key, value in values.items():
+        setattr(db_medicine, key, value)
+    # Medicines written outside the API may have no stock recorded; that is nothing on hand
+    on_hand = db_medicine.stock or 0
+    batch = ledger.find_batch(db, medicine_id, batch_values["batch_number"])
+    if batch is None and stock > on_hand:
+        batch = models.MedicineBatch(medicine_id=medicine_id, quantity=0, **batch_values)
+        db.add(batch)
+        db.flush()
+    elif batch is not None:
+        batch.expiry_date = batch_values["expiry_date"]
+        batch.manufacture_date = batch_values["manufacture_date"]
+        db.flush()
+    if stock != on_hand:
+        if batch is None:
+            raise HTTPException(status_code=400, detail=f"Batch {batch_values['batch_number']} not found for this medicine")
+        if not ledger.adjust(db, batch, stock - on_hand, ledger.ADJUSTMENT):
+            db.rollback()
+            raise HTTPException(status_code=400, detail=f"Batch {batch.batch_number} does not hold enough stock for this adjustment")
+    else:
+        ledger.refresh_next_batch(db, [medicine_id])
+    db.commit()
+    response_cache.invalidate("medicines", "dashboard")
+    inventory.alerts.notify()
+    db.refresh(db_medicine)
+    return db_medicine
+
+@router.post("/medicines/{medicine_id}/batches", response_model=MedicineBatch)
+def receive_medicine_batch(medicine_id: int, batch: MedicineBatchCreate, db: Session = Depends(get_db)):
+    # Stock arriving for a medicine: a new batch, or more of a batch already on hand
+    if batch.quantity <= 0:
+        raise HTTPException(status_code=400, detail="Quantity must be positive")
+    if db.query(models.Medicine.id).filter(models.Medicine.id == medicine_id).first() is None:
+        raise HTTPException(status_code=404, detail="Medicine not found")
+    db_batch = ledger.find_batch(db, medicine_id, batch.batch_number)
+    if db_batch is None:
+        db_batch = models.MedicineBatch(medicine_id=medicine_id, **batch.dict(exclude={"quantity"}), quantity=0)
+        db.add(db_batch)
+        db.flush()
+    ledger.adjust(db, db_batch, batch.quantity, ledger.RECEIPT)
+    db.commit()
+    response_cache.invalidate("medicines", "dashboard")
+    inventory.alerts.notify()
+    db.refresh(db_batch)
+    return db_batch
+
+@router.get("/medicines/{medicine_id}/batches", response_model=list[MedicineBatch])
+def read_medicine_batches(medicine_id: int, include_empty: bool = False, db: Session = Depends(get_db)):
+    # In dispensing order: first to expire first
+    query = db.query(models.MedicineBatch).filter(models.MedicineBatch.medicine_id == medicine_id)
+    if not include_empty:
+        query = query.filter(models.MedicineBatch.quantity > 0)
+    return query.order_by(models.MedicineBatch.expiry_date, models.MedicineBatch.id).all()
+
+@router.delete("/medicines/{medicine_id}", response_model=Medicine)
+def delete_medicine(medicine_id: int, db: Session = Depends(get_db)):
+    db_medicine = db.query(models.Medicine).filter(models.Medicine.id == medicine_id).first()
+    if db_medicine is None:
+        raise HTTPException(status_code=404, detail="Medicine not found")
+    # Only a medicine whose ledger holds nothing but its opening entry (one added by mistake) can go
+    history = db.query(models.StockMovement.id).filter(
+        models.StockMovement.medicine_id == medicine_id, models.StockMovement.reason != ledger.OPENING
+    ).first()
+    if history is not None:
+        raise HTTPException(status_code=409, detail="Medicine has stock movements and can't be deleted")
+    db.query(models.StockMovement).filter(models.StockMovement.medicine_id == medicine_id).delete(synchronize_session=False)
+    db.query(models.MedicineBatch).filter(models.MedicineBatch.medicine_id == medicine_id).delete(synchronize_session=False)
+    db.delete(db_medicine)
+    db.commit()
+    response_cache.invalidate("medicines", "dashboard")
+    inventory.alerts.notify()
+    return db_medicine
+
+# API Endpoints for Stock Ledger Module
+@router.get("/stock-movements/", response_model=list[StockMovement])
+def read_stock_movements(response: Response, skip: int = 0, limit: int = 100, after: Optional[int] = None, medicine_id: Optional[int] = None, batch_id: Optional[int] = None, bill_id: Optional[int] = None, reason: Optional[str] = None, date_from: Optional[datetime.datetime] = None, date_to: Optional[datetime.datetime] = None, db: Session = Depends(get_db)):
+    query = db.query(models.StockMovement)
+    if medicine_id is not None:
+        query = query.filter(models.StockMovement.medicine_id == medicine_id)
+    if batch_id is not None:
+        query = query.filter(models.StockMovement.batch_id == batch_id)
+    if bill_id is not None:
+        query = query.filter(models.StockMovement.bill_id == bill_id)
+    if reason:
+        query = query.filter(models.StockMovement.reason == reason)
+    query = query.filter(*date_range(models.StockMovement.movement_date, date_from, date_to))
+    return paginate(query, models.StockMovement.id, response, skip, limit, after)
+
+# API Endpoints for Prescription Module
+def query_prescriptions(db: Session):
+    # Medicine lines are loaded with one extra IN query per page rather than one query per prescription
+    return db.query(models.Prescription).options(selectinload(models.Prescription.medicines))
+
+def insert_prescription_medicines(db: Session, prescription_id: int, medicines: list[PrescriptionMedicineLine]):
+    if medicines:
+        db.execute(
+            insert(models.PrescriptionMedicine),
+            [{"prescription_id": prescription_id, "medicine_id": med.medicine_id, "quantity": med.quantity} for med in medicines],
+        )
+
+@router.post("/prescriptions/", response_model=Prescription)
+def create_prescription(prescription: PrescriptionCreate, db: Session = Depends(get_db)):
+    prescription_data = prescription.dict(exclude={"medicines"})
+
+    db_prescription = models.Prescription(**prescription_data)
+    db.add(db_prescription)
+    db.flush()
+    insert_prescription_medicines(db, db_prescription.id, prescription.medicines)
+    db.commit()
+    response_cache.invalidate("dashboard")
+
+    return query_prescriptions(db).filter(models.Prescription.id == db_prescription.id).first()
+
+@router.get("/prescriptions/", response_model=list[Prescription])
+def read_prescriptions(response: Response, skip: int = 0, limit: int = 100, after: Optional[int] = None, patient_id: Optional[int] = None, doctor_id: Optional[int] = None, status: Optional[str] = None, db: Session = Depends(get_db)):
+    query = query_prescriptions(db)
+    if patient_id is not None:
+        query = query.filter(models.Prescription.patient_id == patient_id)
+    if doctor_id is not None:
+        query = query.filter(models.Prescription.doctor_id == doctor_id)
+    if status:
+        query = query.filter(models.Prescription.status == status)
+    prescriptions = paginate(query, models.Prescription.id, response, skip, limit, after)
+    return prescriptions
+
+@router.get("/prescriptions/{prescription_id}", response_model=Prescription)
+def read_prescription(prescription_id: int, db: Session = Depends(get_db)):
+    prescription = query_prescriptions(db).filter(models.Prescription.id == prescription_id).first()
+    if prescription is None:
+        raise HTTPException(status_code=404, detail="Prescription not found")
+    return prescription
+
+@router.put("/prescriptions/{prescription_id}", response_model=Prescription)
+def update_prescription(prescription_id: int, prescription: PrescriptionCreate, db: Session = Depends(get_db)):
+    db_prescription = db.query(models.Prescription).filter(models.Prescription.id == prescription_id).first()
+    if db_prescription is None:
+        raise HTTPException(status_code=404, detail="Prescription not found")
+    # A billed prescription's consultation is in its bill's facts, keyed on the prescribing doctor
+    bill_id = db_prescription.bill_id
+    if bill_id is not None:
+        analytics.record_bill(db, bill_id, -1)
+    for key, value in prescription.dict(exclude={"medicines"}).items():
+        setattr(db_prescription, key, value)
+    # Replace the medicine lines in the same transaction
+    db.query(models.PrescriptionMedicine).filter(
+        models.PrescriptionMedicine.prescription_id == prescription_id
+    ).delete(synchronize_session=False)
+    insert_prescription_medicines(db, prescription_id, prescription.medicines)
+    if bill_id is not None:
+        db.flush()
+        analytics.record_bill(db, bill_id)
+    db.commit()
+    return query_prescriptions(db).filter(models.Prescription.id == prescription_id).first()
+
+@router.delete("/prescriptions/{prescription_id}", response_model=Prescription)
+def delete_prescription(prescription_id: int, db: Session = Depends(get_db)):
+    db_prescription = query_prescriptions(db).filter(models.Prescription.id == prescription_id).first()
+    if db_prescription is None:
+        raise HTTPException(status_code=404, detail="Prescription not found")
+    response = Prescription.model_validate(db_prescription)
+    bill_id = db_prescription.bill_id
+    if bill_id is not None:
+        analytics.record_bill(db, bill_id, -1)
+    for pm in db_prescription.medicines:
+        db.delete(pm)
+    db.delete(db_prescription)
+    if bill_id is not None:
+        db.flush()
+        analytics.record_bill(db, bill_id)
+    db.commit()
+    response_cache.invalidate("dashboard")
+    return response
+
+# API Endpoints for Prescription Medicine Link
+@router.post("/prescription_medicines/", response_model=PrescriptionMedicine)
+def create_prescription_medicine(pm: PrescriptionMedicineCreate, db: Session = Depends(get_db)):
+    db_pm = models.PrescriptionMedicine(**pm.dict())
+    db.add(db_pm)
+    db.commit()
+    db.refresh(db_pm)
+    return db_pm
+
+@router.get("/prescription_medicines/", response_model=list[PrescriptionMedicine])
+def read_prescription_medicines(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    pms = db.query(models.PrescriptionMedicine).offset(skip).limit(limit).all()
+    return pms
+
+@router.get("/prescription_medicines/{prescription_id}/{medicine_id}", response_model=PrescriptionMedicine)
+def read_prescription_medicine(prescription_id: int, medicine_id: int, db: Session = Depends(get_db)):
+    pm = db.query(models.PrescriptionMedicine).filter(
+        models.PrescriptionMedicine.prescription_id == prescription_id,
+        models.PrescriptionMedicine.medicine_id == medicine_id
+    ).first()
+    if pm is None:
+        raise HTTPException(status_code=404, detail="Prescription Medicine link not found")
+    return pm
+
+@router.put("/prescription_medicines/{prescription_id}/{medicine_id}", response_model=PrescriptionMedicine)
+def update_prescription_medicine(prescription_id: int, medicine_id: int, pm: PrescriptionMedicineCreate, db: Session = Depends(get_db)):
+    db_pm = db.query(models.PrescriptionMedicine).filter(
+        models.PrescriptionMedicine.prescription_id == prescription_id,
+        models.PrescriptionMedicine.medicine_id == medicine_id
+    ).first()
+    if db_pm is None:
+        raise HTTPException(status_code=404, detail="Prescription Medicine link not found")
+    for key, value in pm.dict().items():
+        setattr(db_pm, key, value)
+    db.commit()
+    db.refresh(db_pm)
+    return db_pm
+
+@router.delete("/prescription_medicines/{prescription_id}/{medicine_id}", response_model=PrescriptionMedicine)
+def delete_prescription_medicine(prescription_id: int, medicine_id: int, db: Session = Depends(get_db)):
+    db_pm = db.query(models.PrescriptionMedicine).filter(
+        models.PrescriptionMedicine.prescription_id == prescription_id,
+        models.PrescriptionMedicine.medicine_id == medicine_id
+    ).first()
+    if db_pm is None:
+        raise HTTPException(status_code=404, detail="Prescription Medicine link not found")
+    db.delete(db_pm)
+    db.commit()
+    return db_pm
@@ -0,0 +1,164 @@
+import bisect
+import datetime
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import exists, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+
+from . import models
+from .cache import response_cache
+
+# Every appointment blocks one slot of this length for its doctor
+SLOT_MINUTES = int(os.environ.get("APPOINTMENT_SLOT_MINUTES", 15))
+DAY_START = datetime.time(int(os.environ.get("CLINIC_OPENS_HOUR", 9)))
+DAY_END = datetime.time(int(os.environ.get("CLINIC_CLOSES_HOUR", 17)))
+# Bounds how stale a day's index can be when another worker booked into it
+INDEX_TTL = 60
+# Doctor-days kept in the index; the least recently used are dropped first
+INDEX_MAX_DAYS = int(os.environ.get("SCHEDULE_INDEX_MAX_DAYS", 4096))
+
+SLOT = datetime.timedelta(minutes=SLOT_MINUTES)
+ACTIVE = models.Appointment.status != "Cancelled"
+
+def normalize(moment):
+    # Appointment times are stored as naive UTC
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return moment
+
+def conflict_clause(doctor_id, start, exclude_id=None):
+    # Another active appointment for the doctor less than one slot away; served by ix_appointments_doctor_time
+    clause = exists().where(
+        models.Appointment.doctor_id == doctor_id,
+        models.Appointment.appointment_time > start - SLOT,
+        models.Appointment.appointment_time < start + SLOT,
+        ACTIVE,
+    )
+    if exclude_id is not None:
+        clause = clause.where(models.Appointment.id != exclude_id)
+    return clause
+
+def lock_doctor(db, doctor_id):
+    # Under PostgreSQL's READ COMMITTED, two bookings' NOT EXISTS checks can each miss the other's
+    # uncommitted row, so bookings for one doctor first queue on the doctor's row; the check then
+    # runs in a fresh snapshot that sees the booking ahead of it. SQLite serializes writers already.
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(models.Doctor.id).where(models.Doctor.id == doctor_id).with_for_update())
+
+def slot_taken(error):
+    # uq_appointments_doctor_slot rejected the row: an active appointment already starts then
+    message = str(error.orig)
+    return "uq_appointments_doctor_slot" in message or "appointments.doctor_id, appointments.appointment_time" in message
+
+def insert_if_free(db, values):
+    # INSERT ... SELECT ... WHERE NOT EXISTS, behind the doctor's lock, so two bookings for the same
+    # slot can't both land. Returns the new id, or None if the slot was taken.
+    columns = list(values)
+    lock_doctor(db, values["doctor_id"])
+    try:
+        return db.execute(
+            insert(models.Appointment).from_select(
+                columns,
+                select(*[literal(values[c], models.Appointment.__table__.c[c].type) for c in columns]).where(
+                    ~conflict_clause(values["doctor_id"], values["appointment_time"])
+                ),
+            ).returning(models.Appointment.id)
+        ).scalar()
+    except IntegrityError as e:
+        if not slot_taken(e):
+            raise
+        return None
+
+def update_if_free(db, appointment_id, values):
+    lock_doctor(db, values["doctor_id"])
+    try:
+        result = db.execute(
+            update(models.Appointment)
+            .where(models.Appointment.id == appointment_id, ~conflict_clause(values["doctor_id"], values["appointment_time"], appointment_id))
+            .values(**values),
+            execution_options={"synchronize_session": False},
+        )
+    except IntegrityError as e:
+        if not slot_taken(e):
+            raise
+        return False
+    return result.rowcount == 1
+
+class ScheduleIndex:
+    # Sorted booked start times per (doctor, day), an LRU of at most max_days entries. Each day
+    # is loaded with one indexed range query; conflict checks and free-slot lookups are then
+    # bisects on the list.
+
+    def __init__(self, max_days=INDEX_MAX_DAYS):
+        self.days = OrderedDict()
+        self.max_days = max_days
+        self.lock = threading.Lock()
+
+    def booked(self, db, doctor_id, day):
+        key = (doctor_id, day)
+        with self.lock:
+            cached = self.days.get(key)
+            if cached is not None and time.monotonic() - cached[0] < INDEX_TTL:
+                self.days.move_to_end(key)
+                return cached[1]
+        day_start = datetime.datetime.combine(day, datetime.time())
+        times = [
+            row.appointment_time for row in db.query(models.Appointment.appointment_time).filter(
+                models.Appointment.doctor_id == doctor_id,
+                models.Appointment.appointment_time >= day_start,
+                models.Appointment.appointment_time < day_start + datetime.timedelta(days=1),
+                ACTIVE,
+            ).order_by(models.Appointment.appointment_time)
+        ]
+        with self.lock:
+            self.days[key] = (time.monotonic(), times)
+            self.days.move_to_end(key)
+            while len(self.days) > self.max_days:
+                self.days.popitem(last=False)
+        return times
+
+    def add(self, doctor_id, moment):
+        with self.lock:
+            cached = self.days.get((doctor_id, moment.date()))
+            if cached is not None:
+                times = list(cached[1])
+                bisect.insort(times, moment)
+                self.days[(doctor_id, moment.date())] = (cached[0], times)
+
+    def invalidate(self, doctor_id, day):
+        with self.lock:
+            self.days.pop((doctor_id, day), None)
+
+    def clear(self):
+        with self.lock:
+            self.days.clear()
+
+    def free_slots(self, db, doctor_id, day):
+        times = self.booked(db, doctor_id, day)
+        slot = datetime.datetime.combine(day, DAY_START)
+        end = datetime.datetime.combine(day, DAY_END)
+        free = []
+        while slot + SLOT <= end:
+            i = bisect.bisect_left(times, slot)
+            if i < len(times) and times[i] - slot < SLOT:
+                # Jump past the booked appointment rather than stepping through it
+                slot = times[i] + SLOT
+                continue
+            if i > 0 and slot - times[i - 1] < SLOT:
+                slot = times[i - 1] + SLOT
+                continue
+            free.append(slot)
+            slot += SLOT
+        return free
+
+schedule_index = ScheduleIndex()
+
+def _on_remote_invalidate(namespaces):
+    # Another worker changed appointments; reload days lazily instead of waiting out INDEX_TTL
+    if namespaces is None or "appointments" in namespaces:
+        schedule_index.clear()
+
+response_cache.on_remote_invalidate(_on_remote_invalidate)
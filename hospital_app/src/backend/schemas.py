@@ -0,0 +1,343 @@
+import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+# Request and response bodies of the API, shared by the routers in backend/routers
+
+# Pydantic Models for Patient Module
+class PatientBase(BaseModel):
+    name: str
+    age: int
+    gender: Optional[str] = None
+    contact_number: str
+    address: Optional[str] = None
+    aadhar_number: Optional[str] = None
+    blood_group: Optional[str] = None
+    dob: Optional[datetime.datetime] = None
+    email: Optional[str] = None
+    emergency_contact_name: Optional[str] = None
+    emergency_contact_number: Optional[str] = None
+    marital_status: Optional[str] = None
+    assigned_doctor_id: Optional[int] = None
+
+class PatientCreate(PatientBase):
+    pass
+
+class Patient(PatientBase):
+    id: int
+    class Config:
+        from_attributes = True
+
+# Pydantic Models for Doctor Module
+class DoctorBase(BaseModel):
+    name: str
+    specialization: str
+    contact_number: str
+    email: str
+    consultation_fee: int = 500
+
+class DoctorCreate(DoctorBase):
+    pass
+
+class Doctor(DoctorBase):
+    id: int
+    class Config:
+        from_attributes = True
+
+# Pydantic Models for Appointment Module
+class AppointmentBase(BaseModel):
+    patient_id: int
+    doctor_id: int
+    appointment_time: datetime.datetime
+    reason: str
+    status: str = "Scheduled"
+
+class AppointmentCreate(AppointmentBase):
+    pass
+
+class Appointment(AppointmentBase):
+    id: int
+    class Config:
+        from_attributes = True
+
+class DoctorAvailability(BaseModel):
+    doctor_id: int
+    date: datetime.date
+    slot_minutes: int
+    booked: list[datetime.datetime]
+    free_slots: list[datetime.datetime]
+
+# Pydantic Models for Medical Record Module
+class MedicalRecordBase(BaseModel):
+    patient_id: int
+    doctor_id: int
+    diagnosis: str
+    treatment: str
+    record_date: datetime.datetime
+
+class MedicalRecordCreate(MedicalRecordBase):
+    pass
+
+class MedicalRecord(MedicalRecordBase):
+    id: int
+    class Config:
+        from_attributes = True
+
+# Pydantic Models for Medicine Module
+class MedicineBase(BaseModel):
+    name: str
+    description: str
+    stock: int
+    price: int
+    expiry_date: datetime.datetime
+    batch_number: str
+    manufacture_date: datetime.datetime
+    low_stock_threshold: int = 10
+    category: str
+    supplier: str
+
+class MedicineCreate(MedicineBase):
+    pass
+
+class Medicine(MedicineBase):
+    id: int
+    low_stock: bool
+    class Config:
+        from_attributes = True
+
+class MedicineBatchCreate(BaseModel):
+    batch_number: str
+    expiry_date: datetime.datetime
+    manufacture_date: datetime.datetime
+    quantity: int
+
+class MedicineBatch(MedicineBatchCreate):
+    id: int
+    medicine_id: int
+    received_date: datetime.datetime
+    class Config:
+        from_attributes = True
+
+class StockMovement(BaseModel):
+    id: int
+    medicine_id: int
+    batch_id: int
+    bill_id: Optional[int] = None
+    quantity: int
+    reason: str
+    movement_date: datetime.datetime
+    class Config:
+        from_attributes = True
+
+# Pydantic Models for Prescription Module
+class PrescriptionBase(BaseModel):
+    patient_id: int
+    doctor_id: int
+    prescription_date: Optional[datetime.datetime] = None
+    instructions: Optional[str] = None
+    status: str = "Pending"
+
+class PrescriptionMedicineLine(BaseModel):
+    medicine_id: int
+    quantity: int
+    class Config:
+        from_attributes = True
+
+class PrescriptionCreate(PrescriptionBase):
+    medicines: list[PrescriptionMedicineLine]
+
+class Prescription(PrescriptionBase):
+    id: int
+    medicines: Optional[list[PrescriptionMedicineLine]] = None
+    class Config:
+        from_attributes = True
+
+# Pydantic Models for Prescription Medicine Link
+class PrescriptionMedicineBase(BaseModel):
+    prescription_id: int
+    medicine_id: int
+    quantity: int
+
+class PrescriptionMedicineCreate(PrescriptionMedicineBase):
+    pass
+
+class PrescriptionMedicine(PrescriptionMedicineBase):
+    class Config:
+        from_attributes = True
+
+# Pydantic Models for Bill Module
+class BillBase(BaseModel):
+    patient_id: int
+    issue_date: datetime.datetime
+    due_date: datetime.datetime
+    status: str = "Pending"
+
+class BillCreate(BillBase):
+    amount: Optional[int] = None  # Make amount optional for auto-calculation
+
+class Bill(BillBase):
+    id: int
+    amount: int
+    paid_amount: Optional[int] = 0
+    class Config:
+        from_attributes = True
+
+# Pydantic Models for User Module (for RBAC)
+class UserBase(BaseModel):
+    username: str
+    password: str # This should be hashed in a real application
+    role: str
+
+class UserCreate(UserBase):
+    pass
+
+class User(UserBase):
+    id: int
+    hashed_password: str # Only return hashed password
+    class Config:
+        from_attributes = True
+
+# Pydantic Models for Staff Module
+class StaffBase(BaseModel):
+    user_id: int
+    name: str
+    position: str
+    contact_number: str
+    email: str
+
+class StaffCreate(StaffBase):
+    pass
+
+class Staff(StaffBase):
+    id: int
+    class Config:
+        from_attributes = True
+
+# Pydantic Models for Payment Module
+class PaymentBase(BaseModel):
+    bill_id: int
+    amount: int
+    payment_method: str
+    notes: Optional[str] = None
+
+class PaymentCreate(PaymentBase):
+    pass
+
+class Payment(PaymentBase):
+    id: int
+    payment_date: datetime.datetime
+    class Config:
+        from_attributes = True
+
+# Pydantic Models for Patient Overview
+class BillWithPayments(Bill):
+    payments: list[Payment] = []
+
+class PatientOverview(BaseModel):
+    patient: Patient
+    appointments: list[Appointment]
+    medical_records: list[MedicalRecord]
+    prescriptions: list[Prescription]
+    bills: list[BillWithPayments]
+
+# Pydantic Models for Dashboard Module
+class DashboardCounts(BaseModel):
+    patients: int
+    doctors: int
+    appointments: int
+    medicines: int
+    prescriptions: int
+    bills: int
+    staff: int
+
+class BillTotals(BaseModel):
+    billed: int
+    paid: int
+    outstanding: int
+    pending_count: int
+
+class DashboardSummary(BaseModel):
+    counts: DashboardCounts
+    recent_patients: list[Patient]
+    recent_appointments: list[Appointment]
+    low_stock_medicines: list[Medicine]
+    low_stock_count: int
+    bill_totals: BillTotals
+
+# Pydantic Models for Search Module
+class SearchResults(BaseModel):
+    patients: list[Patient] = []
+    medicines: list[Medicine] = []
+
+# Pydantic Models for Analytics Module
+class RevenueRow(BaseModel):
+    key: str
+    label: Optional[str] = None
+    billed: int = 0
+    bills: int = 0
+    collected: int = 0
+    payments: int = 0
+    consultation: int = 0
+    consultations: int = 0
+
+class AppointmentCountRow(BaseModel):
+    key: str
+    label: Optional[str] = None
+    appointments: int = 0
+
+# Pydantic Models for Reports Module
+class AgeingBucket(BaseModel):
+    bucket: str
+    bills: int
+    outstanding: int
+    share: float
+
+class AgeingReport(BaseModel):
+    as_of: datetime.datetime
+    outstanding: int
+    buckets: list[AgeingBucket]
+
+class CollectionRow(BaseModel):
+    month: str
+    bills: int
+    billed: int
+    collected: int
+    received: int
+    collection_rate: Optional[float] = None
+
+class CollectionReport(BaseModel):
+    months: list[CollectionRow]
+    total: CollectionRow
+
+class MedicineReportRow(BaseModel):
+    medicine_id: int
+    name: Optional[str] = None
+    units: int
+    revenue: int
+    opening_stock: int
+    closing_stock: int
+    turnover: float
+
+# Pydantic Models for Jobs Module
+class JobStatus(BaseModel):
+    name: str
+    status: str
+    next_run_at: Optional[datetime.datetime] = None
+    cursor: Optional[int] = None
+    last_started_at: Optional[datetime.datetime] = None
+    last_finished_at: Optional[datetime.datetime] = None
+    last_processed: Optional[int] = None
+    last_error: Optional[str] = None
+    class Config:
+        from_attributes = True
+
+# Pydantic Models for Bulk Import Module
+class BulkRowError(BaseModel):
+    row: int
+    error: str
+
+class BulkResult(BaseModel):
+    inserted: int
+    failed: int
+    errors: list[BulkRowError]
@@ -0,0 +1,109 @@
+import re
+
+from sqlalchemy import text
+
+from .database import begin
+
+# External-content FTS5 indexes over the patients and medicines tables. The
+# triggers keep them in step with every write, whichever code path makes it.
+SEARCH_TABLES = {
+    "patients": ("patients_fts", ["name", "address", "email", "contact_number"]),
+    "medicines": ("medicines_fts", ["name", "description", "category", "supplier"]),
+}
+
+def _trigger_ddl(table, fts_table, columns):
+    cols = ", ".join(columns)
+    new_values = ", ".join(f"new.{c}" for c in columns)
+    old_values = ", ".join(f"old.{c}" for c in columns)
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+        f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.id, {new_values}); END",
+    ]
+
+def _ddl(table, fts_table, columns):
+    return [
+        f"CREATE VIRTUAL TABLE {fts_table} USING fts5({', '.join(columns)}, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        *_trigger_ddl(table, fts_table, columns),
+        # Index whatever rows already exist
+        f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')",
+    ]
+
+def search_supported(engine):
+    return engine.dialect.name == "sqlite"
+
+def create_search_index(bind):
+    # Run by the migrations; indexes whatever rows the tables already hold
+    if not search_supported(bind):
+        return
+    with begin(bind) as conn:
+        for table, (fts_table, columns) in SEARCH_TABLES.items():
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": fts_table}
+            ).first()
+            if exists:
+                continue
+            for statement in _ddl(table, fts_table, columns):
+                conn.exec_driver_sql(statement)
+
+def suspend_search_index(engine):
+    # For bulk loads: drops the sync triggers so rows go in without per-row FTS work.
+    # rebuild_search_index() puts them back and reindexes everything in one pass.
+    if not search_supported(engine):
+        return
+    with engine.begin() as conn:
+        for fts_table, _ in SEARCH_TABLES.values():
+            for suffix in ("ai", "ad", "au"):
+                conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {fts_table}_{suffix}")
+
+# FTS5 flushes its in-memory index every 'hashsize' bytes (1 MiB by default); fewer, larger
+# segments make a full rebuild noticeably faster
+REBUILD_HASHSIZE = 64 * 1024 * 1024
+DEFAULT_HASHSIZE = 1024 * 1024
+
+def rebuild_search_index(engine):
+    if not search_supported(engine):
+        return
+    with engine.begin() as conn:
+        for table, (fts_table, columns) in SEARCH_TABLES.items():
+            for statement in _trigger_ddl(table, fts_table, columns):
+                conn.exec_driver_sql(statement)
+            conn.exec_driver_sql(f"INSERT INTO {fts_table}({fts_table}, rank) VALUES ('hashsize', {REBUILD_HASHSIZE})")
+            conn.exec_driver_sql(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+            conn.exec_driver_sql(f"INSERT INTO {fts_table}({fts_table}, rank) VALUES ('hashsize', {DEFAULT_HASHSIZE})")
+
+def merge_search_index(engine, pages):
+    # One bounded step of FTS5's incremental merge, which folds the segments left by many small
+    # writes together. Returns whether there was anything left to merge.
+    if not search_supported(engine):
+        return False
+    merged = False
+    with engine.begin() as conn:
+        for fts_table, _ in SEARCH_TABLES.values():
+            before = conn.exec_driver_sql("SELECT total_changes()").scalar()
+            conn.exec_driver_sql(f"INSERT INTO {fts_table}({fts_table}, rank) VALUES ('merge', {int(pages)})")
+            # Fewer than two changed rows means the merge found no work
+            if conn.exec_driver_sql("SELECT total_changes()").scalar() - before >= 2:
+                merged = True
+    return merged
+
+def to_match_query(q: str):
+    # Treat user input as plain words, never FTS5 syntax: every word becomes a quoted prefix term
+    words = re.findall(r"\w+", q)
+    return " ".join(f'"{word}"*' for word in words)
+
+def search_ids(db, table: str, q: str, skip: int = 0, limit: int = 20):
+    fts_table, _ = SEARCH_TABLES[table]
+    match = to_match_query(q)
+    if not match:
+        return []
+    rows = db.execute(
+        text(f"SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH :match ORDER BY rank LIMIT :limit OFFSET :skip"),
+        {"match": match, "limit": limit, "skip": skip},
+    )
+    return [row[0] for row in rows]
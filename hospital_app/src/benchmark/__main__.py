@@ -0,0 +1,78 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from . import report
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+def parse_args(argv):
+    from .dataset import SCALES
+    from .runner import FLOWS
+
+    parser = argparse.ArgumentParser(prog="python -m benchmark", description="Benchmark the hospital API in-process.")
+    parser.add_argument("--scale", choices=SCALES, default="small", help="size of the synthetic hospital")
+    parser.add_argument("--requests", type=int, default=200, help="requests per flow")
+    parser.add_argument("--concurrency", type=int, default=1, help="requests in flight per flow")
+    parser.add_argument("--flows", nargs="+", choices=FLOWS, default=list(FLOWS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="results file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 if any flow regressed")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    with tempfile.TemporaryDirectory() as workdir:
+        # The backend reads its configuration at import, so point it at a scratch database first
+        os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/benchmark.db"
+        os.environ["CACHE_BACKEND"] = "memory"
+        # Background jobs would write to the tables the flows are measuring
+        os.environ["JOBS_ENABLED"] = "0"
+        args = parse_args(argv)
+
+        from backend import database
+        from .dataset import populate
+        from .runner import run
+
+        start = time.perf_counter()
+        hospital = populate(database.engine, args.scale, args.seed)
+        print(f"Generated {args.scale} hospital in {time.perf_counter() - start:.1f}s")
+
+        results = asyncio.run(run(hospital, args.flows, args.requests, args.concurrency, args.seed))
+        database.engine.dispose()
+
+    print(report.format_table(results))
+    run_report = {
+        "scale": args.scale,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "flows": results,
+    }
+    if args.output:
+        report.save(args.output, run_report)
+    if args.save_baseline:
+        report.save(args.baseline, run_report)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against; run with --save-baseline to create one")
+        return 0
+    baseline = report.load(args.baseline)
+    if (baseline["scale"], baseline["concurrency"]) != (args.scale, args.concurrency):
+        print(f"Baseline was recorded at scale={baseline['scale']} concurrency={baseline['concurrency']}; comparison may be misleading")
+    lines, regressions = report.compare(results, baseline["flows"])
+    print("\nAgainst baseline:")
+    print("\n".join(lines))
+    if regressions:
+        print("\nRegressions:")
+        print("\n".join(regressions))
+        return 1 if args.fail_on_regression else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+from sqlalchemy import update
+
+from backend import generate, models
+
+# Synthetic hospital sizes, by patient count; everything else scales with it
+SCALES = {
+    "tiny": 200,
+    "small": 5000,
+    "medium": 50000,
+    "large": 500000,
+}
+
+class Hospital:
+    # Ids of the generated rows, so workloads can reference existing records
+    def __init__(self, patient_ids, doctor_ids, medicine_ids, bill_ids):
+        self.patient_ids = patient_ids
+        self.doctor_ids = doctor_ids
+        self.medicine_ids = medicine_ids
+        self.bill_ids = bill_ids
+
+def populate(engine, scale, seed=0):
+    ids = generate.generate(engine, generate.scaled_counts(SCALES[scale]), seed, log=lambda message: None)
+    # Plenty of stock so billing during the benchmark never runs out
+    with engine.begin() as conn:
+        conn.execute(update(models.Medicine).values(stock=10**9))
+        conn.execute(update(models.MedicineBatch).values(quantity=10**9))
+    return Hospital(list(ids["patients"]), list(ids["doctors"]), list(ids["medicines"]), list(ids["bills"]))
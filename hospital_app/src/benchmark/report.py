@@ -0,0 +1,48 @@
+import json
+
+COLUMNS = ("requests", "errors", "p50_ms", "p95_ms", "p99_ms", "rps", "sql_per_request")
+
+# A flow regresses when its p95 grows by more than LATENCY_TOLERANCE, or it issues more
+# SQL per request than SQL_TOLERANCE allows. Statement counts don't depend on the machine,
+# so they are the dependable signal; latency only compares well on the same hardware.
+LATENCY_TOLERANCE = 0.25
+SQL_TOLERANCE = 0.5
+
+def format_table(results):
+    width = max([len("flow")] + [len(name) for name in results])
+    lines = ["  ".join(["flow".ljust(width)] + [column.rjust(max(len(column), 9)) for column in COLUMNS])]
+    for name, summary in results.items():
+        lines.append("  ".join([name.ljust(width)] + [str(summary[column]).rjust(max(len(column), 9)) for column in COLUMNS]))
+    return "\n".join(lines)
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+def save(path, report):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+def compare(results, baseline, latency_tolerance=LATENCY_TOLERANCE, sql_tolerance=SQL_TOLERANCE):
+    # Returns (lines describing each flow against the baseline, list of regressions)
+    lines = []
+    regressions = []
+    for name, summary in results.items():
+        base = baseline.get(name)
+        if base is None:
+            lines.append(f"{name}: not in baseline")
+            continue
+        p95_change = (summary["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        sql_change = summary["sql_per_request"] - base["sql_per_request"]
+        lines.append(
+            f"{name}: p95 {base['p95_ms']} -> {summary['p95_ms']} ms ({p95_change:+.0%}), "
+            f"sql/request {base['sql_per_request']} -> {summary['sql_per_request']} ({sql_change:+.2f})"
+        )
+        if p95_change > latency_tolerance:
+            regressions.append(f"{name}: p95 latency up {p95_change:.0%}")
+        if sql_change > sql_tolerance:
+            regressions.append(f"{name}: {sql_change:+.2f} SQL statements per request")
+        if summary["errors"] > base["errors"]:
+            regressions.append(f"{name}: {summary['errors']} errors (baseline {base['errors']})")
+    return lines, regressions
@@ -0,0 +1,160 @@
+import asyncio
+import datetime
+import math
+import random
+import re
+import time
+
+import httpx
+
+from backend import scheduling
+from backend.main import app
+
+# Order matters: each flow works on records created by the ones before it
+FLOWS = ("registration", "booking", "prescription", "billing", "payment", "dashboard")
+
+# Statement count reported by the metrics middleware
+QUERY_COUNT = re.compile(r'desc="(\d+) queries"')
+
+# Far enough ahead that benchmark bookings never collide with generated appointments
+BOOKING_EPOCH = datetime.datetime(2030, 1, 1, 9)
+
+def percentile(values, p):
+    # Nearest-rank percentile
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+class FlowResult:
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.statements = []
+        self.errors = 0
+        self.elapsed = 0.0
+
+    def record(self, seconds, response):
+        self.latencies.append(seconds)
+        if response.status_code >= 400:
+            self.errors += 1
+        match = QUERY_COUNT.search(response.headers.get("server-timing", ""))
+        if match:
+            self.statements.append(int(match.group(1)))
+
+    def summary(self):
+        count = len(self.latencies)
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "p50_ms": round(percentile(self.latencies, 50) * 1000, 3),
+            "p95_ms": round(percentile(self.latencies, 95) * 1000, 3),
+            "p99_ms": round(percentile(self.latencies, 99) * 1000, 3),
+            "rps": round(count / self.elapsed, 1) if self.elapsed else 0.0,
+            "sql_per_request": round(sum(self.statements) / len(self.statements), 2) if self.statements else 0.0,
+        }
+
+class Workload:
+    # One request per flow step. State carries over between flows: registered patients get
+    # appointments and prescriptions, prescribed patients get billed, and new bills get paid.
+
+    def __init__(self, hospital, seed=0):
+        self.hospital = hospital
+        self.rng = random.Random(seed)
+        self.patients = []
+        self.prescribed = []
+        self.bills = []
+
+    def patient(self, i):
+        if i < len(self.patients):
+            return self.patients[i]
+        return self.hospital.patient_ids[i % len(self.hospital.patient_ids)]
+
+    async def registration(self, client, i):
+        response = await client.post("/patients/", json={
+            "name": f"Benchmark Patient {i}",
+            "age": self.rng.randint(1, 90),
+            "gender": self.rng.choice(("Male", "Female")),
+            "contact_number": f"7{i:09d}",
+            "aadhar_number": f"9{i:011d}",
+        })
+        if response.status_code == 200:
+            self.patients.append(response.json()["id"])
+        return response
+
+    async def booking(self, client, i):
+        doctors = self.hospital.doctor_ids
+        # Consecutive free slots for each doctor in turn
+        slot = BOOKING_EPOCH + datetime.timedelta(minutes=scheduling.SLOT_MINUTES * (i // len(doctors)))
+        return await client.post("/appointments/", json={
+            "patient_id": self.patient(i),
+            "doctor_id": doctors[i % len(doctors)],
+            "appointment_time": slot.isoformat(),
+            "reason": "Benchmark",
+        })
+
+    async def prescription(self, client, i):
+        patient_id = self.patient(i)
+        medicines = self.rng.sample(self.hospital.medicine_ids, min(len(self.hospital.medicine_ids), self.rng.randint(1, 3)))
+        response = await client.post("/prescriptions/", json={
+            "patient_id": patient_id,
+            "doctor_id": self.rng.choice(self.hospital.doctor_ids),
+            "instructions": "Benchmark",
+            "medicines": [{"medicine_id": m, "quantity": self.rng.randint(1, 5)} for m in medicines],
+        })
+        if response.status_code == 200:
+            self.prescribed.append(patient_id)
+        return response
+
+    async def billing(self, client, i):
+        # Once every prescribed patient has a bill, further bills have nothing pending and cost only the fixed work
+        patients = self.prescribed or self.hospital.patient_ids
+        now = datetime.datetime(2030, 1, 1)
+        response = await client.post("/bills/", json={
+            "patient_id": patients[i % len(patients)],
+            "issue_date": now.isoformat(),
+            "due_date": (now + datetime.timedelta(days=30)).isoformat(),
+        })
+        if response.status_code == 200:
+            self.bills.append(response.json()["id"])
+        return response
+
+    async def payment(self, client, i):
+        bills = self.bills or self.hospital.bill_ids
+        return await client.post("/payments/", json={
+            "bill_id": bills[i % len(bills)],
+            "amount": self.rng.randint(1, 200),
+            "payment_method": self.rng.choice(("Cash", "Card", "GPay")),
+        })
+
+    async def dashboard(self, client, i):
+        return await client.get("/dashboard/summary")
+
+async def run_flow(client, name, step, requests, concurrency):
+    result = FlowResult(name)
+    steps = iter(range(requests))
+
+    async def worker():
+        # Workers share one iterator, so each step runs exactly once
+        for i in steps:
+            start = time.perf_counter()
+            response = await step(client, i)
+            result.record(time.perf_counter() - start, response)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - start
+    return result
+
+async def run(hospital, flows=FLOWS, requests=200, concurrency=1, seed=0):
+    # Drives the app in-process through httpx's ASGI transport: no server, no network
+    workload = Workload(hospital, seed)
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    # Started the way a worker starts; the transport itself doesn't run the lifespan
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for name in FLOWS:
+                if name in flows:
+                    results[name] = (await run_flow(client, name, getattr(workload, name), requests, concurrency)).summary()
+    return results
@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Cold start of an API worker, each run in a fresh interpreter: importing backend.main, which
+# every worker and every --reload cycle pays, then the application's startup (the lifespan).
+# Exits with status 1 when the median of either is over its budget, or when the import loads
+# one of the modules that only some requests need. Every router and model is still imported
+# eagerly: FastAPI and SQLAlchemy are most of the import, the route definitions most of the rest.
+# The budgets are the measured medians (import 800-930 ms, startup 150-220 ms, mostly the Alembic
+# head lookup) plus a modest margin, so a new eager dependency or startup step shows.
+IMPORT_BUDGET_MS = 1100
+STARTUP_BUDGET_MS = 300
+LAZY_MODULES = ("backend.reports", "backend.export", "numpy", "pyarrow", "alembic", "redis")
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+from backend.main import app
+imported = time.perf_counter()
+lazy = [name for name in {lazy!r} if name in sys.modules]
+
+async def startup():
+    async with app.router.lifespan_context(app):
+        pass
+
+asyncio.run(startup())
+print(json.dumps({{"import_ms": (imported - start) * 1000, "startup_ms": (time.perf_counter() - imported) * 1000, "lazy": lazy}}))
+"""
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m benchmark.startup", description="Measure and budget API worker start time.")
+    parser.add_argument("--runs", type=int, default=7, help="fresh interpreters to start")
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--startup-budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    return parser.parse_args(argv)
+
+def migrated_env(workdir):
+    # Workers refuse to start on an unmigrated database, so migrate a scratch one first
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{workdir}/startup.db", "CACHE_BACKEND": "memory", "JOBS_ENABLED": "0"}
+    subprocess.run([sys.executable, "-m", "backend.migrate", "upgrade"], cwd=SRC, env=env, check=True, capture_output=True)
+    return env
+
+def probe(env):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(lazy=LAZY_MODULES)], cwd=SRC, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+def main(argv=None):
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as workdir:
+        env = migrated_env(workdir)
+        runs = [probe(env) for _ in range(args.runs)]
+
+    import_ms = statistics.median(run["import_ms"] for run in runs)
+    startup_ms = statistics.median(run["startup_ms"] for run in runs)
+    print(f"import backend.main: {import_ms:.0f} ms (budget {args.import_budget_ms:.0f} ms)")
+    print(f"startup:             {startup_ms:.0f} ms (budget {args.startup_budget_ms:.0f} ms)")
+
+    failures = []
+    if import_ms > args.import_budget_ms:
+        failures.append(f"importing backend.main took {import_ms:.0f} ms")
+    if startup_ms > args.startup_budget_ms:
+        failures.append(f"startup took {startup_ms:.0f} ms")
+    lazy = sorted({name for run in runs for name in run["lazy"]})
+    if lazy:
+        failures.append(f"importing backend.main loaded {', '.join(lazy)}; import them where they are used")
+    if failures:
+        print("\nOver budget:")
+        print("\n".join(failures))
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,16 +12,25 @@ export default function Admin() {
     staff: [],
   });
   const [selectedPatient, setSelectedPatient] = useState(null);
+  const [patientOverview, setPatientOverview] = useState(null);
   const [showHistoryModal, setShowHistoryModal] = useState(false);
 
-  const handleViewHistory = (patient) => {
+  const handleViewHistory = async (patient) => {
     setSelectedPatient(patient);
     setShowHistoryModal(true);
+    try {
+      // One request for the patient's appointments, records, prescriptions and bills
+      const res = await api.get(`/patients/${patient.id}/overview`);
+      setPatientOverview(res.data);
+    } catch (err) {
+      setError("Failed to load patient history");
+    }
   };
 
   const closeHistoryModal = () => {
     setShowHistoryModal(false);
     setSelectedPatient(null);
+    setPatientOverview(null);
   };
 
   // Edit State
@@ -261,7 +270,7 @@ export default function Admin() {
   const renderHistoryModal = () => {
     if (!showHistoryModal) return null;
     if (!selectedPatient) return null;
-    const patientAppointments = data.appointments.filter(app => app.patient_id === selectedPatient.id);
+    const patientAppointments = patientOverview ? patientOverview.appointments : [];
     return (
       <div className={`modal-overlay ${showHistoryModal ? 'show' : ''}`}>
         <div className="modal">
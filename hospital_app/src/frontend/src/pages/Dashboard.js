@@ -20,44 +20,19 @@ export default function Dashboard() {
   useEffect(() => {
     const fetchStats = async () => {
       try {
-        const [
-          patientsRes,
-          doctorsRes,
-          appointmentsRes,
-          medicinesRes,
-          prescriptionsRes,
-          billsRes,
-          staffRes,
-          lowStockRes,
-        ] = await Promise.all([
-          api.get("/patients"),
-          api.get("/doctors"),
-          api.get("/appointments"),
-          api.get("/medicines"),
-          api.get("/prescriptions"),
-          api.get("/bills"),
-          api.get("/staff"),
-          api.get("/medicines/low-stock"),
-        ]);
+        const { data } = await api.get("/dashboard/summary");
 
         setStats({
-          patients: patientsRes.data.length,
-          doctors: doctorsRes.data.length,
-          appointments: appointmentsRes.data.length,
-          medicines: medicinesRes.data.length,
-          prescriptions: prescriptionsRes.data.length,
-          bills: billsRes.data.length,
-          staff: staffRes.data.length,
+          ...data.counts,
+          bills: data.bill_totals.pending_count,
         });
 
-        // Get recent patients (last 5)
-        setRecentPatients(patientsRes.data.slice(-5).reverse());
-
-        // Get recent appointments (last 5)
-        setRecentAppointments(appointmentsRes.data.slice(-5).reverse());
+        // Recent patients and appointments arrive newest first
+        setRecentPatients(data.recent_patients);
+        setRecentAppointments(data.recent_appointments);
 
         // Set low stock medicines
-        setLowStockMedicines(lowStockRes.data);
+        setLowStockMedicines(data.low_stock_medicines);
       } catch (err) {
         setError("Failed to load dashboard stats");
       } finally {
@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from "react";
-import api from "../services/api";
+import api, { fetchPage } from "../services/api";
 
 export default function Patients() {
   const [patients, setPatients] = useState([]);
@@ -26,17 +26,22 @@ export default function Patients() {
 
   const [submitting, setSubmitting] = useState(false);
   const [query, setQuery] = useState("");
+  // Keyset cursors for the next page of the full list and of the list on screen
+  const [listCursor, setListCursor] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [patRes, docRes] = await Promise.all([
-          api.get("/patients/"),
+        const [patPage, docRes] = await Promise.all([
+          fetchPage("/patients/"),
           api.get("/doctors/"),
         ]);
-        const patientsData = Array.isArray(patRes.data) ? patRes.data : [];
+        const patientsData = Array.isArray(patPage.items) ? patPage.items : [];
         setPatients(patientsData);
         setFiltered(patientsData);
+        setListCursor(patPage.nextCursor);
         setDoctors(Array.isArray(docRes.data) ? docRes.data : []);
       } catch (err) {
         setError(err.message || "Failed to load data");
@@ -50,19 +55,40 @@ export default function Patients() {
   useEffect(() => {
     if (!query) {
       setFiltered(patients);
+      setNextCursor(listCursor);
       return;
     }
-    const q = query.toLowerCase();
-    setFiltered(
-      patients.filter(
-        (p) =>
-          (p.name && p.name.toLowerCase().includes(q)) ||
-          (p.contact_number && p.contact_number.toLowerCase().includes(q)) ||
-          (p.aadhar_number && p.aadhar_number.includes(q)) ||
-          String(p.id).includes(q)
-      )
-    );
-  }, [query, patients]);
+    // Name, phone and Aadhar prefix search, and lookup by patient ID, run on the server's indexes
+    const timer = setTimeout(async () => {
+      try {
+        const page = await fetchPage("/patients/", { q: query });
+        setFiltered(Array.isArray(page.items) ? page.items : []);
+        setNextCursor(page.nextCursor);
+      } catch (err) {
+        setError(err.message || "Search failed");
+      }
+    }, 250);
+    return () => clearTimeout(timer);
+  }, [query, patients, listCursor]);
+
+  const loadMore = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await fetchPage("/patients/", { after: nextCursor, ...(query ? { q: query } : {}) });
+      const items = Array.isArray(page.items) ? page.items : [];
+      if (query) {
+        setFiltered((prev) => [...prev, ...items]);
+        setNextCursor(page.nextCursor);
+      } else {
+        setPatients((prev) => [...prev, ...items]);
+        setListCursor(page.nextCursor);
+      }
+    } catch (err) {
+      setError(err.message || "Failed to load more patients");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   const resetForm = () => {
     setName("");
@@ -552,6 +578,13 @@ export default function Patients() {
                   ))}
                 </tbody>
               </table>
+              {nextCursor && (
+                <div className="center">
+                  <button className="btn secondary" onClick={loadMore} disabled={loadingMore}>
+                    {loadingMore ? "Loading..." : "Load more"}
+                  </button>
+                </div>
+              )}
             </div>
           )}
         </section>
@@ -5,4 +5,11 @@ const api = axios.create({
   headers: { "Content-Type": "application/json" },
 });
 
-export default api;
\ No newline at end of file
+// Fetch one keyset page of a list endpoint. Pass the returned nextCursor as
+// `after` to get the following page; it is null once the list is exhausted.
+export async function fetchPage(path, { after = 0, limit = 100, ...params } = {}) {
+  const res = await api.get(path, { params: { after, limit, ...params } });
+  return { items: res.data, nextCursor: res.headers["x-next-cursor"] || null };
+}
+
+export default api;
@@ -0,0 +1,40 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import database, migrate, scheduling
+from backend.cache import response_cache
+from backend.main import app
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = database.create_engine(f"sqlite:///{tmp_path}/hospital.db")
+    migrate.upgrade(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def client(engine, monkeypatch):
+    # The app's sessions and engine point at the test database; process-local caches start empty
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "SessionLocal", database.SessionLocal.__class__(autocommit=False, autoflush=False, bind=engine))
+    response_cache.clear()
+    scheduling.schedule_index.clear()
+    return TestClient(app)
+
+@pytest.fixture
+def doctor(client):
+    return client.post("/doctors/", json={
+        "name": "Dr Mehta", "specialization": "General", "contact_number": "9800000100", "email": "mehta@example.com",
+        "consultation_fee": 400,
+    }).json()
+
+@pytest.fixture
+def patient(client):
+    return client.post("/patients/", json={"name": "Ravi Kumar", "age": 52, "contact_number": "9800000200"}).json()
+
+@pytest.fixture
+def medicine(client):
+    return client.post("/medicines/", json={
+        "name": "Paracetamol", "description": "500 mg", "stock": 50, "price": 20, "expiry_date": "2030-01-01T00:00:00",
+        "batch_number": "P-1", "manufacture_date": "2025-01-01T00:00:00", "category": "Analgesic", "supplier": "Acme",
+    }).json()
@@ -0,0 +1,69 @@
+from sqlalchemy import select
+
+from backend import analytics, models
+
+BILL = {"issue_date": "2026-03-02T10:00:00", "due_date": "2026-04-01T00:00:00"}
+
+def rollups(engine):
+    # Non-empty rollup rows of both grains; rows netted to zero by a delete don't count
+    with engine.connect() as conn:
+        return {
+            grain: sorted(
+                tuple(row) for row in conn.execute(select(
+                    model.bucket, model.metric, model.doctor_id, model.payment_method, model.amount, model.count,
+                )) if row.amount or row.count
+            )
+            for grain, model in analytics.ROLLUPS.items()
+        }
+
+def assert_matches_rebuild(engine):
+    live = rollups(engine)
+    analytics.rebuild(engine)
+    assert live == rollups(engine)
+
+def consultation(client, **params):
+    return sum(row["consultation"] for row in client.get("/analytics/revenue", params=params).json())
+
+def bill_consultation(client, engine, patient, doctor):
+    client.post("/prescriptions/", json={
+        "patient_id": patient["id"], "doctor_id": doctor["id"], "prescription_date": "2026-03-02T09:00:00", "medicines": [],
+    })
+    bill = client.post("/bills/", json={"patient_id": patient["id"], **BILL}).json()
+    assert consultation(client) == 400
+    return bill
+
+def test_bill_update_and_delete_after_fee_change_keep_rollups_consistent(client, engine, patient, doctor):
+    bill = bill_consultation(client, engine, patient, doctor)
+    client.put(f"/doctors/{doctor['id']}", json={**doctor, "consultation_fee": 900})
+
+    # Moving the bill takes out the 400 it was counted at, not the doctor's new fee
+    client.put(f"/bills/{bill['id']}", json={"patient_id": patient["id"], "amount": bill["amount"], **BILL, "issue_date": "2026-03-05T10:00:00"})
+    assert consultation(client) == 400
+    assert_matches_rebuild(engine)
+
+    client.delete(f"/bills/{bill['id']}")
+    assert consultation(client) == 0
+    assert_matches_rebuild(engine)
+
+def test_changing_a_billed_prescriptions_doctor_moves_its_consultation(client, engine, patient, doctor):
+    bill_consultation(client, engine, patient, doctor)
+    other = client.post("/doctors/", json={**doctor, "contact_number": "9800000101", "email": "other@example.com", "consultation_fee": 700}).json()
+    with engine.connect() as conn:
+        prescription_id = conn.execute(select(models.Prescription.id)).scalar()
+    client.put(f"/prescriptions/{prescription_id}", json={
+        "patient_id": patient["id"], "doctor_id": other["id"], "status": "Billed", "medicines": [],
+    })
+    by_doctor = {row["key"]: row["consultation"] for row in client.get("/analytics/revenue", params={"group_by": "doctor"}).json()}
+    assert by_doctor == {str(doctor["id"]): 0, str(other["id"]): 400}
+    assert_matches_rebuild(engine)
+
+    client.delete(f"/prescriptions/{prescription_id}")
+    assert consultation(client) == 0
+    assert_matches_rebuild(engine)
+
+def test_revenue_accepts_aware_bounds(client, engine, patient, doctor):
+    bill_consultation(client, engine, patient, doctor)
+    # 15:30+05:30 is 10:00 UTC, the bill's issue hour; read as naive it would be hours later
+    assert consultation(client, **{"from": "2026-03-02T15:30:00+05:30"}) == 400
+    assert consultation(client, **{"from": "2026-03-02T16:30:00+05:30"}) == 0
+    assert consultation(client, **{"to": "2026-03-02T10:00:01Z"}) == 400
@@ -0,0 +1,34 @@
+BILL_DATES = {"issue_date": "2026-03-02T10:00:00", "due_date": "2026-04-01T00:00:00"}
+
+def prescribe(client, patient, doctor, medicines=()):
+    return client.post("/prescriptions/", json={
+        "patient_id": patient["id"], "doctor_id": doctor["id"], "prescription_date": "2026-03-02T09:00:00",
+        "medicines": [{"medicine_id": medicine_id, "quantity": quantity} for medicine_id, quantity in medicines],
+    }).json()
+
+def revenue(client):
+    return client.get("/analytics/revenue").json()
+
+def test_bill_that_dispensed_stock_is_not_deleted(client, patient, doctor, medicine):
+    prescribe(client, patient, doctor, [(medicine["id"], 5)])
+    bill = client.post("/bills/", json={"patient_id": patient["id"], **BILL_DATES}).json()
+    assert bill["amount"] == 400 + 5 * 20
+    before = revenue(client)
+
+    response = client.delete(f"/bills/{bill['id']}")
+    assert response.status_code == 409
+    assert response.json() == {"detail": "Bill has dispensed stock and can't be deleted"}
+    assert client.get(f"/bills/{bill['id']}").status_code == 200
+    assert revenue(client) == before
+    assert client.get(f"/medicines/{medicine['id']}").json()["stock"] == 45
+
+def test_bill_without_dispensed_stock_is_deleted(client, patient, doctor):
+    prescription = prescribe(client, patient, doctor)
+    bill = client.post("/bills/", json={"patient_id": patient["id"], **BILL_DATES}).json()
+    assert revenue(client)[0]["consultation"] == 400
+
+    assert client.delete(f"/bills/{bill['id']}").status_code == 200
+    assert client.get(f"/bills/{bill['id']}").status_code == 404
+    total = revenue(client)[0]
+    assert (total["billed"], total["bills"], total["consultation"], total["consultations"]) == (0, 0, 0, 0)
+    assert client.get(f"/prescriptions/{prescription['id']}").json()["status"] == "Billed"
@@ -0,0 +1,83 @@
+import time
+
+import fakeredis
+import pytest
+
+from backend import cache
+from backend.cache import UNAVAILABLE, CacheBackend, RedisCache
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_REDIS_TIMEOUT", 0.05)
+    monkeypatch.setattr(cache, "CACHE_REDIS_RETRY_MIN", 0.05)
+    monkeypatch.setattr(cache, "CACHE_REDIS_RETRY_MAX", 0.1)
+    return fakeredis.FakeServer()
+
+@pytest.fixture
+def workers(server):
+    # Two workers sharing one Redis, each recording the invalidations relayed to it
+    started = []
+    for _ in range(2):
+        worker = RedisCache(fakeredis.FakeRedis(server=server), prefix="test")
+        worker.relayed = []
+        worker.on_remote_invalidate(worker.relayed.append)
+        worker.start()
+        started.append(worker)
+    yield started
+    for worker in started:
+        worker.stop()
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+def test_invalidation_reaches_other_workers(workers):
+    first, second = workers
+    first.set("doctors", "list", [1], first.generation("doctors"))
+    assert second.get("doctors", "list") == [1]
+
+    second.invalidate("doctors", "dashboard")
+    assert first.get("doctors", "list") is None
+    wait_for(lambda: ["doctors", "dashboard"] in first.relayed)
+    assert ["doctors", "dashboard"] not in second.relayed
+
+def test_redis_outage_bypasses_the_cache_until_it_reconnects(server, workers):
+    first, second = workers
+    first.set("doctors", "list", [1], first.generation("doctors"))
+
+    server.connected = False
+    assert first.generation("doctors") == UNAVAILABLE
+    first.invalidate("doctors")
+    first.set("doctors", "list", [2])
+    assert first.get("doctors", "list") is None
+
+    server.connected = True
+    wait_for(first.available.is_set)
+    # The invalidation made during the outage reached Redis, so no worker serves the old entry
+    assert first.get("doctors", "list") is None
+    assert second.get("doctors", "list") is None
+    assert None in first.relayed
+    first.set("doctors", "list", [3], first.generation("doctors"))
+    assert second.get("doctors", "list") == [3]
+
+def test_worker_started_without_redis_connects_later(server):
+    server.connected = False
+    worker = RedisCache(fakeredis.FakeRedis(server=server), prefix="test")
+    worker.start()
+    try:
+        worker.set("doctors", "list", [1])
+        assert worker.get("doctors", "list") is None
+        assert worker.listener.is_alive()
+
+        server.connected = True
+        wait_for(worker.available.is_set)
+        worker.set("doctors", "list", [1], worker.generation("doctors"))
+        assert worker.get("doctors", "list") == [1]
+    finally:
+        worker.stop()
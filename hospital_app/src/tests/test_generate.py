@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import text
+
+from backend import database, generate
+
+@pytest.fixture
+def generated(tmp_path):
+    engine = database.create_engine(f"sqlite:///{tmp_path}/generated.db", pragmas=generate.BULK_PRAGMAS)
+    generate.generate(engine, generate.scaled_counts(2000), seed=1, log=lambda message: None)
+    with engine.connect() as conn:
+        yield conn
+    engine.dispose()
+
+def count(conn, sql):
+    return conn.execute(text(sql)).scalar()
+
+def test_billed_prescriptions_are_on_a_bill(generated):
+    assert count(generated, "SELECT count(*) FROM prescriptions WHERE status = 'Billed'") > 0
+    assert count(generated, "SELECT count(*) FROM prescriptions WHERE (status = 'Billed') != (bill_id IS NOT NULL)") == 0
+    # Charged on one of the patient's own bills, issued on or after the prescription
+    assert count(generated, """
+        SELECT count(*) FROM prescriptions p JOIN bills b ON b.id = p.bill_id
+        WHERE b.patient_id != p.patient_id OR b.issue_date < p.prescription_date
+    """) == 0
+    # With the fee the bill charged, as billing stores it
+    assert count(generated, """
+        SELECT count(*) FROM prescriptions p JOIN doctors d ON d.id = p.doctor_id
+        WHERE p.bill_id IS NOT NULL AND p.consultation_fee IS NOT d.consultation_fee
+    """) == 0
+
+def test_bills_dispense_their_prescriptions(generated):
+    dispensed = generated.execute(text(
+        "SELECT bill_id, medicine_id, -quantity FROM stock_movements WHERE reason = 'Dispense'"
+    )).all()
+    prescribed = generated.execute(text("""
+        SELECT p.bill_id, l.medicine_id, sum(l.quantity) FROM prescription_medicines l
+        JOIN prescriptions p ON p.id = l.prescription_id WHERE p.bill_id IS NOT NULL GROUP BY 1, 2
+    """)).all()
+    assert dispensed
+    assert sorted(dispensed) == sorted(prescribed)
+
+def test_stock_matches_the_ledger(generated):
+    assert count(generated, """
+        SELECT count(*) FROM medicine_batches b
+        WHERE b.quantity != (SELECT sum(m.quantity) FROM stock_movements m WHERE m.batch_id = b.id)
+    """) == 0
+    assert count(generated, """
+        SELECT count(*) FROM medicines m
+        WHERE m.stock != (SELECT sum(b.quantity) FROM medicine_batches b WHERE b.medicine_id = m.id)
+    """) == 0
+    assert count(generated, "SELECT count(*) FROM stock_movements WHERE reason = 'Opening' AND quantity < 0") == 0
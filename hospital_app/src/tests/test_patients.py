@@ -0,0 +1,13 @@
+PATIENT = {"name": "Asha Rao", "age": 34, "contact_number": "9800000001", "aadhar_number": "111122223333"}
+
+def test_create_patient_with_missing_doctor_is_a_clean_400(client):
+    response = client.post("/patients/", json={**PATIENT, "assigned_doctor_id": 999})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Referenced record does not exist or is still in use."}
+    assert client.get("/patients/").json() == []
+
+def test_create_patient_with_taken_aadhar(client):
+    assert client.post("/patients/", json=PATIENT).status_code == 200
+    response = client.post("/patients/", json={**PATIENT, "contact_number": "9800000002"})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Patient with this Aadhar Number already exists."}
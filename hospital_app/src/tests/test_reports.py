@@ -0,0 +1,49 @@
+import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import database, migrate, models, reports
+from backend.main import app
+
+AS_OF = datetime.datetime(2025, 3, 1)
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = database.create_engine(f"sqlite:///{tmp_path}/reports.db")
+    migrate.upgrade(engine)
+    with engine.begin() as conn:
+        conn.execute(models.Patient.__table__.insert(), [{"id": 1, "name": "Asha", "aadhar_number": "A1"}])
+        conn.execute(models.Bill.__table__.insert(), [
+            {"id": 1, "patient_id": 1, "amount": 1000, "paid_amount": 0, "issue_date": datetime.datetime(2025, 1, 1), "due_date": datetime.datetime(2025, 1, 31), "status": "Overdue"},
+            {"id": 2, "patient_id": 1, "amount": 500, "paid_amount": 500, "issue_date": datetime.datetime(2025, 2, 1), "due_date": datetime.datetime(2025, 3, 3), "status": "Paid"},
+        ])
+        conn.execute(models.Payment.__table__.insert(), [
+            {"bill_id": 2, "amount": 500, "payment_method": "Cash", "payment_date": datetime.datetime(2025, 2, 28, 22)},
+        ])
+    yield engine
+    engine.dispose()
+
+@pytest.mark.parametrize("as_of", [
+    datetime.datetime(2025, 3, 1, tzinfo=datetime.timezone.utc),
+    datetime.datetime(2025, 3, 1, 5, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=5, minutes=30))),
+])
+def test_ageing_accepts_aware_as_of(engine, as_of):
+    assert reports.ageing(engine, as_of) == reports.ageing(engine, AS_OF)
+
+def test_collection_accepts_aware_bounds(engine):
+    # 2025-03-01T01:00+03:00 is 2025-02-28 22:00 UTC, so the payment falls after date_to
+    date_to = datetime.datetime(2025, 3, 1, 1, tzinfo=datetime.timezone(datetime.timedelta(hours=3)))
+    report = reports.collection(engine, None, date_to)
+    assert report["total"]["received"] == 0
+    assert report["total"]["billed"] == 1500
+
+def test_ageing_endpoint_with_utc_designator(engine, monkeypatch):
+    monkeypatch.setattr(database, "engine", engine)
+    client = TestClient(app)
+    aware = client.get("/reports/ageing", params={"as_of": "2025-03-01T00:00:00Z"})
+    naive = client.get("/reports/ageing", params={"as_of": "2025-03-01T00:00:00"})
+    assert aware.status_code == 200
+    assert aware.json() == naive.json()
+    buckets = {bucket["bucket"]: bucket["outstanding"] for bucket in aware.json()["buckets"]}
+    assert buckets["1-30"] == 1000
@@ -0,0 +1,11 @@
+import statistics
+
+from benchmark import startup
+
+def test_worker_import_stays_lazy_and_within_budget(tmp_path):
+    # Each probe imports backend.main in a fresh interpreter, as a worker does
+    env = startup.migrated_env(tmp_path)
+    runs = [startup.probe(env) for _ in range(3)]
+    assert [run["lazy"] for run in runs] == [[], [], []]
+    assert statistics.median(run["import_ms"] for run in runs) <= startup.IMPORT_BUDGET_MS
+    assert statistics.median(run["startup_ms"] for run in runs) <= startup.STARTUP_BUDGET_MS
@@ -9,9 +9,14 @@ echo "Installing backend dependencies..."
 pip install -r hospital_app/src/backend/requirements.txt
 
 # Start the backend from the correct directory
-echo "Starting backend server..."
 cd hospital_app/src
 
+# Bring the database schema up to date before any worker starts
+echo "Applying database migrations..."
+python -m backend.migrate upgrade
+
+echo "Starting backend server..."
+
 # Kill old backend if port 8000 is in use
 # Kill old backend if port 8000 is in use
 if lsof -i:8000 > /dev/null 2>&1; then